@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+import asyncio
+import functools
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utilities'))
+import TickBuffer
+
+
+# OANDA ADAPTER FOR THE ASYNC ENGINE
+        # Runs the blocking OANDA pricing stream in a worker thread and the order
+        # REST calls in the default executor, so neither blocks the event loop.
+        # The stream thread waits while the tick queue is full (back-pressure).
+        # Parameters
+        # ----------
+        # api: tpqoa.tpqoa
+        #     connected tpqoa instance (a Trader works)
+        # queue_size: int (default = 4096)
+        #     ticks buffered between the stream thread and the event loop
+class OandaAsyncBroker:
+    def __init__(self, api, queue_size=4096):
+        self.api = api
+        self.queue_size = queue_size
+        self.stop_stream = False
+
+    def __repr__(self):
+        return "OandaAsyncBroker(api={})".format(self.api)
+
+    def _stream(self, instruments, on_tick):
+        response = self.api.ctx_stream.pricing.stream(
+            self.api.account_id, snapshot=True, instruments=','.join(instruments)
+        )
+        for msg_type, msg in response.parts():
+            if msg_type == 'pricing.ClientPrice':
+                on_tick((msg.instrument, msg.time, float(msg.bids[0].dict()['price']),
+                         float(msg.asks[0].dict()['price'])))
+            if self.stop_stream:
+                break
+
+    # STREAM_TICKS - async stream of (instrument, time, bid, ask)
+    async def stream_ticks(self, instruments):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        self.stop_stream = False
+
+        def on_tick(tick):
+            asyncio.run_coroutine_threadsafe(queue.put(tick), loop).result()
+
+        def stream():
+            try:
+                self._stream(instruments, on_tick)
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+
+        worker = loop.run_in_executor(None, stream)
+        try:
+            while (tick := await queue.get()) is not None:
+                yield tick
+        finally:
+            self.stop_stream = True
+            # keep draining so a stream thread blocked on a full queue can finish
+            while not worker.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.sleep(0.01)
+
+    # SUBMIT_ORDER - market order through tpqoa.create_order in the default executor
+    async def submit_order(self, instrument, units):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.api.create_order, instrument, units, suppress=True, ret=True)
+        )
+
+
+# ASYNCIO TRADING ENGINE
+        # Drives one or more Trader subclasses (created with autostart = False) as
+        # coroutines joined by bounded queues:
+        #     ingest -> build bars -> evaluate strategy -> submit orders
+        # One ingest coroutine reads a single combined stream and routes each tick
+        # to its instrument; every instrument has its own bar, strategy and order
+        # coroutines. A slow order round-trip only fills that instrument's order
+        # queue; ticks keep being ingested and aggregated until the queues in front
+        # of it are full, at which point the stream itself is paused (back-pressure).
+        # Parameters
+        # ----------
+        # traders: Trader or dict
+        #     strategy instance, or {instrument: instance}; their tick buffer, bar
+        #     history, define_strategy(), get_signal(), plan_trade() and report_trade()
+        #     are used
+        # broker: object (default = None)
+        #     provides async stream_ticks(instruments) and submit_order(instrument, units);
+        #     None uses the trader itself if it is a MockBroker, else OandaAsyncBroker(trader)
+        # tick_queue, bar_queue, order_queue: int
+        #     capacities of the per-instrument queues between the stages
+        # warmup_days: int (default = 5)
+        #     days of history loaded through get_most_recent() before streaming; all
+        #     instruments warm up concurrently
+class AsyncEngine:
+    def __init__(self, traders, broker=None, tick_queue=4096, bar_queue=256, order_queue=64, warmup_days=5):
+        if not isinstance(traders, dict):
+            traders = {traders.instrument: traders}
+        self.traders = traders
+        if broker is None:
+            first = next(iter(traders.values()))
+            broker = first if hasattr(first, 'stream_ticks') else OandaAsyncBroker(first)
+        self.broker = broker
+        self.tick_queue = tick_queue
+        self.bar_queue = bar_queue
+        self.order_queue = order_queue
+        self.warmup_days = warmup_days
+        self.stats = {'ticks': 0, 'bars': 0, 'decisions': 0, 'orders': 0, 'max_tick_backlog': 0}
+
+    def __repr__(self):
+        return "AsyncEngine(instruments={}, broker={})".format(list(self.traders), self.broker)
+
+    # START - runs a full session on a new event loop
+    def start(self, warmup=True):
+        return asyncio.run(self.run(warmup))
+
+    async def run(self, warmup=True):
+        if warmup:
+            await self.warm_up()
+        ticks = {instrument: asyncio.Queue(self.tick_queue) for instrument in self.traders}
+        stages = [self.ingest(ticks)]
+        for instrument, trader in self.traders.items():
+            bars = asyncio.Queue(self.bar_queue)
+            orders = asyncio.Queue(self.order_queue)
+            stages += [
+                self.build_bars(trader, ticks[instrument], bars),
+                self.evaluate(trader, bars, orders),
+                self.submit(trader, orders),
+            ]
+        self._started = time.perf_counter()
+        self._building = len(self.traders)
+        await asyncio.gather(*stages)
+        self.stats['seconds'] = time.perf_counter() - self._started
+        return self.stats
+
+    # WARM_UP - loads the history of every instrument concurrently
+    async def warm_up(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(None, trader.get_most_recent, self.warmup_days)
+            for trader in self.traders.values()
+        ))
+
+    # INGEST - routes ticks from the broker stream to the instrument tick queues until the session ends
+    async def ingest(self, ticks):
+        end_ns = min(trader.end_ns for trader in self.traders.values())
+        async for instrument, tick_time, bid, ask in self.broker.stream_ticks(list(self.traders)):
+            recent_tick = TickBuffer.to_ns(tick_time)
+            if recent_tick >= end_ns:
+                break
+            queue = ticks[instrument]
+            await queue.put((recent_tick, (ask + bid) / 2))
+            self.stats['ticks'] += 1
+            if queue.qsize() > self.stats['max_tick_backlog']:
+                self.stats['max_tick_backlog'] = queue.qsize()
+        for queue in ticks.values():
+            await queue.put(None)
+
+    # BUILD_BARS - aggregates ticks; passes on finished bars (and the first tick, as on_success does)
+    #   together with the telemetry clock reading of the tick that finished them
+    async def build_bars(self, trader, ticks, bars):
+        telemetry = trader.telemetry
+        tick_clock = None
+        first = True
+        while (tick := await ticks.get()) is not None:
+            if telemetry is not None:
+                tick_clock = telemetry.clock()
+                telemetry.counters['ticks'] += 1
+            finished = trader.tick_buffer.add(*tick)
+            if finished or first:
+                first = False
+                self.stats['bars'] += len(finished)
+                if telemetry is not None:
+                    telemetry.counters['bars'] += len(finished)
+                await bars.put((finished, tick_clock))
+        self._building -= 1
+        if self._building == 0:
+            # time until the last tick was aggregated, excluding orders still in flight
+            self.stats['tick_seconds'] = time.perf_counter() - self._started
+        await bars.put(None)
+
+    # EVALUATE - updates the strategy per bar batch and queues the orders it calls for; with
+    #   telemetry on, records the join / strategy / execute stages and tick_to_decision as
+    #   Trader.on_success does, and stamps each order with its decision time
+    async def evaluate(self, trader, bars, orders):
+        telemetry = trader.telemetry
+        decided = None
+        while (batch := await bars.get()) is not None:
+            finished, tick_clock = batch
+            if telemetry is not None:
+                stage = telemetry.clock()
+            if finished:
+                trader.join_bars(finished)
+                if telemetry is not None:
+                    stage = telemetry.since('join', stage)
+            trader.define_strategy()
+            if telemetry is not None:
+                stage = telemetry.since('strategy', stage)
+            signal = trader.get_signal()
+            units, going = trader.plan_trade(signal)
+            self.stats['decisions'] += 1
+            if telemetry is not None:
+                telemetry.counters['decisions'] += 1
+                decided = telemetry.since('tick_to_decision', tick_clock)
+            if going is not None:
+                # positions are tracked at decision time so later decisions net against them
+                trader.position = signal
+            if units:
+                await orders.put((units, going, decided))
+            if telemetry is not None:
+                telemetry.since('execute', stage)
+        if trader.position != 0:
+            await orders.put((-trader.position * trader.units, 'GOING NEUTRAL',
+                              None if telemetry is None else telemetry.clock()))
+            trader.position = 0
+        await orders.put(None)
+
+    # SUBMIT - sends an instrument's queued orders one at a time, in decision order; with
+    #   telemetry on, the time from decision to fill (queueing included) is decision_to_fill
+    async def submit(self, trader, orders):
+        telemetry = trader.telemetry
+        while (order := await orders.get()) is not None:
+            units, going, decided = order
+            fill = await self.broker.submit_order(trader.instrument, units)
+            self.stats['orders'] += 1
+            if telemetry is not None:
+                telemetry.since('decision_to_fill', decided)
+                telemetry.counters['orders'] += 1
+            trader.report_trade(fill, going)
@@ -0,0 +1,77 @@
+import pandas as pd
+import tpqoa
+import AsyncEngine
+
+
+# Broker side of a strategy instance run by MultiTrader: instead of opening its
+#   own OANDA connection, it forwards history and order requests to one shared
+#   tpqoa (or MockBroker) object, passed in through the conf_file argument
+class SharedBroker(tpqoa.tpqoa):
+    def __init__(self, conf_file):
+        self.api = conf_file
+        if hasattr(conf_file, 'history_store'):
+            # a MockBroker brings its own store (None by default)
+            self.history_store = conf_file.history_store
+        self.ticks = 0
+        self.stop_stream = False
+
+    def get_history(self, *args, **kwargs):
+        return self.api.get_history(*args, **kwargs)
+
+    def create_order(self, *args, **kwargs):
+        return self.api.create_order(*args, **kwargs)
+
+
+# MULTI-INSTRUMENT TRADER
+        # Runs one strategy instance per instrument in a single process, fed from
+        # one combined price stream by AsyncEngine. History for all instruments is
+        # warmed up concurrently; position and P&L are tracked per instrument.
+        # Parameters
+        # ----------
+        # api: tpqoa.tpqoa or MockBroker
+        #     the one connection shared by every instrument
+        # strategy: type
+        #     Trader subclass, e.g. SMACrossover
+        # instruments: list
+        #     instruments to trade, e.g. ['EUR_USD', 'GBP_USD']
+        # bar_length, units, duration:
+        #     as for Trader (the same for every instrument)
+        # telemetry: Telemetry or dict (default = None)
+        #     Telemetry.Telemetry shared by every instrument, or {instrument: Telemetry};
+        #     AsyncEngine fills it with the stage latencies and counters Trader records
+        # strategy_params:
+        #     extra keyword arguments for the strategy, e.g. Slow_MA=200, Fast_MA=50
+class MultiTrader:
+    def __init__(self, api, strategy, instruments, bar_length, units, duration, telemetry=None,
+                 **strategy_params):
+        self.api = api
+        self.strategy = strategy
+        book = type(strategy.__name__, (strategy, SharedBroker), {'autostart': False})
+        self.traders = {
+            instrument: book(api, instrument, bar_length, units, duration, **strategy_params)
+            for instrument in instruments
+        }
+        if telemetry is not None:
+            for instrument, trader in self.traders.items():
+                trader.telemetry = telemetry.get(instrument) if isinstance(telemetry, dict) else telemetry
+        broker = api if hasattr(api, 'stream_ticks') else AsyncEngine.OandaAsyncBroker(api)
+        self.engine = AsyncEngine.AsyncEngine(self.traders, broker)
+
+    def __repr__(self):
+        return "MultiTrader(strategy={}, instruments={})".format(self.strategy.__name__, list(self.traders))
+
+    # START_TRADE_SESSION - warms up every instrument and trades until the session ends
+    def start_trade_session(self, days=5):
+        self.engine.warmup_days = days
+        return self.engine.start()
+
+    # SUMMARY - position, number of closed trades and P&L per instrument
+    def summary(self):
+        return pd.DataFrame({
+            instrument: {
+                'position': trader.position,
+                'trades': trader.metrics.trades,
+                'P&L': trader.metrics.pnl,
+            }
+            for instrument, trader in self.traders.items()
+        }).T
@@ -0,0 +1,123 @@
+import os
+import sys
+import math
+import contextlib
+from time import perf_counter
+import numpy as np
+import pandas as pd
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utilities'))
+import MockBroker
+
+
+# Placed in front of the strategy class: serves now() from the mock broker's
+#   simulated clock and times every on_success call that produced a decision
+class ReplayRecorder:
+    def now(self):
+        return MockBroker.MockBroker.now(self)
+
+    def on_success(self, time, bid, ask):
+        bars = self.bars.total
+        first = self.ticks == 1
+        started = perf_counter()
+        super().on_success(time, bid, ask)
+        if first or self.bars.total != bars:
+            self.decision_latency.append(perf_counter() - started)
+
+
+# HISTORICAL REPLAY HARNESS
+        # Feeds recorded, synthetic or CSV-derived ticks through an unmodified Trader
+        # subclass (on_success -> bars -> define_strategy -> execute_trades) as fast
+        # as the strategy can take them, with orders filled by MockBroker.
+        # run() reports tick throughput, per-bar decision latency and the fill log.
+        # Parameters
+        # ----------
+        # strategy: type
+        #     Trader subclass, e.g. SMACrossover
+        # instrument: str
+        #     instrument traded
+        # bar_length: str
+        #     bar length of the strategy
+        # units: int
+        #     units traded per position
+        # duration: int (default = None)
+        #     session length in simulated minutes; None trades until the ticks run out
+        # days: int (default = 5)
+        #     days of history loaded before the first tick
+        # broker: dict (default = None)
+        #     MockBroker settings (ticks, history, start, n_ticks, order_latency, ...)
+        # strategy_params:
+        #     extra keyword arguments for the strategy, e.g. Slow_MA=200, Fast_MA=50
+class Replay:
+    def __init__(self, strategy, instrument, bar_length, units, duration=None, days=5, broker=None,
+                 **strategy_params):
+        self.strategy = strategy
+        self.days = days
+        self.results = None
+        replay = type(strategy.__name__, (ReplayRecorder, strategy, MockBroker.MockBroker), {'autostart': False})
+        if duration is None:
+            duration = 100 * 365 * 24 * 60
+        with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink):
+            self.trader = replay(dict(broker or {}), instrument, bar_length, units, duration, **strategy_params)
+
+    def __repr__(self):
+        return "Replay(strategy={}, instrument={})".format(self.strategy.__name__, self.trader.instrument)
+
+    # FROM_CSV - replays a close-price CSV (time, price) expanded to ticks
+    #   the first `warmup` rows are served as history, the rest are streamed
+    @classmethod
+    def from_csv(cls, strategy, source_file, instrument, bar_length, units, warmup=500, ticks_per_bar=60,
+                 broker=None, **strategy_params):
+        prices = pd.read_csv(source_file, parse_dates=['time'], index_col='time').price
+        start = prices.index[warmup - 1]
+        # the row at `start` only closes the first streamed bar, so its ticks are replayed too
+        ticks = MockBroker.expand_bars(prices.iloc[warmup - 1:], instrument, bar_length, ticks_per_bar)
+        history = prices.iloc[:warmup].to_frame('c')
+        days = math.ceil((start - prices.index[0]) / pd.Timedelta(days=1))
+        broker = {'ticks': ticks, 'history': history, 'start': start, **(broker or {})}
+        return cls(strategy, instrument, bar_length, units, days=days, broker=broker, **strategy_params)
+
+    # RUN - warms up, streams every tick and closes the final position; returns the report
+    def run(self):
+        trader = self.trader
+        trader.decision_latency = []
+        with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink):
+            trader.get_most_recent(self.days)
+            bars = trader.bars.total
+            started = perf_counter()
+            trader.stream_data(trader.instrument)
+            seconds = perf_counter() - started
+            trader.end_trade_session()
+        latency = np.array(trader.decision_latency) * 1e6
+        self.results = {
+            'ticks': trader.ticks,
+            'seconds': seconds,
+            'ticks_per_second': trader.ticks / seconds if seconds else math.nan,
+            'bars': trader.bars.total - bars,
+            'decisions': len(latency),
+            'latency_us': {
+                'mean': latency.mean() if len(latency) else math.nan,
+                'p50': np.percentile(latency, 50) if len(latency) else math.nan,
+                'p95': np.percentile(latency, 95) if len(latency) else math.nan,
+                'p99': np.percentile(latency, 99) if len(latency) else math.nan,
+                'max': latency.max() if len(latency) else math.nan,
+            },
+            'fills': self.fill_log(),
+            'pl': trader.metrics.pnl,
+            'metrics': trader.metrics.snapshot(),
+        }
+        return self.results
+
+    # FILL_LOG - DataFrame of the orders filled by the mock broker
+    def fill_log(self):
+        fills = pd.DataFrame(self.trader.fills, columns=['time', 'instrument', 'units', 'price', 'pl'])
+        return fills.astype({'units': int, 'price': float, 'pl': float})
+
+    # PRINT_REPORT - prints the summary of the last run
+    def print_report(self):
+        results = self.results
+        print('ticks: {:,} in {:.2f}s ({:,.0f} ticks/s)'.format(
+            results['ticks'], results['seconds'], results['ticks_per_second']))
+        print('bars: {:,} | decisions: {:,} | fills: {:,} | P&L: {}'.format(
+            results['bars'], results['decisions'], len(results['fills']), round(results['pl'], 4)))
+        print('decision latency (us): ' + ' | '.join(
+            '{} {:.1f}'.format(name, value) for name, value in results['latency_us'].items()))
@@ -1,26 +1,77 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 import tpqoa
 from datetime import datetime, timedelta, timezone
 import time
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utilities'))
+import TickBuffer
+import BarStore
+import HistoryStore
+import Resampler
+import Metrics
 
 class Trader(tpqoa.tpqoa):
+    # Whether __init__ starts the trading session; engines that drive the strategy
+    #   themselves (AsyncEngine) use subclasses with autostart = False
+    autostart = True
+    # File that bars evicted from the in-memory history are appended to (None drops them)
+    history_file = None
+    # On-disk S5 candle store the warm-up reads from, so restarts only download the
+    #   candles since the last stored one (None downloads the whole warm-up every time);
+    #   each load prunes the candles older than the warm-up, so the files stay bounded
+    history_store = HistoryStore.default_store
+    # Stage timers, latency histograms and counters (Telemetry.Telemetry) filled by the
+    #   live loop; None turns instrumentation off, leaving one attribute check per tick
+    telemetry = None
+    # Ticks between prints of the tick count (None never prints it)
+    progress_interval = 1000
+
     def __init__(self, conf_file, instrument, bar_length, units, duration):
         super().__init__(conf_file)
         self.instrument = instrument
         self.bar_length = pd.to_timedelta(bar_length)
-        self.tick_data = pd.DataFrame()
-        self.start = datetime.utcnow()
+        self.tick_buffer = TickBuffer.TickBuffer(self.bar_length)
+        self.start = self.now()
         self.end = self.start + timedelta(minutes=duration)
-        self.raw_data = None
-        self.data = None 
+        self.end_ns = TickBuffer.to_ns(self.end)
+        self.bars = BarStore.BarStore(
+            [self.instrument, 'High', 'Low'], 2 * self.max_lookback(), spill_path=self.history_file
+        )
+        self.data = None
         self.last_bar = None
         self.units = units
         self.position = 0
         self.profits = []
+        # Streaming performance of the session: bar returns of the held position and closed trades
+        self.metrics = Metrics.Metrics(Metrics.bars_per_year(self.bar_length))
+        # net units filled so far, to tell the fills that close a trade from those that open one
+        self.filled = 0
+        self.last_close = None
         self.duration = duration
+        self.tick_clock = None
 
-        self.start_trade_session()
+        if self.autostart:
+            self.start_trade_session()
+
+    # Overriden method (required) - largest number of past bars define_strategy() looks at;
+    #   the bar history keeps twice as many and drops older bars, so a strategy that reads
+    #   more than this sees a truncated history
+    def max_lookback(self):
+        raise NotImplementedError(
+            "{} must override max_lookback() with the number of past bars its strategy "
+            "reads (the bar history keeps twice as many)".format(type(self).__name__)
+        )
+
+    # Current (naive UTC) time; replay brokers substitute their simulated clock
+    def now(self):
+        return datetime.utcnow()
+
+    # Zero-copy, read-only view of the bar history (valid until the next bar is added)
+    @property
+    def raw_data(self):
+        return self.bars.view()
     
     # Begins trading session with error catching
     def start_trade_session(self, days=5, max_attempts=None, sleep_period=15, sleep_increase=0):
@@ -54,64 +105,57 @@ class Trader(tpqoa.tpqoa):
                     else: # TRY AGAIN
                         time.sleep(sleep_period)
                         sleep_period += sleep_increase
-                        self.tick_data = pd.DataFrame()
+                        self.tick_buffer.reset()
 
-    # Get recent data, with specified time interval
+    # Get recent data, with specified time interval; while the newest bar is older
+    #   than one bar length (market closed), waits a bar length and fetches again
     def get_most_recent(self, days=5):
-        time.sleep(1)
         print('-' * 50)
         print('ATTEMPTING TO MERGE...')
         print('REQUIRE UNDER {} SECONDS'.format(self.bar_length.seconds))
-        now = datetime.utcnow()
-        now = now - timedelta(microseconds=now.microsecond)
-        past = now - timedelta(days=days)
-        df = (self.get_history(
-                instrument = self.instrument,
-                start = past, 
-                end = now,
-                granularity = 'S5',
-                price = 'M',
-                localize = True
-            )
-            .c.dropna()
-            .to_frame()
-        )
-        df.rename(columns = {'c':self.instrument}, inplace=True)
-        low = df.resample(self.bar_length, label='right').min().dropna()
-        high = df.resample(self.bar_length, label='right').max().dropna()
-        df = df.resample(self.bar_length, label='right').last().dropna().iloc[:-1]
-        
-        self.raw_data = df.copy()
-        self.raw_data['High'] = high
-        self.raw_data['Low'] = low
-        # print(self.raw_data)
-        self.last_bar = self.raw_data.index[-1]
-        
-        print('Seconds: {}'.format((datetime.utcnow() - self.last_bar).seconds))
-
-        if datetime.utcnow() - self.last_bar >= self.bar_length:
+        while True:
+            now = self.now()
+            now = now - timedelta(microseconds=now.microsecond)
+            past = now - timedelta(days=days)
+            df = Resampler.resample(self.recent_closes(past, now), [self.bar_length])[self.bar_length].iloc[:-1]
+
+            self.bars.reset()
+            self.bars.extend(df.index.values.astype('datetime64[ns]').view(np.int64), np.vstack([
+                df.close.to_numpy(),
+                df.high.to_numpy(),
+                df.low.to_numpy()
+            ]))
+            self.last_bar = pd.Timestamp(self.bars.last_time())
+            self.last_close = df.close.iloc[-1] if len(df) else None
+
+            print('Seconds: {}'.format((self.now() - self.last_bar).seconds))
+
+            if not self.now() - self.last_bar >= self.bar_length:
+                break
             print('-----VERIFY THAT BOT IS RUNNING DURING TRADING HOURS-----')
-            self.get_most_recent()
-        else:
-            print('SUCCESSFULLY MERGED')
-            print('-' * 50)
+            time.sleep(self.bar_length.total_seconds())
+        print('SUCCESSFULLY MERGED')
+        print('-' * 50)
+
+    # S5 mid closes between start and end, read from the history store when there is one
+    def recent_closes(self, start, end):
+        if self.history_store is not None:
+            return self.history_store.load(self, self.instrument, start, end).c
+        return self.get_history(
+            instrument = self.instrument,
+            start = start,
+            end = end,
+            granularity = 'S5',
+            price = 'M',
+            localize = True
+        ).c
 
     def close_position(self):
         if self.position == 1:
-            order = self.create_order(
-                self.instrument,
-                -self.units,
-                suppress = True,
-                ret = True
-            )
+            order = self.send_order(-self.units)
             self.report_trade(order, 'GOING NEUTRAL')
         elif self.position == -1:
-            order = self.create_order(
-                self.instrument,
-                self.units,
-                suppress = True,
-                ret = True
-            )
+            order = self.send_order(self.units)
             self.report_trade(order, 'GOING NEUTRAL')
         print('\nSESSION OVER')
         self.position = 0
@@ -121,81 +165,112 @@ class Trader(tpqoa.tpqoa):
         self.stop_stream = True
 
         if self.position != 0:
-            close_order = self.create_order(
-                self.instrument,
-                units = -self.position * self.units,
-                suppress = True,
-                ret = True
-            )
+            close_order = self.send_order(-self.position * self.units)
             self.report_trade(close_order, "GOING NEUTRAL")
             self.position = 0
         print('\nENDING TRADING SESSION...')
 
     def on_success(self, time, bid, ask):
-        recent_tick = pd.to_datetime(time).replace(tzinfo=None)
-        print(self.ticks, end='\r', flush=True)
-        if recent_tick >= self.end:
+        telemetry = self.telemetry
+        if telemetry is not None:
+            self.tick_clock = telemetry.clock()
+            telemetry.counters['ticks'] += 1
+        recent_tick = TickBuffer.to_ns(time)
+        if self.progress_interval and self.ticks % self.progress_interval == 0:
+            print(self.ticks, end='\r', flush=True)
+        if recent_tick >= self.end_ns:
             self.end_trade_session()
             return
 
-        df = pd.DataFrame({self.instrument:(ask + bid) / 2}, index=[recent_tick])
-        self.tick_data = pd.concat([self.tick_data, df])
-        
-        if self.ticks == 1 or recent_tick - self.last_bar > self.bar_length:
-            self.resample_and_join()
+        bars = self.tick_buffer.add(recent_tick, (ask + bid) / 2)
+        if self.ticks == 1 or bars:
+            if telemetry is None:
+                if bars:
+                    self.join_bars(bars)
+                self.define_strategy()
+                self.execute_trades()
+                return
+            stage = telemetry.clock()
+            if bars:
+                telemetry.counters['bars'] += len(bars)
+                self.join_bars(bars)
+                stage = telemetry.since('join', stage)
             self.define_strategy()
+            stage = telemetry.since('strategy', stage)
             self.execute_trades()
-    
-    def resample_and_join(self):
-        temp = self.tick_data.resample(self.bar_length, label="right").last().ffill().iloc[:-1]
-        temp['High'] = self.tick_data.resample(self.bar_length, label='right').max().dropna()
-        temp['Low'] = self.tick_data.resample(self.bar_length, label='right').min().dropna()
-        self.raw_data = pd.concat([
-            self.raw_data, 
-            temp
-        ])
-        self.tick_data = self.tick_data.iloc[-1:]
-        # print(self.raw_data)
-        self.last_bar = self.raw_data.index[-1]
-    
+            telemetry.since('execute', stage)
+
+    # Appends bars finished by the tick buffer to the bar history and adds their log
+    #   returns, earned with the position held through them, to self.metrics
+    def join_bars(self, bars):
+        end, _, high, low, close, _ = zip(*bars)
+        self.bars.extend(end, [close, high, low])
+        self.last_bar = pd.Timestamp(self.bars.last_time())
+        for price in close:
+            if self.last_close is not None:
+                self.metrics.update(self.position * np.log(price / self.last_close), self.position)
+            self.last_close = price
+
+    # Overriden method - self.raw_data is a shared view, so add columns instead of
+    #   writing into the existing ones
     def define_strategy(self):
-        df = self.raw_data.copy()
+        df = self.raw_data
         df['position'] = 0
-        self.data = df.copy()
-        pass
+        self.data = df
     
-    def execute_trades(self):
-        if self.data['position'].iloc[-1] == 1:
+    # Most recent target position (1, 0 or -1); strategies that do not keep a
+    #   'position' column in self.data override this
+    def get_signal(self):
+        return self.data['position'].iloc[-1]
+
+    # Units to order (0 if none) and the report label for moving from self.position to signal
+    def plan_trade(self, signal):
+        if signal == 1:
             if self.position == 0:
-                order = self.create_order(self.instrument, self.units, suppress=True, ret=True)
-                self.report_trade(order, 'GOING LONG')
+                return self.units, 'GOING LONG'
             elif self.position == -1:
-                order = self.create_order(self.instrument, self.units * 2, suppress=True, ret=True) 
-                self.report_trade(order, 'GOING LONG')
-            else:
-                print('STAYING LONG')
-            self.position = 1
-        elif self.data['position'].iloc[-1] == -1: 
+                return self.units * 2, 'GOING LONG'
+            return 0, 'STAYING LONG'
+        elif signal == -1:
             if self.position == 0:
-                order = self.create_order(self.instrument, -self.units, suppress=True, ret=True)
-                self.report_trade(order, 'GOING SHORT')
+                return -self.units, 'GOING SHORT'
             elif self.position == 1:
-                order = self.create_order(self.instrument, -self.units * 2, suppress=True, ret=True)
-                self.report_trade(order, 'GOING SHORT')
-            else:
-                print('STAYING SHORT')
-            self.position = -1
-        elif self.data['position'].iloc[-1] == 0:
+                return -self.units * 2, 'GOING SHORT'
+            return 0, 'STAYING SHORT'
+        elif signal == 0:
             if self.position == -1:
-                order = self.create_order(self.instrument, self.units, suppress=True, ret=True) 
-                self.report_trade(order, 'GOING NEUTRAL')
+                return self.units, 'GOING NEUTRAL'
             elif self.position == 1:
-                order = self.create_order(self.instrument, -self.units, suppress=True, ret=True) 
-                self.report_trade(order, 'GOING NEUTRAL')
-            else:
-                print('STAYING NEUTRAL')
-            self.position = 0
+                return -self.units, 'GOING NEUTRAL'
+            return 0, 'STAYING NEUTRAL'
+        return 0, None
+
+    def execute_trades(self):
+        signal = self.get_signal()
+        units, going = self.plan_trade(signal)
+        if self.telemetry is not None:
+            self.telemetry.counters['decisions'] += 1
+            if self.tick_clock is not None:
+                self.telemetry.since('tick_to_decision', self.tick_clock)
+        if units:
+            order = self.send_order(units)
+            self.report_trade(order, going)
+        elif going is not None:
+            print(going)
+        if going is not None:
+            self.position = signal
     
+    # Market order through create_order; with telemetry on, the round trip is recorded
+    #   as decision_to_fill
+    def send_order(self, units):
+        if self.telemetry is None:
+            return self.create_order(self.instrument, units, suppress=True, ret=True)
+        started = self.telemetry.clock()
+        order = self.create_order(self.instrument, units, suppress=True, ret=True)
+        self.telemetry.since('decision_to_fill', started)
+        self.telemetry.counters['orders'] += 1
+        return order
+
     # Print out trade statistics
     def report_trade(self, order, going):
         time = order['time']
@@ -203,7 +278,12 @@ class Trader(tpqoa.tpqoa):
         price = order['price']
         pl = float(order['pl'])
         self.profits.append(pl)
-        cumpl = sum(self.profits)
+        # a fill against the units held closes (or reverses) a trade; opening fills earn nothing
+        filled = int(float(units))
+        if self.filled * filled < 0:
+            self.metrics.add_trade(pl)
+        self.filled += filled
+        cumpl = self.metrics.pnl
         print('\n' + 50* '-')
         print('{} | {}'.format(time, going))
         print('{} | Units = {} | Price = {} | P&L = {} | Cumulative P&L = {}'.format(time, units, price, pl, cumpl))
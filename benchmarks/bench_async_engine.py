@@ -0,0 +1,34 @@
+import os
+import sys
+import contextlib
+import io
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, ROOT)
+sys.path.insert(1, os.path.join(ROOT, 'live_trading_strategies'))
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+import AsyncEngine
+import MockBroker
+from SMACrossover import SMACrossover
+
+
+class OfflineSMACrossover(SMACrossover, MockBroker.MockBroker):
+    autostart = False
+
+
+# Offline load test: synthetic ticks through the async engine at several order latencies
+def main(n_ticks=100000, bar_length='30s'):
+    print('{:>12}{:>12}{:>10}{:>10}{:>14}{:>14}'.format('latency (s)', 'ticks', 'bars', 'orders', 'ticks/s', 'session (s)'))
+    for latency in [0.0, 0.05, 0.25]:
+        settings = {'n_ticks': n_ticks, 'order_latency': latency}
+        with contextlib.redirect_stdout(io.StringIO()):
+            trader = OfflineSMACrossover(settings, 'EUR_USD', bar_length, 1000, duration=7 * 24 * 60,
+                                         Slow_MA=40, Fast_MA=10)
+            stats = AsyncEngine.AsyncEngine(trader, warmup_days=1).start()
+        # tick throughput up to the last aggregated tick; the session also waits for in-flight orders
+        print('{:>12}{:>12,}{:>10,}{:>10,}{:>14,.0f}{:>14.2f}'.format(
+            latency, stats['ticks'], stats['bars'], stats['orders'], stats['ticks'] / stats['tick_seconds'],
+            stats['seconds']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+import Features
+import DNNRuntime
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+MODEL_PATH = os.path.join(ROOT, 'deep_neural_network', 'DNN_Save')
+PKL_PATH = os.path.join(ROOT, 'deep_neural_network', 'parameters.pkl')
+NPZ_PATH = os.path.join(ROOT, 'deep_neural_network', 'DNN_Save.npz')
+# model.predict() outputs of DNN_Save on sampled raw feature rows, for the check without TensorFlow
+REFERENCE_PATH = os.path.join(ROOT, 'deep_neural_network', 'DNN_Save_reference.npz')
+TOLERANCE = 1e-5
+
+STARTUP = {
+    'keras': 'import keras; keras.models.load_model({!r})'.format(MODEL_PATH),
+    'numpy': 'import sys; sys.path.insert(1, {!r}); import DNNRuntime; DNNRuntime.NumpyDNN({!r})'.format(
+        os.path.join(ROOT, 'utilities'), NPZ_PATH),
+}
+
+
+# WRITE_REFERENCE - stores rows evenly spaced raw input rows and model.predict() on them (standardized
+#   with parameters.pkl, as DeepNeuralNetworkTest feeds the model)
+def write_reference(model, features, rows):
+    raw = features.flat()
+    index = np.linspace(0, len(raw) - 1, rows).astype(int)
+    parameters = pd.read_pickle(PKL_PATH)
+    inputs = features.standardize(parameters['mu'], parameters['sigma'])[index]
+    np.savez_compressed(REFERENCE_PATH, raw=raw[index], expected=model.predict(inputs, verbose=0))
+
+
+# CHECK_REFERENCE - asserts predict, predict_raw and predict_one against the stored model.predict() outputs
+def check_reference(runtime):
+    with np.load(REFERENCE_PATH) as reference:
+        raw, expected = reference['raw'], reference['expected']
+    errors = {
+        'predict': np.abs(runtime.predict((raw - runtime.mu) / runtime.sigma) - expected).max(),
+        'predict_raw': np.abs(runtime.predict_raw(raw) - expected).max(),
+        'predict_one': max(abs(runtime.predict_one(row) - value) for row, value in zip(raw, expected[:, 0])),
+    }
+    for name, error in errors.items():
+        assert error <= TOLERANCE, '{} differs from model.predict by {:.2e}'.format(name, error)
+    print('parity vs stored model.predict on {} rows (max abs diff): {}'.format(
+        len(raw), ' | '.join('{} {:.2e}'.format(name, error) for name, error in errors.items())))
+
+
+# CHECK_MODEL - asserts predict_raw against a live model.predict() on the same sampled rows
+def check_model(runtime, model, features, rows):
+    raw = features.flat()
+    index = np.linspace(0, len(raw) - 1, rows).astype(int)
+    parameters = pd.read_pickle(PKL_PATH)
+    expected = model.predict(features.standardize(parameters['mu'], parameters['sigma'])[index], verbose=0)
+    error = np.abs(runtime.predict_raw(raw[index]) - expected).max()
+    assert error <= TOLERANCE, 'predict_raw differs from live model.predict by {:.2e}'.format(error)
+    print('parity vs live model.predict on {} rows (max abs diff): {:.2e}'.format(rows, error))
+
+
+# Check the committed .npz against model.predict and compare startup and latency
+#   the committed artifact is always checked against the committed reference, and against a
+#   live model.predict when TensorFlow is installed; export=True (--export, needs TensorFlow)
+#   rewrites both files from DNN_Save first
+def main(rows=200, export=False):
+    try:
+        import keras
+    except ImportError:
+        keras = None
+    if export and keras is None:
+        raise ImportError('--export needs TensorFlow to load DNN_Save')
+    price = pd.read_csv(SOURCE_FILE, parse_dates=['time'], index_col='time').price
+    features = Features.build(price)
+    if keras is not None:
+        model = keras.models.load_model(MODEL_PATH)
+        if export:
+            DNNRuntime.export(MODEL_PATH, PKL_PATH, NPZ_PATH)
+            write_reference(model, features, rows)
+    runtime = DNNRuntime.NumpyDNN(NPZ_PATH)
+    inputs = features.standardize(runtime.mean, runtime.std)
+    raw = features.flat()
+    print('artifact: {} ({:.0f} KB)'.format(runtime, os.path.getsize(NPZ_PATH) / 1024))
+    check_reference(runtime)
+    if keras is not None:
+        check_model(runtime, model, features, rows)
+
+    if keras is not None:
+        print('keras   batch of {:,}: {:8.1f} ms | one row: {:8.1f} us'.format(
+            len(inputs), _time(lambda: model.predict(inputs, verbose=0)) * 1e3,
+            _time(lambda: model(inputs[:1], training=False), 200) * 1e6))
+    print('numpy   batch of {:,}: {:8.1f} ms | one row: {:8.1f} us'.format(
+        len(inputs), _time(lambda: runtime.predict_raw(raw)) * 1e3,
+        _time(lambda: runtime.predict_one(raw[-1]), 10000) * 1e6))
+
+    for name, code in STARTUP.items():
+        if name == 'keras' and keras is None:
+            continue
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code + '; import resource; '
+                                 'print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'],
+                                capture_output=True, text=True, check=True)
+        seconds = time.perf_counter() - start
+        print('{:7} startup (import + load): {:6.2f}s | peak RSS {:6.0f} MB'.format(
+            name, seconds, int(result.stdout.split()[-1]) / 1024))
+
+
+def _time(function, repeat=5):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check and time the NumPy DNN runtime against Keras.')
+    parser.add_argument('--export', action='store_true',
+                        help='rewrite DNN_Save.npz and DNN_Save_reference.npz from DNN_Save (needs TensorFlow)')
+    main(export=parser.parse_args().export)
@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+sys.path.insert(1, os.path.join(ROOT, 'deep_neural_network'))
+import Features
+
+ROWS = 2_000_000
+
+
+# numpy-only copy of the DNN modules' cw() (they import TensorFlow)
+def cw(labels):
+    counts = np.zeros(2, dtype=np.int64)
+    for chunk in labels:
+        counts += np.bincount(np.asarray(chunk, dtype=np.int64), minlength=2)
+    return {0: counts.sum() / counts[0] / 2, 1: counts.sum() / counts[1] / 2}
+
+
+# Runs fn(), returning (result, seconds, peak MB allocated while it ran)
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+# Random-walk M1 closes written as a csv like data/EURUSD_HOUR.csv
+def write_prices(path, rows, seed=100):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2015-01-01', periods=rows, freq='1min', name='time')
+    price = 1.1 * np.exp(np.cumsum(rng.normal(0, 2e-4, rows)))
+    pd.DataFrame({'price': price}, index=index).to_csv(path)
+
+
+# An add() that fails after writing some chunks leaves no rows behind: a second add() on the
+#   same store then matches a store that never saw the failure
+def check_recovery(directory, source_file, rows=20000, chunksize=5000):
+    price = pd.read_csv(source_file, parse_dates=['time'], index_col='time', nrows=rows).price
+
+    def failing():
+        yield price.iloc[:chunksize]
+        yield price.iloc[chunksize:2 * chunksize]
+        raise RuntimeError('feed lost')
+    store = Features.FeatureStore(os.path.join(directory, 'failed'))
+    try:
+        store.add('M1', failing())
+    except RuntimeError:
+        pass
+    store.add('M1', price, chunksize=chunksize)
+    clean = Features.FeatureStore(os.path.join(directory, 'clean'))
+    clean.add('M1', price, chunksize=chunksize)
+    for name, got, expected in zip(['X', 'y', 'time'], store.arrays(), clean.arrays()):
+        assert np.array_equal(got, expected), '{} differs after a failed add()'.format(name)
+    assert os.path.getsize(os.path.join(store.directory, 'y.i8')) == len(clean)
+    print('failed add() recovery: {:,} rows equal to a clean store'.format(len(store)))
+
+
+# In-memory Features.build vs. the chunked FeatureStore on a synthetic M1 history
+def main(rows=ROWS, batch_size=1024):
+    with tempfile.TemporaryDirectory() as directory:
+        source_file = os.path.join(directory, 'M1.csv')
+        write_prices(source_file, rows)
+        check_recovery(directory, source_file)
+
+        def in_memory():
+            price = pd.read_csv(source_file, parse_dates=['time'], index_col='time').price
+            features = Features.build(price, cache=False)
+            mu, sigma = features.moments()
+            return features.standardize(mu, sigma).shape
+        shape, seconds, peak = measure(in_memory)
+        print('{} x {} inputs ({:.0f} MB as float32)'.format(shape[0], shape[1], shape[0] * shape[1] * 4 / 2 ** 20))
+        print('in memory:  read + build + standardize {:6.1f} s, peak {:6.0f} MB'.format(seconds, peak))
+
+        store = Features.FeatureStore(os.path.join(directory, 'store'))
+        _, seconds, peak = measure(lambda: store.add_csv('M1', source_file))
+        print('store:      chunked write              {:6.1f} s, peak {:6.0f} MB  ({:,.0f} rows/s)'.format(
+            seconds, peak, len(store) / seconds))
+        (mu, sigma), seconds, peak = measure(store.moments)
+        print('            streamed moments           {:6.1f} s, peak {:6.0f} MB'.format(seconds, peak))
+        weights, seconds, peak = measure(lambda: cw(store.labels()))
+        print('            streamed class weights     {:6.1f} s, peak {:6.0f} MB  {}'.format(
+            seconds, peak, {k: round(float(v), 4) for k, v in weights.items()}))
+
+        def epoch():
+            samples = 0
+            for X, y in store.batches(mu, sigma, batch_size=batch_size, epochs=1):
+                samples += len(y)
+            return samples
+        samples, seconds, peak = measure(epoch)
+        print('            shuffled batches, 1 epoch  {:6.1f} s, peak {:6.0f} MB  ({:,.0f} samples/s)'.format(
+            seconds, peak, samples / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import pickle
+import tempfile
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+import Features
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+PARAMETERS = os.path.join(ROOT, 'deep_neural_network', 'parameters.pkl')
+
+
+# Column-by-column lag frame (as DeepNeuralNetworkTest built it) vs. Features.build()
+def main(lags=8):
+    price = pd.read_csv(SOURCE_FILE, parse_dates=['time'], index_col='time').price
+    parameters = pickle.load(open(PARAMETERS, 'rb'))
+
+    start = time.perf_counter()
+    df = Features.indicators(price).dropna()
+    columns = []
+    for feature in Features.FEATURES:
+        for lag in range(1, lags + 1):
+            column = '{}_lag_{}'.format(feature, lag)
+            df[column] = df[feature].shift(lag)
+            columns.append(column)
+    df.dropna(inplace=True)
+    reference = ((df - parameters['mu']) / parameters['sigma'])[columns].to_numpy()
+    frame = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        features = Features.build(price, lags, cache=False)
+        inputs = features.standardize(parameters['mu'], parameters['sigma'])
+        matrix = time.perf_counter() - start
+        Features.build(price, lags, cache_dir=cache_dir)
+        start = time.perf_counter()
+        cached = Features.build(price, lags, cache_dir=cache_dir)
+        cached.standardize(parameters['mu'], parameters['sigma'])
+        warm = time.perf_counter() - start
+
+    print('inputs: {} x {} ({} MB as float32)'.format(*inputs.shape, inputs.nbytes // 2 ** 20))
+    print('per-column shift + full-frame standardize: {:7.1f} ms'.format(frame * 1e3))
+    print('strided float32 build + standardize:       {:7.1f} ms'.format(matrix * 1e3))
+    print('cached build + standardize:                {:7.1f} ms'.format(warm * 1e3))
+    print('parity: same rows {}, same columns {}, max abs diff {:.2e}'.format(
+        features.index.equals(df.index), features.columns == columns, np.abs(inputs - reference).max()))
+
+
+if __name__ == '__main__':
+    main()
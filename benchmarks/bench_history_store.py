@@ -0,0 +1,85 @@
+import os
+import io
+import sys
+import tempfile
+import contextlib
+from time import perf_counter
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, ROOT)
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+sys.path.insert(1, os.path.join(ROOT, 'live_trading_strategies'))
+import MockBroker
+import HistoryStore
+from SMACrossover import SMACrossover
+
+INSTRUMENT = 'EUR_USD'
+# assumed round-trip of one 5000-candle history request
+PAGE_LATENCY = 0.25
+
+
+class OfflineSMACrossover(SMACrossover, MockBroker.MockBroker):
+    autostart = False
+    now = MockBroker.MockBroker.now
+
+
+# Seconds from starting a trader at `start` to its first trading decision, and the candles it downloaded
+def restart(history, start, store):
+    first_tick = pd.Timestamp(start) + pd.Timedelta(seconds=1)
+    settings = {'history': history, 'start': start, 'history_store': store, 'history_latency': PAGE_LATENCY,
+                'ticks': [(INSTRUMENT, first_tick.value, 1.1, 1.1002)]}
+    with contextlib.redirect_stdout(io.StringIO()):
+        began = perf_counter()
+        trader = OfflineSMACrossover(settings, INSTRUMENT, '30s', 1000, 60, Slow_MA=200, Fast_MA=50)
+        trader.get_most_recent(5)
+        trader.stream_data(INSTRUMENT)
+        seconds = perf_counter() - began
+    return seconds, trader.history_candles, trader
+
+
+# Stored candles stay complete and bounded: a later range across a hole, an append after a
+#   torn record and pruning all read back exactly the candles of the history endpoint
+def check_store(history, directory):
+    store = HistoryStore.HistoryStore(directory)
+    api = MockBroker.MockBroker({'history': history})
+    day = pd.Timedelta(days=1)
+    first = pd.Timestamp('2024-03-01 12:00')
+
+    def matches(start, end):
+        loaded = store.load(api, INSTRUMENT, start, end)
+        return loaded.c.equals(history.c.loc[start:end].rename_axis('time'))
+    assert matches(first, first + day)
+    # a warm-up starting two days after the stored candles end, then one reaching back across the gap
+    assert matches(first + 3 * day, first + 4 * day)
+    assert matches(first + 2 * day, first + 4 * day), 'hole between stored ranges'
+    with open(store.path(INSTRUMENT), 'ab') as f:
+        f.write(b'torn')
+    assert matches(first + 2 * day, first + 5 * day), 'append after a torn record'
+    assert store.read(INSTRUMENT).index[0] == first + 2 * day, 'candles before the warm-up not pruned'
+    print('history store: gaps refetched, torn record cut, {:,} candles kept after pruning'.format(
+        len(store.read(INSTRUMENT))))
+
+
+# 5-day S5 warm-up downloaded on every start vs. read from the history store
+def main():
+    rng = np.random.default_rng(100)
+    index = pd.date_range('2024-03-01', '2024-03-09', freq='5s', name='time')
+    history = pd.DataFrame({'c': 1.1 * np.exp(np.cumsum(rng.normal(0, 2e-5, len(index)))), 'complete': True},
+                           index=index)
+    with tempfile.TemporaryDirectory() as directory:
+        check_store(history, directory)
+    starts = [('first start', '2024-03-07 12:00:00'), ('restart after 10 min', '2024-03-07 12:10:00'),
+              ('restart after 6 h', '2024-03-07 18:10:00')]
+    print('history endpoint: {:.2f} s per {} candles'.format(PAGE_LATENCY, MockBroker.PAGE_SIZE))
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore.HistoryStore(directory)
+        for name, start in starts:
+            download, candles, reference = restart(history, start, None)
+            cached, fetched, trader = restart(history, start, store)
+            print('{:22s} download {:6.2f} s ({:6,} candles) | store {:6.3f} s ({:6,} candles) | same bars {}'.format(
+                name, download, candles, cached, fetched, trader.raw_data.equals(reference.raw_data)))
+
+
+if __name__ == '__main__':
+    main()
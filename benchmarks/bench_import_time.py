@@ -0,0 +1,67 @@
+import os
+import sys
+import json
+import subprocess
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PATHS = [os.path.join(ROOT, folder) for folder in
+         ('', 'utilities', 'vectorized_backtesting', 'iterative_backtesting', 'live_trading_strategies')]
+
+# milliseconds an entry module may take to import once numpy and pandas are loaded; matplotlib
+# alone costs about a second, so the budget catches a heavy import without flaking on timing noise
+BUDGET = 100
+ENTRY_MODULES = ['Instrument', 'Features', 'DNNRuntime', 'Vectorized', 'WalkForward', 'SMACrossoverTest',
+                 'BollingerBandsTest', 'RSITest', 'SimpleContrarianTest', 'DeepNeuralNetworkTest', 'Iterative',
+                 'Trader', 'Replay', 'AsyncEngine', 'MultiTrader']
+# packages only some code paths need; importing an entry module must not pull them in
+HEAVY = ['matplotlib', 'yfinance', 'keras', 'tensorflow', 'numba']
+# modules that need tpqoa (the OANDA client), skipped when it is not installed
+LIVE = {'Trader', 'Replay', 'AsyncEngine', 'MultiTrader'}
+
+PROBE = '''
+import sys, time, json
+sys.path[1:1] = {paths!r}
+import numpy, pandas
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+# Imports each module in a fresh interpreter (best of `repeat`) and checks it against its budget
+def probe(module, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(paths=PATHS, module=module, heavy=HEAVY)],
+                             capture_output=True, text=True, cwd=ROOT)
+        if out.returncode != 0:
+            raise RuntimeError('import {} failed:\n{}'.format(module, out.stderr))
+        runs.append(json.loads(out.stdout.splitlines()[-1]))
+    return min(run['seconds'] for run in runs), runs[-1]['heavy']
+
+
+def has_tpqoa():
+    return subprocess.run([sys.executable, '-c', 'import tpqoa'], capture_output=True).returncode == 0
+
+
+def main(repeat=5, budget=BUDGET):
+    live = has_tpqoa()
+    failures = []
+    for module in ENTRY_MODULES:
+        if module in LIVE and not live:
+            print('{:24s} skipped (tpqoa not installed)'.format(module))
+            continue
+        seconds, heavy = probe(module, repeat)
+        ok = seconds * 1e3 <= budget and not heavy
+        print('{:24s} {:7.1f} ms  (budget {:4d})  {}{}'.format(
+            module, seconds * 1e3, budget, 'ok' if ok else 'OVER',
+            '  imports ' + ', '.join(heavy) if heavy else ''))
+        if not ok:
+            failures.append(module)
+    if failures:
+        print('over budget: ' + ', '.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+sys.path.insert(1, os.path.join(ROOT, 'vectorized_backtesting'))
+import Instrument
+import Indicators
+from SMACrossoverTest import SMACrossoverTest
+from BollingerBandsTest import BollingerBandsTest
+from RSITest import RSITest
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+RTOL = 1e-9
+ATOL = 1e-10
+
+
+# FEED - values of a fresh indicator after every element of values
+def feed(indicator, values):
+    return np.array([indicator.update(x) for x in values.tolist()])
+
+
+# CHECK - asserts that the incremental values equal the reference (NaN where it is NaN)
+def check(name, incremental, reference):
+    incremental = np.asarray(incremental, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(incremental), np.isnan(reference), err_msg=name)
+    np.testing.assert_allclose(incremental, reference, rtol=RTOL, atol=ATOL, err_msg=name)
+    valid = ~np.isnan(reference)
+    print('{:<34} {:>7,} values | max abs diff {:.1e}'.format(
+        name, valid.sum(), np.abs(incremental[valid] - reference[valid]).max()))
+
+
+# TESTER - strategy over the instrument's prices on a positional index, so results rows map back to bars
+def tester(cls, instrument, **params):
+    strategy = cls.from_instrument(instrument, 0.00007, **params)
+    strategy._data = strategy._data.reset_index(drop=True)
+    strategy.test_strategy()
+    return strategy.results
+
+
+# WILDER - Wilder's smoothing of a gain/loss series: the simple mean of the first window
+#   values, then ewm(alpha=1/window, adjust=False)
+def wilder(values, window):
+    seeded = values.iloc[window:].copy()
+    seeded.iloc[0] = values.iloc[1:window + 1].mean()
+    return seeded.ewm(alpha=1 / window, adjust=False).mean().reindex(values.index)
+
+
+# Incremental indicators fed bar by bar through data/EURUSD_HOUR.csv against the pandas
+#   values of the vectorized backtesters (and pandas ewm/rolling for the rest)
+def main(fast=50, slow=200, window=30, deviations=2, rsi_window=14):
+    instrument = Instrument.Instrument('EURUSD', None, None, source_file=SOURCE_FILE, granularity='1h')
+    price = instrument.get_data().price.reset_index(drop=True)
+    start = time.perf_counter()
+
+    results = tester(SMACrossoverTest, instrument, Fast_SMA=fast, Slow_SMA=slow)
+    check('SMA {} vs SMACrossoverTest'.format(fast),
+          feed(Indicators.SMA(fast), price)[results.index], results['Fast SMA'])
+    check('SMA {} vs SMACrossoverTest'.format(slow),
+          feed(Indicators.SMA(slow), price)[results.index], results['Slow SMA'])
+
+    # BollingerBandsTest (and RSITest) compute on the bars after the first one
+    results = tester(BollingerBandsTest, instrument, SMA=window, standard_deviations=deviations)
+    bands = feed(Indicators.BollingerBands(window, deviations), price.iloc[1:])[results.index - 1]
+    check('BollingerBands lower vs test', bands[:, 0], results['Lower Band'])
+    check('BollingerBands middle vs test', bands[:, 1], results['SMA'])
+    check('BollingerBands upper vs test', bands[:, 2], results['Upper Band'])
+    check('RollingStd vs rolling().std()',
+          feed(Indicators.RollingStd(window), price), price.rolling(window).std())
+
+    results = tester(RSITest, instrument, window=rsi_window, buy_threshold=30, sell_threshold=70)
+    check('RSI vs RSITest', feed(Indicators.RSI(rsi_window), price.iloc[1:])[results.index - 1], results['RSI'])
+    change = price.diff()
+    gain, loss = change.clip(lower=0), (-change).clip(lower=0)
+    check('Wilder RSI vs ewm(alpha=1/window)', feed(Indicators.RSI(rsi_window, wilder=True), price),
+          100 - 100 / (1 + wilder(gain, rsi_window) / wilder(loss, rsi_window)))
+
+    check('EMA vs ewm(adjust=False)', feed(Indicators.EMA(fast), price), price.ewm(span=fast, adjust=False).mean())
+    macd = price.ewm(span=12, adjust=False).mean() - price.ewm(span=26, adjust=False).mean()
+    check('MACD vs ewm(adjust=False)', feed(Indicators.MACD(12, 26, 9), price),
+          macd - macd.ewm(span=9, adjust=False).mean())
+    check('RollingMin vs rolling().min()', feed(Indicators.RollingMin(window), price), price.rolling(window).min())
+    check('RollingMax vs rolling().max()', feed(Indicators.RollingMax(window), price), price.rolling(window).max())
+    print('all indicators match ({:.1f} s)'.format(time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import os
+import io
+import sys
+import time
+import contextlib
+import numpy as np
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'iterative_backtesting'))
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+import Iterative
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+
+
+# Event-driven SMA crossover over the hourly CSV: printing bar loop vs. quiet array loop
+def main(fast_sma=50, slow_sma=200, amount=100000):
+    tester = Iterative.IterativeBacktester('EURUSD', None, None, amount, use_spread=False, source_file=SOURCE_FILE)
+    tester._instrument.granularity = '1h'
+    tester.get_data()
+    price = tester.data.price
+    signals = np.where(price.rolling(fast_sma).mean() > price.rolling(slow_sma).mean(), 1.0, -1.0)
+    signals[:slow_sma - 1] = np.nan
+    print('bars: {:,} ({})'.format(len(signals), 'numba' if Iterative.jit_kernel() is not None else 'pure python'))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        slow = tester.run_positions(signals, fast=False)
+    event = time.perf_counter() - start
+    slow_log = tester.trade_history
+
+    tester.quiet = True
+    tester.run_positions(signals)  # compile when numba is available
+    start = time.perf_counter()
+    fast = tester.run_positions(signals)
+    array = time.perf_counter() - start
+
+    print('bar loop with get_values/print: {:8.1f} ms'.format(event * 1e3))
+    print('quiet array loop:               {:8.1f} ms ({:.0f}x)'.format(array * 1e3, event / array))
+    print('parity: performance {} vs {}, trade logs equal: {}'.format(
+        round(slow, 6), round(fast, 6), slow_log.equals(tester.trade_history)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import contextlib
+import io
+from time import perf_counter
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, ROOT)
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+sys.path.insert(1, os.path.join(ROOT, 'vectorized_backtesting'))
+sys.path.insert(1, os.path.join(ROOT, 'iterative_backtesting'))
+sys.path.insert(1, os.path.join(ROOT, 'live_trading_strategies'))
+import Instrument
+import Iterative
+import Metrics
+from Replay import Replay
+from SMACrossover import SMACrossover
+from SMACrossoverTest import SMACrossoverTest
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+
+
+# RECOMPUTE - the metrics from the whole history, as a dashboard without the accumulator would
+def recompute(returns, bars_per_year):
+    equity = np.cumsum(returns)
+    peak = np.maximum(np.maximum.accumulate(equity), 0.0)
+    return {
+        'annual_risk': returns.std(ddof=1) * np.sqrt(bars_per_year),
+        'cagr': np.expm1(equity[-1] * bars_per_year / len(returns)),
+        'max_drawdown': -np.expm1((equity - peak).min()),
+    }
+
+
+def max_difference(a, b):
+    return max(abs(a[key] - b[key]) / max(1.0, abs(a[key])) for key in a if not np.isnan(a[key]))
+
+
+# CLOSING_FILLS - number of fills that close or reverse a position, and how many of them made money
+def closing_fills(fills):
+    held = np.concatenate([[0], np.cumsum(fills.units.to_numpy())[:-1]])
+    closing = held * fills.units.to_numpy() < 0
+    return int(closing.sum()), int((closing & (fills.pl.to_numpy() > 0)).sum())
+
+
+# Per-bar updates vs recomputing on every bar, and parity of the vectorized, iterative and
+#   bar-by-bar accumulators over the hourly SMA crossover
+def main(every=1000):
+    instrument = Instrument.Instrument('EURUSD', None, None, source_file=SOURCE_FILE, granularity='1h')
+    tester = SMACrossoverTest.from_instrument(instrument, 0.00007, Fast_SMA=50, Slow_SMA=200)
+    tester.test_strategy()
+    vectorized = tester.metrics()
+    returns = tester.results['strategy'].to_numpy()
+    positions = tester.results['position'].shift(1).to_numpy()
+    print('{:,} bars, {:.0f} bars per year'.format(len(returns), vectorized.bars_per_year))
+
+    streaming = Metrics.Metrics(vectorized.bars_per_year)
+    start = perf_counter()
+    for value, position in zip(returns.tolist(), positions.tolist()):
+        streaming.update(value, position)
+        streaming.snapshot()
+    seconds = perf_counter() - start
+    for pl in tester.closed_trades():
+        streaming.add_trade(pl)
+    print('streaming update + snapshot every bar: {:8.1f} ms ({:.2f} us/bar)'.format(
+        seconds * 1e3, seconds / len(returns) * 1e6))
+    start = perf_counter()
+    for bar in range(every, len(returns) + 1, every):
+        recompute(returns[:bar], vectorized.bars_per_year)
+    seconds = perf_counter() - start
+    print('full recomputation every {} bars:     {:8.1f} ms ({:.0f} us/recompute, ~{:.0f} s if every bar)'.format(
+        every, seconds * 1e3, seconds / (len(returns) // every) * 1e6, seconds * every))
+
+    full = recompute(returns, vectorized.bars_per_year)
+    print('vectorized vs recomputed: max rel diff {:.1e}'.format(
+        max_difference(full, {key: getattr(vectorized, key) for key in full})))
+    print('vectorized vs streaming:  max rel diff {:.1e}'.format(
+        max_difference(vectorized.snapshot(), streaming.snapshot())))
+
+    iterative = Iterative.IterativeBacktester('EURUSD', None, None, 100000, use_spread=False, source_file=SOURCE_FILE)
+    iterative._instrument.granularity = '1h'
+    iterative.get_data()
+    price = iterative.data.price
+    signals = np.where(price.rolling(50).mean() > price.rolling(200).mean(), 1.0, -1.0)
+    signals[:199] = np.nan
+    with contextlib.redirect_stdout(io.StringIO()):
+        iterative.run_positions(signals, fast=False)
+    bar_loop = iterative.metrics.snapshot()
+    iterative.quiet = True
+    iterative.run_positions(signals)
+    print('iterative bar loop vs array loop: max rel diff {:.1e}'.format(
+        max_difference(bar_loop, iterative.metrics.snapshot())))
+    with pd.option_context('display.width', 140):
+        print(pd.DataFrame({'vectorized': vectorized.snapshot(), 'iterative': iterative.metrics.snapshot()}).T)
+
+    # one annualization and one trade count: the live trader's hourly bars_per_year, and round
+    #   trips counted the same way by both backtesters (wins too, once costs are equal)
+    assert vectorized.bars_per_year == iterative.metrics.bars_per_year == Metrics.bars_per_year('1h')
+    assert vectorized.trades == iterative.metrics.trades
+    free = SMACrossoverTest.from_instrument(instrument, 0.0, Fast_SMA=50, Slow_SMA=200)
+    free.test_strategy()
+    assert free.metrics().wins == iterative.metrics.wins
+    run = Replay(SMACrossover, 'EUR_USD', '30s', 1000, days=1,
+                 broker={'n_ticks': 100000, 'tick_interval': '100ms'}, Slow_MA=40, Fast_MA=10)
+    results = run.run()
+    live = run.trader.metrics
+    assert live.bars_per_year == Metrics.bars_per_year('30s')
+    assert (live.trades, live.wins) == closing_fills(results['fills'])
+    print('{:.1f} bars per year everywhere | backtest trades {} | live: {} fills, {} closed trades'.format(
+        vectorized.bars_per_year, vectorized.trades, len(results['fills']), live.trades))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import os
+import sys
+from time import perf_counter
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+sys.path.insert(1, os.path.join(ROOT, 'vectorized_backtesting'))
+import Instrument
+import MonteCarlo
+from SMACrossoverTest import SMACrossoverTest
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+
+
+# CHECK_TRADES - every 'shuffle' trade holds one position, earns it on all of its bars and pays
+#   its own entry cost on its first bar
+def check_trades(tester, engine):
+    results = tester.results
+    held = results['position'].shift(1).bfill().to_numpy()
+    market = results['Returns'].to_numpy()
+    costs = results['trades'].to_numpy() * tester.tc
+    shuffled = engine.trade_returns()
+    starts, lengths = engine.trades()
+    for start, length in zip(starts, lengths):
+        run = slice(start, start + length)
+        assert (held[run] == held[start]).all()
+        expected = held[start] * market[run]
+        expected[0] -= costs[start - 1] if start > 0 else costs[0]
+        if start + length == len(held):
+            expected[-1] -= costs[-1]
+        np.testing.assert_allclose(shuffled[run], expected, rtol=0, atol=1e-15)
+    assert np.isclose(shuffled.sum(), engine.returns.sum(), rtol=0, atol=1e-12)
+    print('{:,} trades: one held position each, entry cost on their first bar'.format(len(starts)))
+
+
+# 10k resampled paths per method of the hourly SMA crossover returns, across all cores
+def main(paths=10000, n_jobs=None):
+    instrument = Instrument.Instrument('EURUSD', None, None, source_file=SOURCE_FILE, granularity='1h')
+    tester = SMACrossoverTest.from_instrument(instrument, 0.00007, Fast_SMA=50, Slow_SMA=200)
+    tester.test_strategy()
+    engine = MonteCarlo.MonteCarlo.from_tester(tester)
+    check_trades(tester, engine)
+    print('{} | {} cores | numba: {}'.format(engine, n_jobs or os.cpu_count(), MonteCarlo.jit_kernel() is not None))
+    for method in MonteCarlo.METHODS:
+        start = perf_counter()
+        engine.run(paths, methods=[method], n_jobs=n_jobs)
+        seconds = perf_counter() - start
+        print('{:<10} {:,} paths x {:,} bars: {:6.2f} s ({:,.0f} path-bars/s)'.format(
+            method, paths, len(engine.returns), seconds, paths * len(engine.returns) / seconds))
+    engine.run(paths, n_jobs=n_jobs)
+    with pd.option_context('display.width', 140, 'display.max_columns', 20):
+        print(engine.summary().round(4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+import os
+import sys
+import io
+import contextlib
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, ROOT)
+sys.path.insert(1, os.path.join(ROOT, 'live_trading_strategies'))
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+import MockBroker
+import MultiTrader
+from SMACrossover import SMACrossover
+
+INSTRUMENTS = ['EUR_USD', 'GBP_USD', 'USD_JPY', 'USD_CHF', 'AUD_USD', 'USD_CAD', 'NZD_USD', 'EUR_GBP',
+               'EUR_JPY', 'GBP_JPY', 'EUR_CHF', 'AUD_JPY', 'EUR_AUD', 'GBP_CHF', 'CAD_JPY', 'NZD_JPY',
+               'EUR_CAD', 'AUD_CAD', 'GBP_AUD', 'AUD_NZD']
+
+
+# Tick throughput of one combined stream as the number of instruments grows
+def main(ticks_per_instrument=20000, bar_length='30s'):
+    print('{:>12}{:>12}{:>10}{:>10}{:>14}'.format('instruments', 'ticks', 'bars', 'orders', 'ticks/s'))
+    for count in [1, 2, 5, 10, 20]:
+        api = MockBroker.MockBroker(n_ticks=ticks_per_instrument * count, tick_interval='50ms')
+        with contextlib.redirect_stdout(io.StringIO()):
+            trader = MultiTrader.MultiTrader(api, SMACrossover, INSTRUMENTS[:count], bar_length, 1000,
+                                             duration=7 * 24 * 60, Slow_MA=40, Fast_MA=10)
+            stats = trader.start_trade_session(days=1)
+        print('{:>12}{:>12,}{:>10,}{:>10,}{:>14,.0f}'.format(
+            count, stats['ticks'], stats['bars'], stats['orders'], stats['ticks'] / stats['tick_seconds']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import pickle
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'vectorized_backtesting'))
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+import Instrument
+from SMACrossoverTest import SMACrossoverTest
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+COLUMNS = ['performance', 'outperformance', 'trades']
+
+
+# SERIAL - one test_strategy() per parameter set, rows keyed by (Fast_SMA, Slow_SMA)
+def serial(tester, param_grid):
+    rows = {}
+    for fast in param_grid['Fast_SMA']:
+        for slow in param_grid['Slow_SMA']:
+            tester.Fast_SMA, tester.Slow_SMA = fast, slow
+            performance, _ = tester.test_strategy()
+            overview = tester.results_overview
+            rows[(fast, slow)] = [performance, round(overview['outperformance'], 6), overview['trades']]
+    return rows
+
+
+# KEYED - optimization_results as {(Fast_SMA, Slow_SMA): [performance, outperformance, trades]}
+def keyed(results):
+    return {(row.Fast_SMA, row.Slow_SMA): [getattr(row, column) for column in COLUMNS]
+            for row in results.itertuples()}
+
+
+# optimize() across a process pool vs. in process vs. serial test_strategy() runs on the hourly CSV
+def main(n_jobs=2, tc=0.00007):
+    instrument = Instrument.Instrument('EURUSD', None, None, source_file=SOURCE_FILE, granularity='1h')
+    tester = SMACrossoverTest.from_instrument(instrument, tc, Fast_SMA=50, Slow_SMA=200)
+    param_grid = {'Fast_SMA': list(range(10, 60, 10)), 'Slow_SMA': list(range(100, 260, 50))}
+
+    start = time.perf_counter()
+    expected = serial(tester, param_grid)
+    looped = time.perf_counter() - start
+    runs = {}
+    for jobs in (1, n_jobs):
+        start = time.perf_counter()
+        results = keyed(tester.optimize(param_grid, n_jobs=jobs))
+        seconds = time.perf_counter() - start
+        assert results == expected, 'optimize(n_jobs={}) differs from serial test_strategy()'.format(jobs)
+        runs[jobs] = seconds
+    print('{} parameter sets | serial test_strategy {:.2f} s | '.format(len(expected), looped) +
+          ' | '.join('optimize(n_jobs={}) {:.2f} s'.format(jobs, seconds) for jobs, seconds in runs.items()))
+
+    # results of earlier runs stay in the parent process
+    tester.test_grid(param_grid['Fast_SMA'], param_grid['Slow_SMA'])
+    state = tester.worker_state()
+    assert not {'results', 'results_overview', 'optimization_results', 'grid_results'} & set(state)
+    print('worker state after optimize() and test_grid(): {} ({:,} bytes pickled)'.format(
+        sorted(state), len(pickle.dumps(state))))
+    print('optimize() matches serial test_strategy() for n_jobs=1 and n_jobs={}'.format(n_jobs))
+
+
+if __name__ == '__main__':
+    main()
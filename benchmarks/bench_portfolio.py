@@ -0,0 +1,71 @@
+import os
+import sys
+from time import perf_counter
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+sys.path.insert(1, os.path.join(ROOT, 'vectorized_backtesting'))
+import Portfolio
+from SMACrossoverTest import SMACrossoverTest
+from BollingerBandsTest import BollingerBandsTest
+from RSITest import RSITest
+from SimpleContrarianTest import SimpleContrarianTest
+from DeepNeuralNetworkTest import DeepNeuralNetworkTest
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+STRATEGIES = [
+    (SMACrossoverTest, {'Fast_SMA': 50, 'Slow_SMA': 200}),
+    (BollingerBandsTest, {'SMA': 30, 'standard_deviations': 2}),
+    (RSITest, {'window': 14, 'buy_threshold': 30, 'sell_threshold': 70}),
+    (SimpleContrarianTest, {'window': 3}),
+]
+
+
+# EURUSD_HOUR.csv plus n - 1 random walks of the same volatility on its timestamps
+def pairs(n, seed=100):
+    price = pd.read_csv(SOURCE_FILE, parse_dates=['time'], index_col='time').price
+    volatility = np.log(price).diff().std()
+    rng = np.random.default_rng(seed)
+    walks = price.iloc[0] * np.exp(np.cumsum(rng.normal(0, volatility, (len(price), n - 1)), axis=0))
+    prices = pd.DataFrame(np.round(walks, 5), index=price.index, columns=['PAIR_{}'.format(i) for i in range(1, n)])
+    prices.insert(0, 'EURUSD', price)
+    return prices
+
+
+# 28 instruments: one test_strategy() per instrument vs one Portfolio pass, with per-instrument parity
+def main(n=28, tc=0.00007):
+    prices = pairs(n)
+    print('{} instruments x {:,} bars'.format(n, len(prices)))
+    for tester_class, params in STRATEGIES:
+        start = perf_counter()
+        single = {}
+        for column in prices:
+            tester = tester_class(column, None, None, tc, granularity='1h', **params)
+            tester._data = prices[[column]].rename(columns={column: 'price'})
+            tester.test_strategy()
+            single[column] = tester.results_overview
+        looped = perf_counter() - start
+
+        portfolio = Portfolio.Portfolio(tester_class('ALL', None, None, tc, granularity='1h', **params), prices)
+        start = perf_counter()
+        portfolio.test_strategy()
+        batched = perf_counter() - start
+        overview = portfolio.results_overview
+        error = max(abs(overview.loc[column, stat] - single[column][stat]) / max(1.0, abs(single[column][stat]))
+                    for column in prices for stat in Portfolio.STATS)
+        print('{:<22} per instrument {:8.1f} ms | portfolio {:8.1f} ms ({:4.1f}x) | max rel diff {:.1e}'.format(
+            tester_class.__name__, looped * 1e3, batched * 1e3, looped / batched, error))
+    print(overview.loc[['EURUSD', 'Portfolio']])
+
+    # a tester without a column-wise positions() is refused up front
+    try:
+        Portfolio.Portfolio(DeepNeuralNetworkTest('ALL', None, None, tc, granularity='1h'), prices)
+    except TypeError as error:
+        print('DeepNeuralNetworkTest refused: {}'.format(error))
+    else:
+        raise AssertionError('Portfolio accepted a tester without positions()')
+
+
+if __name__ == '__main__':
+    main()
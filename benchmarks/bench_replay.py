@@ -0,0 +1,28 @@
+import os
+import sys
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, ROOT)
+sys.path.insert(1, os.path.join(ROOT, 'live_trading_strategies'))
+from Replay import Replay
+from SMACrossover import SMACrossover
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+
+
+# SMACrossover replayed over the hourly CSV expanded to ticks, then over synthetic ticks
+def main(ticks_per_bar=20):
+    replay = Replay.from_csv(SMACrossover, SOURCE_FILE, 'EUR_USD', '1h', 1000, ticks_per_bar=ticks_per_bar,
+                             Slow_MA=200, Fast_MA=50)
+    replay.run()
+    print('--- EURUSD_HOUR.csv, {} ticks per bar ---'.format(ticks_per_bar))
+    replay.print_report()
+
+    replay = Replay(SMACrossover, 'EUR_USD', '30s', 1000, days=1,
+                    broker={'n_ticks': 500000, 'tick_interval': '100ms'}, Slow_MA=40, Fast_MA=10)
+    replay.run()
+    print('--- synthetic ticks ---')
+    replay.print_report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+import Resampler
+
+BAR_LENGTHS = ['30s', '5min', '1h']
+
+
+# Ticks about one second apart (irregular), as a price series
+def ticks(n, seed=100):
+    rng = np.random.default_rng(seed)
+    offsets = np.cumsum(rng.exponential(1e9, n)).astype(np.int64)
+    index = pd.DatetimeIndex((pd.Timestamp('2024-01-01').value + offsets).view('datetime64[ns]'), name='time')
+    return pd.Series(1.1 * np.exp(np.cumsum(rng.normal(0, 1e-5, n))), index=index)
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+# min/max/last resample calls per bar length (as Trader did) and pandas ohlc() vs. one Resampler pass
+def main(n=5_000_000):
+    prices = ticks(n)
+    frame = prices.to_frame('price')
+
+    def three_calls():
+        bars = {}
+        for bar_length in BAR_LENGTHS:
+            low = frame.resample(bar_length, label='right').min().dropna()
+            high = frame.resample(bar_length, label='right').max().dropna()
+            close = frame.resample(bar_length, label='right').last().dropna()
+            bars[bar_length] = (close.price, high.price.reindex(close.index), low.price.reindex(close.index))
+        return bars
+
+    def pandas_ohlc():
+        return {bar_length: prices.resample(bar_length, label='right').ohlc().dropna() for bar_length in BAR_LENGTHS}
+
+    reference, slow = best_of(three_calls)
+    _, ohlc = best_of(pandas_ohlc)
+    bars, fast = best_of(lambda: Resampler.resample(prices, BAR_LENGTHS))
+    print('{:,} ticks -> {} bars'.format(n, ', '.join('{:,} x {}'.format(len(bars[b]), b) for b in BAR_LENGTHS)))
+    print('pandas min/max/last per bar length: {:7.1f} ms'.format(slow * 1e3))
+    print('pandas ohlc() per bar length:       {:7.1f} ms'.format(ohlc * 1e3))
+    print('Resampler, all bar lengths at once: {:7.1f} ms ({:.1f}x / {:.1f}x)'.format(fast * 1e3, slow / fast, ohlc / fast))
+    same = all(
+        bars[b].index.equals(reference[b][0].index)
+        and np.array_equal(bars[b][['close', 'high', 'low']].to_numpy(), np.column_stack(reference[b]))
+        for b in BAR_LENGTHS
+    )
+    print('parity with the three-call result: {}'.format(same))
+
+
+if __name__ == '__main__':
+    main()
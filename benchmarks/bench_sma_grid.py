@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import numpy as np
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'vectorized_backtesting'))
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+import Instrument
+from SMACrossoverTest import SMACrossoverTest
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+
+# Batched SMA grid vs. one test_strategy() per combination on the hourly CSV
+def main(tc=0.00007):
+    instrument = Instrument.Instrument('EURUSD', None, None, source_file=SOURCE_FILE, granularity='1h')
+    tester = SMACrossoverTest.from_instrument(instrument, tc, Fast_SMA=50, Slow_SMA=200)
+    fast_windows = np.arange(10, 110, 5)
+    slow_windows = np.arange(100, 300, 10)
+
+    start = time.perf_counter()
+    tester.test_strategy()
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = tester.test_grid(fast_windows, slow_windows)
+    grid = time.perf_counter() - start
+
+    combos = matrix.size
+    print('single test_strategy: {:.1f} ms'.format(single * 1e3))
+    print('grid of {} combinations: {:.1f} ms ({:.1f} single runs)'.format(combos, grid * 1e3, grid / single))
+
+    for fast, slow in [(fast_windows[0], slow_windows[0]), (fast_windows[-1], slow_windows[-1])]:
+        tester.Fast_SMA, tester.Slow_SMA = int(fast), int(slow)
+        single_run = tester.test_strategy()
+        row = tester.grid_results.set_index(['Fast_SMA', 'Slow_SMA']).loc[(fast, slow)]
+        grid_run = round(row.performance, 6), round(row.buy_and_hold, 6)
+        print('parity ({}, {}): test_strategy={} grid={}'.format(fast, slow, single_run, grid_run))
+
+
+if __name__ == '__main__':
+    main()
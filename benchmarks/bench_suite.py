@@ -0,0 +1,298 @@
+import os
+import io
+import sys
+import json
+import math
+import shutil
+import argparse
+import platform
+import tempfile
+import datetime
+import contextlib
+import subprocess
+from time import perf_counter
+import numpy as np
+import pandas as pd
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, ROOT)
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+sys.path.insert(1, os.path.join(ROOT, 'vectorized_backtesting'))
+sys.path.insert(1, os.path.join(ROOT, 'iterative_backtesting'))
+sys.path.insert(1, os.path.join(ROOT, 'live_trading_strategies'))
+import BarCache
+import Features
+import DNNRuntime
+import Instrument
+import Iterative
+from SMACrossoverTest import SMACrossoverTest
+from BollingerBandsTest import BollingerBandsTest
+from RSITest import RSITest
+from SimpleContrarianTest import SimpleContrarianTest
+from DeepNeuralNetworkTest import DeepNeuralNetworkTest
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+SCALES = [1, 10, 100]
+# Vectorized subclasses and the parameters they are timed with
+VECTORIZED = [
+    (SMACrossoverTest, {'Fast_SMA': 50, 'Slow_SMA': 200}),
+    (BollingerBandsTest, {'SMA': 30, 'standard_deviations': 2}),
+    (RSITest, {'window': 14, 'buy_threshold': 30, 'sell_threshold': 70}),
+    (SimpleContrarianTest, {'window': 3}),
+]
+# the lagged feature matrix takes ~350 bytes a bar, so the DNN steps stop here
+DNN_MAX_ROWS = 2000000
+# synthetic ticks streamed through the live path per unit of scale
+LIVE_TICKS = 20000
+TC = 0.00007
+SYNTHETIC_BAR = '1min'
+
+
+# WRITE_DATASET - (close-price CSV, bar length) with scale times the bars of EURUSD_HOUR.csv
+#   scale 1 is the CSV itself; larger scales are a one-minute random walk of the same volatility
+#   (100 times the hourly bars would run past the last date pandas can hold)
+def write_dataset(directory, scale, seed=100):
+    if scale == 1:
+        return SOURCE_FILE, '1h'
+    path = os.path.join(directory, 'EURUSD_x{}.csv'.format(scale))
+    if os.path.exists(path):
+        return path, SYNTHETIC_BAR
+    price = pd.read_csv(SOURCE_FILE, parse_dates=['time'], index_col='time').price
+    volatility = np.log(price).diff().std() * math.sqrt(pd.Timedelta(SYNTHETIC_BAR) / pd.Timedelta('1h'))
+    rng = np.random.default_rng(seed)
+    n = len(price) * scale
+    index = pd.date_range(price.index[0], periods=n, freq=SYNTHETIC_BAR, name='time')
+    walk = price.iloc[0] * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    pd.DataFrame({'price': np.round(walk, 5)}, index=index).to_csv(path)
+    return path, SYNTHETIC_BAR
+
+
+# WRITE_MODEL - .npz runtime with random weights and the input columns of Features.build
+def write_model(directory, layers=(50, 50), lags=8, seed=100):
+    rng = np.random.default_rng(seed)
+    columns = Features.lag_columns(Features.FEATURES, lags)
+    sizes = [len(columns)] + list(layers) + [1]
+    arrays = {}
+    for i, (rows, cols) in enumerate(zip(sizes[:-1], sizes[1:])):
+        arrays['kernel_{}'.format(i)] = rng.normal(0, 1 / math.sqrt(rows), (rows, cols)).astype(np.float32)
+        arrays['bias_{}'.format(i)] = np.zeros(cols, dtype=np.float32)
+    activations = ['relu'] * len(layers) + ['sigmoid']
+    path = os.path.join(directory, 'model.npz')
+    np.savez(path, columns=np.array(columns), activations=np.array(activations),
+             mu=np.zeros(len(columns), dtype=np.float32), sigma=np.ones(len(columns), dtype=np.float32), **arrays)
+    return path
+
+
+# TIMEIT - best and mean wall time of `repeat` calls of fn (its output discarded)
+#   a fn that times itself returns a Timed with the seconds of the part that counts
+def timeit(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = perf_counter()
+            out = fn()
+            seconds = perf_counter() - start
+        times.append(out if isinstance(out, Timed) else seconds)
+    return float(min(times)), float(sum(times) / len(times))
+
+
+class Timed(float):
+    pass
+
+
+# BENCHMARK SUITE
+        # Times every engine on one dataset per scale and collects the results as
+        # JSON-ready records: data load (CSV parse/resample, bar cache), each
+        # Vectorized subclass's test_strategy, the iterative position loop, DNN
+        # feature building and inference, and live tick throughput through
+        # Trader.on_success with the mock broker (skipped without tpqoa).
+        # Caches are kept in a temporary directory so runs start from the same state.
+        # Parameters
+        # ----------
+        # scales: list (default = SCALES)
+        #     dataset sizes as multiples of EURUSD_HOUR.csv
+        # repeat: int (default = 3)
+        #     calls per step; the best time is the one compared
+        # only: list (default = None)
+        #     name prefixes of the steps to run (e.g. ['load', 'vectorized']); None runs all
+class Suite:
+    def __init__(self, scales=None, repeat=3, only=None):
+        self.scales = list(scales or SCALES)
+        self.repeat = repeat
+        self.only = only
+        self.results = []
+
+    def __repr__(self):
+        return "Suite(scales={}, repeat={}, results={})".format(self.scales, self.repeat, len(self.results))
+
+    # RUN - runs every step at every scale; returns the report (meta + results)
+    def run(self, verbose=True):
+        directory = tempfile.mkdtemp(prefix='bench-suite-')
+        default_cache, feature_dir = BarCache.default_cache, Features.CACHE_DIR
+        BarCache.default_cache = BarCache.BarCache(os.path.join(directory, 'bar_cache'))
+        Features.CACHE_DIR = os.path.join(directory, 'feature_cache')
+        try:
+            model = write_model(directory)
+            for scale in self.scales:
+                source_file, bar_length = write_dataset(directory, scale)
+                for name, fn, rows, skip in self.steps(source_file, bar_length, scale, model, directory):
+                    if self.wanted(name):
+                        self.record(name, scale, rows, fn, skip, verbose)
+        finally:
+            BarCache.default_cache, Features.CACHE_DIR = default_cache, feature_dir
+            shutil.rmtree(directory, ignore_errors=True)
+        return self.report()
+
+    # WANTED - whether a step (or a group of steps, by prefix) is selected by `only`
+    def wanted(self, name):
+        return not self.only or any(name.startswith(prefix) or prefix.startswith(name) for prefix in self.only)
+
+    # STEPS - (name, fn, rows, reason skipped or None) of one dataset
+    #   set-up outside the timed functions (loading, warm-up calls) runs lazily, step by step
+    def steps(self, source_file, bar_length, scale, model, directory):
+        instrument = Instrument.Instrument('EURUSD', None, None, source_file=source_file, granularity=bar_length)
+        cache = BarCache.BarCache(os.path.join(directory, 'load_cache'))
+        cache.load(source_file, instrument.read_source, bar_length)
+        rows = len(instrument.get_data())
+
+        yield 'load.csv', instrument.read_source, rows, None
+        yield 'load.bar_cache', lambda: cache.load(source_file, instrument.read_source, bar_length), rows, None
+
+        if self.wanted('vectorized'):
+            for tester_class, params in VECTORIZED:
+                tester = tester_class.from_instrument(instrument, TC, **params)
+                yield 'vectorized.{}'.format(tester_class.__name__), tester.test_strategy, rows, None
+
+        if self.wanted('iterative'):
+            tester = Iterative.IterativeBacktester.from_instrument(instrument, 100000, use_spread=False, quiet=True)
+            tester._instrument.granularity = bar_length
+            tester.get_data()
+            price = tester.data.price
+            signals = np.where(price.rolling(50).mean() > price.rolling(200).mean(), 1.0, -1.0)
+            signals[:199] = np.nan
+            tester.run_positions(signals)  # compile when numba is available
+            yield 'iterative.run_positions', lambda: tester.run_positions(signals), rows, None
+
+        if self.wanted('dnn') or self.wanted('vectorized.DeepNeuralNetworkTest'):
+            skip = 'more than {:,} bars'.format(DNN_MAX_ROWS) if rows > DNN_MAX_ROWS else None
+            price = instrument.get_data().price
+            yield 'dnn.features', lambda: Features.build(price, cache=False), rows, skip
+            if skip is None:
+                runtime = DNNRuntime.NumpyDNN(model)
+                raw = Features.build(price, cache=False).flat()
+                tester = DeepNeuralNetworkTest.from_instrument(instrument, TC)
+                tester.load_model(model)
+                tester.test_strategy()  # writes the feature cache
+                one = raw[:1000]
+                yield 'dnn.predict_raw', lambda: runtime.predict_raw(raw), len(raw), None
+                yield 'dnn.predict_one', lambda: [runtime.predict_one(row) for row in one], len(one), None
+                yield 'vectorized.DeepNeuralNetworkTest', tester.test_strategy, rows, None
+            else:
+                for name in ('dnn.predict_raw', 'dnn.predict_one', 'vectorized.DeepNeuralNetworkTest'):
+                    yield name, None, rows, skip
+
+        if self.wanted('live'):
+            yield from self.live_steps(scale)
+
+    # LIVE_STEPS - SMACrossover fed synthetic ticks; one run streams LIVE_TICKS * scale ticks
+    #   only the stream is timed, not the construction and warm-up of the trader
+    def live_steps(self, scale):
+        n_ticks = LIVE_TICKS * scale
+        try:
+            from Replay import Replay
+            from SMACrossover import SMACrossover
+        except ImportError as error:
+            yield 'live.on_success', None, n_ticks, 'cannot import the live path ({})'.format(error)
+            return
+
+        def replay():
+            replay = Replay(SMACrossover, 'EUR_USD', '30s', 1000, days=1,
+                            broker={'n_ticks': n_ticks, 'tick_interval': '100ms'}, Slow_MA=40, Fast_MA=10)
+            return replay.run()['seconds']
+        yield 'live.on_success', lambda: Timed(replay()), n_ticks, None
+
+    # RECORD - times one step and appends its result
+    def record(self, name, scale, rows, fn, skip, verbose):
+        result = {'name': name, 'scale': scale, 'rows': rows}
+        if skip is not None:
+            result['skipped'] = skip
+        else:
+            best, mean = timeit(fn, self.repeat)
+            result.update({'seconds': best, 'mean': mean, 'runs': self.repeat, 'rows_per_second': rows / best})
+        self.results.append(result)
+        if verbose:
+            if skip is not None:
+                print('{:<36} x{:<4} skipped: {}'.format(name, scale, skip))
+            else:
+                print('{:<36} x{:<4} {:>12,} rows {:>10.2f} ms {:>14,.0f} rows/s'.format(
+                    name, scale, rows, result['seconds'] * 1e3, result['rows_per_second']))
+
+    # REPORT - results with the versions, machine and commit they were measured on
+    def report(self):
+        return {'meta': meta(), 'repeat': self.repeat, 'results': self.results}
+
+
+# META - environment of a run, so reports from different machines are not compared blindly
+def meta():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'numba': Iterative.jit_kernel() is not None,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+# COMPARE - steps whose best time grew by more than threshold (fraction) between two reports
+def compare(old, new, threshold=0.25):
+    before = {(r['name'], r['scale']): r for r in old['results'] if 'seconds' in r}
+    regressions = []
+    print('{:<36} {:>5} {:>11} {:>11} {:>8}'.format('step', 'scale', 'old ms', 'new ms', 'ratio'))
+    for result in new['results']:
+        previous = before.get((result['name'], result['scale']))
+        if previous is None or 'seconds' not in result:
+            continue
+        ratio = result['seconds'] / previous['seconds']
+        flag = ' REGRESSION' if ratio > 1 + threshold else ''
+        print('{:<36} {:>5} {:>11.2f} {:>11.2f} {:>7.2f}x{}'.format(
+            result['name'], result['scale'], previous['seconds'] * 1e3, result['seconds'] * 1e3, ratio, flag))
+        if flag:
+            regressions.append(dict(result, baseline=previous['seconds'], ratio=ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time every backtesting and live engine offline; write JSON.')
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES,
+                        help='dataset sizes as multiples of EURUSD_HOUR.csv (default: 1 10 100)')
+    parser.add_argument('--repeat', type=int, default=3, help='calls per step, best time kept (default: 3)')
+    parser.add_argument('--only', nargs='+', help='name prefixes of the steps to run, e.g. load vectorized')
+    parser.add_argument('--output', help='JSON file written (default: print only)')
+    parser.add_argument('--compare', help='earlier JSON report to compare against; exits 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='slowdown counted as a regression with --compare (default: 0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    report = Suite(args.scales, args.repeat, args.only).run()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print('wrote {}'.format(args.output))
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print('{} step(s) slower than {:.0%} over the baseline'.format(len(regressions), args.threshold))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import io
+import json
+import contextlib
+import tempfile
+import urllib.request
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, ROOT)
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+sys.path.insert(1, os.path.join(ROOT, 'live_trading_strategies'))
+import Telemetry
+import MockBroker
+import MultiTrader
+from Replay import Replay
+from SMACrossover import SMACrossover
+
+
+def replay(n_ticks, telemetry=None, progress_interval=1000):
+    run = Replay(SMACrossover, 'EUR_USD', '30s', 1000, days=1,
+                 broker={'n_ticks': n_ticks, 'tick_interval': '100ms', 'order_latency': 0.0005},
+                 Slow_MA=40, Fast_MA=10)
+    run.trader.telemetry = telemetry
+    run.trader.progress_interval = progress_interval
+    return run.run()
+
+
+# Tick throughput of the live loop with telemetry off and on, the per-stage latencies it
+#   records, and its JSON-file and Prometheus exports
+def main(n_ticks=300000, repeat=3):
+    for label, progress in [('tick count printed every tick (old)', 1), ('tick count every 1000 ticks', 1000)]:
+        best = max(replay(n_ticks, progress_interval=progress)['ticks_per_second'] for _ in range(repeat))
+        print('{:<48} {:>10,.0f} ticks/s'.format('telemetry off, ' + label, best))
+    telemetry = Telemetry.Telemetry(labels={'instrument': 'EUR_USD'})
+    results = []
+    for _ in range(repeat):
+        telemetry.reset()
+        results.append(replay(n_ticks, telemetry)['ticks_per_second'])
+    print('{:<48} {:>10,.0f} ticks/s'.format('telemetry on', max(results)))
+
+    snapshot = telemetry.snapshot()
+    print('counters: {}'.format(snapshot['counters']))
+    for name, summary in snapshot['latency'].items():
+        print('{:<18} n={:>6,} mean {:>9.1f} us | p50 <= {:>8.1f} us | p99 <= {:>8.1f} us | max {:>9.1f} us'.format(
+            name, summary['count'], summary['mean'] * 1e6, summary['p50'] * 1e6, summary['p99'] * 1e6,
+            summary['max'] * 1e6))
+
+    # the same stages recorded through AsyncEngine, one Telemetry per instrument
+    api = MockBroker.MockBroker(n_ticks=40000, tick_interval='50ms', order_latency=0.0005)
+    engine_telemetry = {instrument: Telemetry.Telemetry(labels={'instrument': instrument})
+                        for instrument in ['EUR_USD', 'GBP_USD']}
+    with contextlib.redirect_stdout(io.StringIO()):
+        MultiTrader.MultiTrader(api, SMACrossover, list(engine_telemetry), '30s', 1000, duration=7 * 24 * 60,
+                                telemetry=engine_telemetry, Slow_MA=40, Fast_MA=10).start_trade_session(days=1)
+    for instrument, recorded in engine_telemetry.items():
+        snapshot = recorded.snapshot()
+        missing = {'join', 'strategy', 'execute', 'tick_to_decision', 'decision_to_fill'} - set(snapshot['latency'])
+        assert not missing, 'AsyncEngine did not record {}'.format(missing)
+        print('AsyncEngine {}: {} | decision_to_fill p50 <= {:.1f} us'.format(
+            instrument, snapshot['counters'], snapshot['latency']['decision_to_fill']['p50'] * 1e6))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'telemetry.jsonl')
+        for _ in range(5):
+            telemetry.write(path, max_bytes=2048, backups=2)
+        files = sorted(os.listdir(directory))
+        with open(path) as f:
+            json.loads(f.readline())
+        print('rotating file: {}'.format(files))
+    server = telemetry.serve(port=0)
+    url = 'http://127.0.0.1:{}/metrics'.format(server.server_address[1])
+    body = urllib.request.urlopen(url).read().decode('utf-8')
+    server.shutdown()
+    print('prometheus endpoint: {} lines, e.g. {}'.format(len(body.splitlines()), body.splitlines()[1]))
+
+
+if __name__ == '__main__':
+    main()
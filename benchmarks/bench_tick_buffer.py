@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utilities'))
+import TickBuffer
+
+
+# SYNTHETIC_TICKS - random-walk mid prices with irregular (exponential) tick spacing
+def synthetic_ticks(n, mean_gap_ms=250, seed=100):
+    rng = np.random.default_rng(seed)
+    gaps = rng.exponential(mean_gap_ms * 1e6, n).astype(np.int64) + 1
+    times = pd.Timestamp('2023-08-01').value + np.cumsum(gaps)
+    prices = 1.1 + np.cumsum(rng.normal(0, 1e-5, n))
+    return times, prices
+
+
+# Old path: one-row DataFrame + pd.concat per tick, resampled three times per bar
+def concat_path(times, prices, bar_length):
+    tick_data = pd.DataFrame()
+    last_bar = None
+    for t, price in zip(pd.DatetimeIndex(times), prices):
+        tick_data = pd.concat([tick_data, pd.DataFrame({'EUR_USD': price}, index=[t])])
+        if last_bar is None:
+            last_bar = t.ceil(bar_length)
+        elif t - last_bar > bar_length:
+            temp = tick_data.resample(bar_length, label='right').last().ffill().iloc[:-1]
+            temp['High'] = tick_data.resample(bar_length, label='right').max().dropna()
+            temp['Low'] = tick_data.resample(bar_length, label='right').min().dropna()
+            tick_data = tick_data.iloc[-1:]
+            last_bar = temp.index[-1]
+
+
+def buffer_path(times, prices, bar_length):
+    buffer = TickBuffer.TickBuffer(bar_length)
+    bars = 0
+    for t, price in zip(times.tolist(), prices.tolist()):
+        bars += len(buffer.add(t, price))
+    return bars
+
+
+def main(bar_length='30s'):
+    times, prices = synthetic_ticks(1_000_000)
+    start = time.perf_counter()
+    bars = buffer_path(times, prices, bar_length)
+    elapsed = time.perf_counter() - start
+    print('TickBuffer: {:,} ticks, {:,} bars, {:.2f} us/tick, {:,.0f} ticks/s'.format(
+        len(times), bars, elapsed / len(times) * 1e6, len(times) / elapsed))
+
+    n = 5_000
+    start = time.perf_counter()
+    concat_path(times[:n], prices[:n], pd.Timedelta(bar_length))
+    elapsed = time.perf_counter() - start
+    print('pd.concat per tick: {:,} ticks, {:.2f} us/tick, {:,.0f} ticks/s'.format(
+        n, elapsed / n * 1e6, n / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+import itertools
+import numpy as np
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, os.path.join(ROOT, 'vectorized_backtesting'))
+sys.path.insert(1, os.path.join(ROOT, 'utilities'))
+import Instrument
+from SMACrossoverTest import SMACrossoverTest
+from WalkForward import WalkForward
+
+SOURCE_FILE = os.path.join(ROOT, 'data', 'EURUSD_HOUR.csv')
+
+
+# Walk-forward SMA optimization on the hourly CSV: driver vs. re-running every fold from scratch
+def main(tc=0.00007, train='730D', test='180D', n_jobs=None):
+    instrument = Instrument.Instrument('EURUSD', None, None, source_file=SOURCE_FILE, granularity='1h')
+    tester = SMACrossoverTest.from_instrument(instrument, tc, Fast_SMA=50, Slow_SMA=200)
+    grid = {'Fast_SMA': list(range(10, 110, 10)), 'Slow_SMA': list(range(100, 300, 20))}
+    walk = WalkForward(tester, grid, train, test)
+    data = tester._data
+
+    # naive: slice the data per fold and recompute every indicator on it
+    start = time.perf_counter()
+    for train_start, train_end, test_start, test_end in walk.fold_bounds().view('datetime64[ns]'):
+        tester._data = data.loc[train_start:test_start - np.timedelta64(1, 'ns')]
+        best = max(itertools.product(*grid.values()), key=lambda combo: _score(tester, combo))
+        tester._data = data.loc[test_start:test_end - np.timedelta64(1, 'ns')]
+        _score(tester, best)
+    naive = time.perf_counter() - start
+    tester._data = data
+
+    start = time.perf_counter()
+    folds = walk.run(n_jobs=n_jobs)
+    driver = time.perf_counter() - start
+
+    print('{} folds x {} parameter sets'.format(len(folds), len(list(itertools.product(*grid.values())))))
+    print('naive per-fold recomputation: {:.2f}s'.format(naive))
+    print('walk-forward driver:          {:.2f}s ({:.1f}x)'.format(driver, naive / driver))
+    print('stitched out-of-sample performance: {:.4f} (buy and hold {:.4f})'.format(
+        *walk.equity_curve.iloc[-1][['Strategy Cumulative Returns', 'Standard Cumulative Returns']]))
+
+
+def _score(tester, combo):
+    tester.Fast_SMA, tester.Slow_SMA = combo
+    return tester.test_strategy(lean=True)[0]
+
+
+if __name__ == '__main__':
+    main()
@@ -12,10 +12,16 @@ def set_seeds(seed = 100):
     np.random.seed(seed)
     tf.random.set_seed(seed)
     
+# balanced class weights of the Direction column of a frame, or of an iterable of
+#   0/1 label chunks counted in one streaming pass (e.g. FeatureStore.labels())
 def cw(df):
-    c0, c1 = np.bincount(df['Direction'])
-    w0 = (1/c0) * (len(df)) / 2
-    w1 = (1/c1) * (len(df)) / 2
+    chunks = [df['Direction']] if hasattr(df, 'columns') else df
+    counts = np.zeros(2, dtype=np.int64)
+    for chunk in chunks:
+        counts += np.bincount(np.asarray(chunk, dtype=np.int64), minlength=2)
+    c0, c1 = counts
+    w0 = (1/c0) * (c0 + c1) / 2
+    w1 = (1/c1) * (c0 + c1) / 2
     return {0:w0, 1:w1}
 
 optimizer = Adam(learning_rate = 0.0001)
@@ -1,11 +1,21 @@
 
+import os
+import json
+import math
+import time
 import random
+import hashlib
+import itertools
+import multiprocessing
 import numpy as np
+import pandas as pd
 import tensorflow as tf
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from keras.layers import Dense, Dropout
-from keras.models import Sequential
+from keras.models import Sequential, load_model
 from keras.regularizers import l1, l2
 from keras.optimizers import Adam
+from keras.callbacks import EarlyStopping
 from scikeras.wrappers import KerasClassifier
 
 def set_seeds(seed = 100):
@@ -13,10 +23,16 @@ def set_seeds(seed = 100):
     np.random.seed(seed)
     tf.random.set_seed(seed)
     
+# balanced class weights of the Direction column of a frame, or of an iterable of
+#   0/1 label chunks counted in one streaming pass (e.g. FeatureStore.labels())
 def cw(df):
-    c0, c1 = np.bincount(df['Direction'])
-    w0 = (1/c0) * (len(df)) / 2
-    w1 = (1/c1) * (len(df)) / 2
+    chunks = [df['Direction']] if hasattr(df, 'columns') else df
+    counts = np.zeros(2, dtype=np.int64)
+    for chunk in chunks:
+        counts += np.bincount(np.asarray(chunk, dtype=np.int64), minlength=2)
+    c0, c1 = counts
+    w0 = (1/c0) * (c0 + c1) / 2
+    w1 = (1/c1) * (c0 + c1) / 2
     return {0:w0, 1:w1}
 
 # 2 layers, 100 nodes by default
@@ -33,7 +49,7 @@ def create_model(hl=3, hu=50, dropout=False, rate=0.3, regularize=False,
     
     for layer in range(hl):
         model.add(Dense(hu, activation="relu", activity_regularizer=reg))
-        if use_dropout:
+        if dropout:
             model.add(Dropout(rate, seed=100))
     
     model.add(Dense(1, activation="sigmoid"))
@@ -50,3 +66,245 @@ def create_keras_model(hl=3, hu=50, dropout=False, rate=0.3, regularize=False,
                            reg=reg, input_dim=input_dim, epochs=150, batch_size=32, verbose=0)
 
 
+# SUCCESSIVE-HALVING SEARCH OVER create_model
+        # Every candidate is trained on every fold for a small epoch budget; only
+        # the best 1/eta (by mean validation accuracy) move on to the next rung,
+        # where the budget grows by eta, until the survivors reach max_epochs.
+        # A rung continues training the saved model of the previous one rather
+        # than starting over, and a candidate whose early stopping fired keeps its
+        # score without further training.
+        # The standardized fold data is written once to the search directory and
+        # memory-mapped by the workers. Every finished (candidate, fold, budget)
+        # is appended to trials.jsonl there, so calling run() again resumes the
+        # search after the last finished trial.
+        # Parameters
+        # ----------
+        # param_grid: dict
+        #     create_model arguments mapped to lists of values (like GridSearchCV)
+        # directory: str
+        #     folder holding fold data, saved models and trials.jsonl
+        # min_epochs: int (default = 5)
+        #     smallest budget of the first rung
+        # max_epochs: int (default = 150)
+        #     budget of the last rung
+        # eta: int (default = 3)
+        #     budget growth and survivor ratio between rungs
+        # folds: int (default = 3)
+        #     contiguous cross-validation folds; each is standardized with its own training rows
+        # patience: int (default = 10)
+        #     epochs without a lower validation loss before a trial stops early
+        # n_candidates: int (default = None)
+        #     random sample of the grid to start from; None takes the whole grid
+        # n_jobs: int (default = None)
+        #     worker processes; None uses one per CPU
+        # threads: int (default = 1)
+        #     TensorFlow intra-op threads per worker
+class SuccessiveHalving:
+    def __init__(self, param_grid, directory, min_epochs=5, max_epochs=150, eta=3, folds=3, patience=10,
+                 n_candidates=None, n_jobs=None, threads=1, batch_size=32, seed=100):
+        self.param_grid = param_grid
+        self.directory = directory
+        self.min_epochs = min_epochs
+        self.max_epochs = max_epochs
+        self.eta = eta
+        self.folds = folds
+        self.patience = patience
+        self.n_candidates = n_candidates
+        self.n_jobs = n_jobs
+        self.threads = threads
+        self.batch_size = batch_size
+        self.seed = seed
+        self.results = None
+
+    def __repr__(self):
+        return "SuccessiveHalving(candidates={}, budgets={}, folds={})".format(
+            len(self.candidates()), self.budgets(), self.folds)
+
+    # BUDGETS - epochs trained by the end of every rung: max_epochs / eta^k, down to about min_epochs
+    def budgets(self):
+        rungs = int(math.log(self.max_epochs / self.min_epochs, self.eta) + 1e-9) + 1
+        return [max(1, round(self.max_epochs / self.eta ** k)) for k in range(rungs - 1, -1, -1)]
+
+    # CANDIDATES - {key: create_model arguments} of the starting configurations
+    def candidates(self):
+        names = list(self.param_grid)
+        configs = [dict(zip(names, combo)) for combo in itertools.product(*(self.param_grid[n] for n in names))]
+        if self.n_candidates is not None and self.n_candidates < len(configs):
+            rng = np.random.default_rng(self.seed)
+            configs = [configs[i] for i in sorted(rng.choice(len(configs), self.n_candidates, replace=False))]
+        return {trial_key(config): config for config in configs}
+
+    # RUN - runs (or resumes) the search on model inputs X and 0/1 labels y; returns the results frame
+    def run(self, X, y):
+        os.makedirs(os.path.join(self.directory, "models"), exist_ok=True)
+        self.prepare_folds(X, y)
+        candidates = self.candidates()
+        done = self.finished_trials()
+        alive = list(candidates)
+        scores = {}
+        for rung, epochs in enumerate(self.budgets()):
+            pending = []
+            for key in alive:
+                for fold in range(self.folds):
+                    if (key, fold, epochs) in done:
+                        continue
+                    previous = self._latest(done, key, fold, epochs)
+                    if previous is not None and previous["stopped"]:
+                        # early stopping already fired: more epochs would not change the model
+                        done[(key, fold, epochs)] = previous
+                        continue
+                    pending.append({
+                        "key": key, "config": candidates[key], "fold": fold, "epochs": epochs,
+                        "initial_epoch": 0 if previous is None else previous["epochs"],
+                        "directory": self.directory, "batch_size": self.batch_size,
+                        "patience": self.patience, "seed": self.seed,
+                    })
+            for trial in self._train(pending):
+                done[(trial["key"], trial["fold"], trial["epochs"])] = trial
+            for key in alive:
+                trials = [done[(key, fold, epochs)] for fold in range(self.folds)]
+                scores[key] = {
+                    "rung": rung, "epochs": epochs,
+                    "score": float(np.mean([trial["score"] for trial in trials])),
+                    "loss": float(np.mean([trial["loss"] for trial in trials])),
+                    "stopped": all(trial["stopped"] for trial in trials),
+                }
+            ranked = sorted(alive, key=lambda key: scores[key]["score"], reverse=True)
+            alive = ranked[:max(1, len(ranked) // self.eta)]
+        rows = [{**{name: _describe(value) for name, value in candidates[key].items()}, "key": key, **scores[key]}
+                for key in candidates]
+        self.results = pd.DataFrame(rows).sort_values(["rung", "score"], ascending=False, ignore_index=True)
+        return self.results
+
+    # BEST_PARAMS - create_model arguments of the best candidate of the last rung
+    @property
+    def best_params(self):
+        if self.results is None:
+            return None
+        return self.candidates()[self.results.key.iloc[0]]
+
+    # BEST_MODEL_PATHS - saved models of the best candidate, one per fold
+    def best_model_paths(self):
+        done = self.finished_trials()
+        key = self.results.key.iloc[0]
+        return [_model_path(self.directory, key, fold, self._latest(done, key, fold, math.inf)["epochs"])
+                for fold in range(self.folds)]
+
+    # PREPARE_FOLDS - writes the standardized train/validation arrays of every fold (once per dataset)
+    def prepare_folds(self, X, y):
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.int32)
+        digest = hashlib.sha1(X.tobytes())
+        digest.update(y.tobytes())
+        manifest = {"data": digest.hexdigest(), "shape": list(X.shape), "folds": self.folds}
+        manifest_path = os.path.join(self.directory, "folds.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                if json.load(f) != manifest:
+                    raise ValueError("{} holds a search over different data or folds".format(self.directory))
+            return
+        bounds = np.linspace(0, len(X), self.folds + 1).astype(int)
+        for fold in range(self.folds):
+            validation = np.zeros(len(X), dtype=bool)
+            validation[bounds[fold]:bounds[fold + 1]] = True
+            train = X[~validation]
+            mu = train.mean(axis=0)
+            sigma = train.std(axis=0, ddof=1)
+            arrays = {"X_train": (train - mu) / sigma, "y_train": y[~validation],
+                      "X_val": (X[validation] - mu) / sigma, "y_val": y[validation]}
+            for name, array in arrays.items():
+                np.save(_fold_path(self.directory, fold, name), array)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+    # FINISHED_TRIALS - {(key, fold, epochs): trial} read from the checkpoint file
+    def finished_trials(self):
+        path = os.path.join(self.directory, "trials.jsonl")
+        if not os.path.exists(path):
+            return {}
+        done = {}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    trial = json.loads(line)
+                    done[(trial["key"], trial["fold"], trial["epochs"])] = trial
+        return done
+
+    def _latest(self, done, key, fold, epochs):
+        earlier = [trial for (k, f, e), trial in done.items() if k == key and f == fold and e < epochs]
+        return max(earlier, key=lambda trial: trial["epochs"]) if earlier else None
+
+    # _TRAIN - runs trials, appending each to the checkpoint file as soon as it finishes
+    def _train(self, tasks):
+        if not tasks:
+            return
+        with open(os.path.join(self.directory, "trials.jsonl"), "a") as checkpoint:
+            n_jobs = min(self.n_jobs or os.cpu_count() or 1, len(tasks))
+            if n_jobs <= 1:
+                finished = map(train_trial, tasks)
+            else:
+                # TensorFlow does not survive fork(); spawned workers import this module afresh
+                pool = ProcessPoolExecutor(n_jobs, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_worker, initargs=(self.threads,))
+                finished = (future.result() for future in as_completed([pool.submit(train_trial, task)
+                                                                        for task in tasks]))
+            try:
+                for trial in finished:
+                    checkpoint.write(json.dumps(trial) + "\n")
+                    checkpoint.flush()
+                    if trial["initial_epoch"]:
+                        # the model trained further is saved under its new budget; drop the old one
+                        previous = _model_path(self.directory, trial["key"], trial["fold"], trial["initial_epoch"])
+                        if os.path.exists(previous):
+                            os.remove(previous)
+                    yield trial
+            finally:
+                if n_jobs > 1:
+                    pool.shutdown(cancel_futures=True)
+
+
+# TRAIN_TRIAL - trains one candidate on one fold up to task['epochs'] and saves the model
+def train_trial(task):
+    start = time.perf_counter()
+    X_train, y_train, X_val, y_val = (np.load(_fold_path(task["directory"], task["fold"], name), mmap_mode="r")
+                                      for name in ("X_train", "y_train", "X_val", "y_val"))
+    if task["initial_epoch"]:
+        model = load_model(_model_path(task["directory"], task["key"], task["fold"], task["initial_epoch"]))
+    else:
+        set_seeds(task["seed"])
+        model = create_model(**task["config"], input_dim=X_train.shape[1])
+    stopping = EarlyStopping(monitor="val_loss", patience=task["patience"], restore_best_weights=True)
+    model.fit(x=X_train, y=y_train, epochs=task["epochs"], initial_epoch=task["initial_epoch"],
+              batch_size=task["batch_size"], validation_data=(X_val, y_val), shuffle=False,
+              class_weight=cw([y_train]), callbacks=[stopping], verbose=0)
+    model.save(_model_path(task["directory"], task["key"], task["fold"], task["epochs"]))
+    loss, accuracy = model.evaluate(X_val, y_val, batch_size=4096, verbose=0)
+    return {"key": task["key"], "fold": task["fold"], "epochs": task["epochs"], "initial_epoch": task["initial_epoch"],
+            "score": float(accuracy), "loss": float(loss), "stopped": bool(stopping.stopped_epoch), "seconds": time.perf_counter() - start}
+
+
+# TRIAL_KEY - short stable id of a create_model configuration
+def trial_key(config):
+    described = {name: _describe(value) for name, value in config.items()}
+    return hashlib.sha1(json.dumps(described, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+# regularizers are objects; describe them by class and settings so they key and print stably
+def _describe(value):
+    if hasattr(value, "get_config"):
+        return "{}({})".format(type(value).__name__, ", ".join(
+            "{}={:g}".format(k, v) for k, v in sorted(value.get_config().items())))
+    return value
+
+
+def _init_worker(threads):
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _fold_path(directory, fold, name):
+    return os.path.join(directory, "fold{}_{}.npy".format(fold, name))
+
+
+def _model_path(directory, key, fold, epochs):
+    return os.path.join(directory, "models", "{}_fold{}_{}.keras".format(key, fold, epochs))
@@ -1,11 +1,88 @@
+import os
+import sys
 import string
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utilities'))
+import Instrument
+import Metrics
+import Plotting
 
-from utilities import Instrument
+# one row per executed order: bar number, time (epoch ns), signed units, fill price
+TRADE_RECORD = np.dtype([("bar", np.int64), ("time", np.int64), ("units", np.int64), ("price", np.float64)])
 
-plt.style.use("seaborn-v0_8")
+
+# SIMULATE_POSITIONS - bar loop of run_positions() over plain arrays
+    # Parameters
+    # ----------
+    # prices, spreads: array
+    #     rounded price and spread of every bar
+    # signals: array
+    #     target position per bar (1, 0, -1)
+    # changes: array
+    #     bars at which the target differs from the position held, in order
+    # balance: float
+    #     initial cash balance
+    # use_spread: boolean
+    #     whether orders fill at the ask/bid instead of the price
+    # bars, units, fills: np.ndarray
+    #     preallocated output columns of the trade log (at least 2 * len(prices) + 1)
+    # Returns (final balance, number of trades); trades are written to bars/units/fills
+def simulate_positions(prices, spreads, signals, changes, balance, use_spread, bars, units, fills):
+    held = 0
+    trades = 0
+    for bar in changes:
+        signal = signals[bar]
+        half = spreads[bar] / 2 if use_spread else 0.0
+        # go neutral first, as go_long/go_short do with an open opposite position
+        if held != 0:
+            size = -held
+            price = prices[bar] + half if size > 0 else prices[bar] - half
+            balance -= size * price
+            held = 0
+            bars[trades] = bar
+            units[trades] = size
+            fills[trades] = price
+            trades += 1
+        if signal != 0:
+            price = prices[bar] + half if signal == 1 else prices[bar] - half
+            size = int(balance / price)
+            if signal == 1:
+                balance -= size * price
+                held = size
+            else:
+                balance += size * price
+                held = -size
+            bars[trades] = bar
+            units[trades] = held
+            fills[trades] = price
+            trades += 1
+    # close_pos() on the last bar, at the price less half the spread
+    last = len(prices) - 1
+    balance += held * prices[last]
+    if use_spread:
+        balance -= abs(held) * spreads[last] / 2
+    bars[trades] = last
+    units[trades] = -held
+    fills[trades] = prices[last]
+    trades += 1
+    return balance, trades
+
+
+# JIT_KERNEL - simulate_positions compiled with numba, or None when numba is not installed
+#   numba is imported on the first fast run rather than with this module
+def jit_kernel():
+    global _jit
+    if _jit is None:
+        try:
+            from numba import njit
+            _jit = njit(cache=True)(simulate_positions)
+        except ImportError:
+            _jit = False
+    return _jit or None
+
+
+_jit = None
 
 # Iterative, event driven backtesting of trading strategies
     # Parameters
@@ -22,8 +99,11 @@ plt.style.use("seaborn-v0_8")
     #             whether trading costs (bid-ask spread) are included
     #         source_file: string (default = None)
     #             source file to read from. necessary for use_spread to be enabled.
+    #         quiet: boolean (default = False)
+    #             record orders in trade_history instead of printing them
 class IterativeBacktester:
-    def __init__(self, symbol: string, start: string, end: string, amount: int, use_spread=True, source_file=None):
+    def __init__(self, symbol: string, start: string, end: string, amount: int, use_spread=True, source_file=None,
+                 quiet=False):
         self.symbol = symbol
         self.start = start
         self.end = end
@@ -35,12 +115,14 @@ class IterativeBacktester:
         self.use_spread = (
             use_spread and source_file is not None
         )  # Can't use_spread if no source file bc yf no spread
+        self.quiet = quiet
         self.data = None
-        self._instrument = Instrument(symbol, start, end, source_file)
+        self.metrics = None
+        self._instrument = Instrument.Instrument(symbol, start, end, source_file)
         self.get_data()
 
     @classmethod
-    def from_instrument(cls, instrument: Instrument.Instrument, amount, use_spread=True):
+    def from_instrument(cls, instrument: Instrument.Instrument, amount, use_spread=True, quiet=False):
         return cls(
             instrument.get_ticker(),
             instrument.get_start(),
@@ -48,28 +130,56 @@ class IterativeBacktester:
             amount,
             use_spread,
             source_file=instrument.source_file,
+            quiet=quiet,
         )
     # GET_DATA - Imports data from the source
     def get_data(self):
         raw = self._instrument.get_data()
         raw["returns"] = np.log(raw.price / raw.price.shift(1))
         self.data = raw
+        self.get_arrays()
+
+    # GET_ARRAYS - pulls time, price and spread into arrays once (rounded as they are reported)
+    def get_arrays(self):
+        self._times = self.data.index.values.astype("datetime64[ns]").view(np.int64)
+        self._prices = np.array([round(price, 5) for price in self.data.price.tolist()])
+        if self.use_spread:
+            self._spreads = np.array([round(spread, 5) for spread in self.data.spread.tolist()])
+        else:
+            self._spreads = np.zeros(len(self.data))
+        self.trade_log = np.zeros(2 * len(self.data) + 1, dtype=TRADE_RECORD)
+        self.logged = 0
+
+    # TRADE_HISTORY - orders recorded in the trade log so far
+    @property
+    def trade_history(self):
+        return pd.DataFrame(self.trade_log[:self.logged])
+
+    # LOG_TRADE - records one order in the preallocated trade log
+    def log_trade(self, bar, units, price):
+        if self.logged == len(self.trade_log):
+            self.trade_log = np.concatenate([self.trade_log, np.zeros(len(self.trade_log), dtype=TRADE_RECORD)])
+        self.trade_log[self.logged] = (bar, self._times[bar], units, price)
+        self.logged += 1
 
     # PLOT_DATA - plots closing price
     def plot_data(self, cols=None):
         if cols is None:
             cols = "price"
+        Plotting.pyplot()
         self.data[cols].plot(figsize=(12, 8), title=self.symbol)
 
     # GET_VALUES - returns date, price, spread of given bar
     def get_values(self, bar):
-        date = str(self.data.index[bar].date())
-        price = round(self.data.price.iloc[bar], 5)
-        spread = None if not self.use_spread else round(self.data.spread.iloc[bar], 5)
+        date = "" if self.quiet else str(self._times[bar].astype("datetime64[D]"))
+        price = self._prices[bar]
+        spread = None if not self.use_spread else self._spreads[bar]
         return date, price, spread
 
     # PRINT_CURRENT_BALANCE - prints out cash balance
     def print_current_balance(self, bar):
+        if self.quiet:
+            return
         date, price, spread = self.get_values(bar)
         print("{} | Current Balance: {}".format(date, round(self.current_balance, 2)))
 
@@ -85,7 +195,9 @@ class IterativeBacktester:
         self.current_balance -= units * price  
         self.units += units
         self.trades += 1
-        print("{} |  Buying {} for {}".format(date, units, round(price, 5)))
+        self.log_trade(bar, units, price)
+        if not self.quiet:
+            print("{} |  Buying {} for {}".format(date, units, round(price, 5)))
 
     # SELL_INSTRUMENT - places and executes a sell order
     def sell_instrument(self, bar, units=None, amount=None):
@@ -99,7 +211,9 @@ class IterativeBacktester:
         self.current_balance += (units * price)  
         self.units -= units
         self.trades += 1
-        print("{} |  Selling {} for {}".format(date, units, round(price, 5)))
+        self.log_trade(bar, -units, price)
+        if not self.quiet:
+            print("{} |  Selling {} for {}".format(date, units, round(price, 5)))
 
     # GO_LONG - go long position
     def go_long(self, bar, units=None, amount=None):
@@ -129,12 +243,16 @@ class IterativeBacktester:
 
     def print_current_position_value(self, bar):
         """Prints out the current position value."""
+        if self.quiet:
+            return
         date, price, spread = self.get_values(bar)
         cpv = self.units * price
         print("{} |  Current Position Value = {}".format(date, round(cpv, 2)))
 
     def print_current_nav(self, bar):
         """Prints out the current net asset value (nav)."""
+        if self.quiet:
+            return
         date, price, spread = self.get_values(bar)
         nav = self.current_balance + self.units * price
         print("{} |  Net Asset Value = {}".format(date, round(nav, 2)))
@@ -142,29 +260,130 @@ class IterativeBacktester:
     def test_strategy(self):
         pass
 
+    # RUN_POSITIONS - trades a target position per bar (1 long, 0 neutral, -1 short, NaN hold)
+    #   going long/short with the whole balance, and closes out on the last bar; returns
+    #   the net performance (%). fast=True runs the loop over arrays (JIT-compiled when
+    #   numba is installed) and only fills trade_history; fast=False goes through
+    #   go_long/go_short/sell_instrument/buy_instrument bar by bar
+    def run_positions(self, signals, fast=True):
+        signals = np.asarray(signals, dtype=np.float64)
+        self.position = 0
+        self.units = 0
+        self.trades = 0
+        self.current_balance = self.initial_balance
+        self.logged = 0
+        self.metrics = Metrics.Metrics(Metrics.bars_per_year(Metrics.bar_length(self.data.index)))
+        if not fast:
+            self._nav = float(self.initial_balance)
+            for bar in range(len(signals) - 1):
+                signal = signals[bar]
+                held = self.position
+                if signal == 1 and self.position != 1:
+                    self.go_long(bar, amount="all")
+                elif signal == -1 and self.position != -1:
+                    self.go_short(bar, amount="all")
+                elif signal == 0 and self.position == 1:
+                    self.sell_instrument(bar, units=self.units)
+                elif signal == 0 and self.position == -1:
+                    self.buy_instrument(bar, units=-self.units)
+                else:
+                    self.record_bar(bar, held)
+                    continue
+                self.position = int(signal)
+                self.record_bar(bar, held)
+            held = self.position
+            perf = self.close_pos(len(signals) - 1)
+            self.record_bar(len(signals) - 1, held)
+            self.record_trades()
+            return perf
+        # only bars where the (forward-filled) target changes can trade
+        held = pd.Series(signals[:-1]).ffill().fillna(0).to_numpy()
+        changes = np.flatnonzero(held != np.concatenate([[0], held[:-1]]))
+        log = self.trade_log
+        kernel = jit_kernel()
+        if kernel is None:
+            # plain lists index faster than arrays in the interpreter
+            kernel = simulate_positions
+            arrays = self._prices.tolist(), self._spreads.tolist(), signals.tolist(), changes.tolist()
+        else:
+            arrays = self._prices, self._spreads, signals, changes
+        self.current_balance, trades = kernel(
+            *arrays, float(self.initial_balance), self.use_spread, log["bar"], log["units"], log["price"]
+        )
+        log["time"][:trades] = self._times[log["bar"][:trades]]
+        self.logged = trades
+        self.trades = trades
+        self.units = 0
+        self.position = 0
+        self.record_bars(len(signals))
+        self.record_trades()
+        return (self.current_balance - self.initial_balance) / self.initial_balance * 100
+
+    # RECORD_BAR - adds one bar to self.metrics: the log change of the net asset value (cash plus
+    #   units at the bar's price), earned with the position held coming into the bar
+    def record_bar(self, bar, held):
+        nav = self.current_balance + self.units * self._prices[bar]
+        self.metrics.update(np.log(nav / self._nav), held)
+        self._nav = nav
+
+    # RECORD_BARS - record_bar() for the first n bars at once, rebuilding cash and units per bar
+    #   from the trade log (the final balance includes the closing spread the log does not)
+    def record_bars(self, n):
+        log = self.trade_log[:self.logged]
+        # balance and units after every order, summed in order as the bar loop does
+        balance = np.cumsum(np.concatenate([[float(self.initial_balance)], -log["units"] * log["price"]]))
+        held = np.cumsum(np.concatenate([[0], log["units"]]))
+        filled = np.searchsorted(log["bar"], np.arange(n), side="right")
+        units = held[filled]
+        nav = np.empty(n + 1)
+        nav[0] = self.initial_balance
+        nav[1:] = balance[filled] + units * self._prices[:n]
+        nav[-1] = self.current_balance
+        returns = np.log(nav[1:] / nav[:-1])
+        self.metrics.update_many(returns, np.sign(np.concatenate([[0.0], units[:-1]])))
+
+    # RECORD_TRADES - adds the closed trades of the trade log to self.metrics: a trade runs from
+    #   one flat point of the units held to the next, and its P&L is the change in cash between
+    #   them (the final close_pos() includes the half spread the log does not)
+    def record_trades(self):
+        log = self.trade_log[:self.logged]
+        balance = np.cumsum(np.concatenate([[float(self.initial_balance)], -log["units"] * log["price"]]))
+        balance[-1] = self.current_balance
+        held = np.cumsum(np.concatenate([[0], log["units"]]))
+        flat = np.flatnonzero(held == 0)
+        opened = held[flat[:-1] + 1] != 0
+        for pl in np.diff(balance[flat])[opened].tolist():
+            self.metrics.add_trade(pl)
+
     def close_pos(self, bar):
         """Closes out a long or short position (go neutral)."""
         date, price, spread = self.get_values(bar)
-        print(75 * "-")
-        print("{} | +++ CLOSING FINAL POSITION +++".format(date))
         self.current_balance += self.units * price  # closing final position
         if self.use_spread:
             self.current_balance -= (
                 abs(self.units) * spread / 2
             )  # subtract half-spread costs
-        print("{} | closing position of {} for {}".format(date, self.units, price))
+        self.log_trade(bar, -self.units, price)
+        closed = self.units
         self.units = 0  # setting position to neutral
         self.trades += 1
         perf = (
             (self.current_balance - self.initial_balance) / self.initial_balance * 100
         )
+        if self.quiet:
+            return perf
+        print(75 * "-")
+        print("{} | +++ CLOSING FINAL POSITION +++".format(date))
+        print("{} | closing position of {} for {}".format(date, closed, price))
         self.print_current_balance(bar)
         print("{} | net performance (%) = {}".format(date, round(perf, 2)))
         print("{} | number of trades executed = {}".format(date, self.trades))
         print(75 * "-")
+        return perf
 
     def reset(self):
         self.position = 0  # initial neutral position
+        self.units = 0
         self.trades = 0  # no trades yet
         self.current_balance = self.initial_balance  # reset initial capital
         self.get_data()  # reset dataset
\ No newline at end of file
@@ -1,16 +1,33 @@
-import numpy as np
+import os
+import sys
 import Trader
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utilities'))
+import Indicators
 
 
 class SMACrossover(Trader.Trader):
     def __init__(self, conf_file, instrument, bar_length, units, duration, Slow_MA=200, Fast_MA=50):
         self.Slow_MA = Slow_MA
         self.Fast_MA = Fast_MA
+        self.slow_ma = Indicators.SMA(Slow_MA)
+        self.fast_ma = Indicators.SMA(Fast_MA)
+        self.last_fed = None
+        self.signal = -1
         super().__init__(conf_file, instrument, bar_length, units, duration)
 
+    def max_lookback(self):
+        return max(self.Slow_MA, self.Fast_MA)
+
+    # Feeds only the bars added since the last call into the incremental moving averages
     def define_strategy(self):
-        df = self.raw_data.copy()
-        df['Slow MA'] = df[self.instrument].rolling(self.Slow_MA).mean()
-        df['Fast MA'] = df[self.instrument].rolling(self.Fast_MA).mean()
-        df['position'] = np.where(df['Fast MA'] > df['Slow MA'], 1, -1)
-        self.data = df.copy()
\ No newline at end of file
+        times, closes = self.bars.since(self.last_fed, self.instrument)
+        for price in closes.tolist():
+            self.slow_ma.update(price)
+            self.fast_ma.update(price)
+        if len(times):
+            self.last_fed = int(times[-1])
+        # When Fast MA 'crosses over' the Slow MA, go long; otherwise, go short
+        self.signal = 1 if self.fast_ma.value > self.slow_ma.value else -1
+
+    def get_signal(self):
+        return self.signal
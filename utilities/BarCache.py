@@ -0,0 +1,100 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+
+# ON-DISK COLUMNAR BAR CACHE
+        # Stores the filtered/resampled frame produced from a source file as one
+        # memory-mapped .npy file per column, so repeat loads are mmap opens
+        # instead of a full CSV parse and resample.
+        # Parameters
+        # ----------
+        # cache_dir: str (default = None)
+        #     directory for cache entries. None stores them in a '.bar_cache'
+        #     directory next to each source file
+class BarCache:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+
+    def __repr__(self):
+        return "BarCache(cache_dir={})".format(self.cache_dir)
+
+    # KEY - cache key for a source file (path + mtime), granularity and hour filter
+    def key(self, source_file, granularity=None, start_time=None, end_time=None):
+        path = os.path.abspath(source_file)
+        mtime = os.stat(path).st_mtime_ns
+        raw = json.dumps([path, mtime, granularity, start_time, end_time])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    # ENTRY_PATH - directory holding the cached columns of a given key
+    def entry_path(self, source_file, key):
+        cache_dir = self.cache_dir
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(source_file)), ".bar_cache")
+        return os.path.join(cache_dir, key)
+
+    # LOAD - returns the cached frame, building it with loader() on a miss
+    def load(self, source_file, loader, granularity=None, start_time=None, end_time=None):
+        key = self.key(source_file, granularity, start_time, end_time)
+        entry = self.entry_path(source_file, key)
+        if not os.path.exists(os.path.join(entry, "manifest.json")):
+            self.write(entry, loader())
+        return self.read(entry)
+
+    # WRITE - stores a frame as one .npy file per column plus a manifest
+    def write(self, entry, data):
+        parent = os.path.dirname(entry)
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+        try:
+            index = pd.DatetimeIndex(data.index)
+            manifest = {
+                "index_name": index.name,
+                "tz": None if index.tz is None else str(index.tz),
+                "columns": [str(column) for column in data.columns],
+            }
+            if index.tz is not None:
+                index = index.tz_convert("UTC").tz_localize(None)
+            np.save(os.path.join(staging, "index.npy"), index.values.astype("datetime64[ns]").view("int64"))
+            for i, column in enumerate(data.columns):
+                np.save(os.path.join(staging, "col_{}.npy".format(i)), np.ascontiguousarray(data[column].to_numpy()))
+            with open(os.path.join(staging, "manifest.json"), "w") as f:
+                json.dump(manifest, f)
+            try:
+                os.replace(staging, entry)
+            except OSError:
+                # another process published the same entry first
+                shutil.rmtree(staging, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    # READ - opens a cached entry as a frame backed by read-only memory maps
+    def read(self, entry):
+        with open(os.path.join(entry, "manifest.json")) as f:
+            manifest = json.load(f)
+        stamps = np.load(os.path.join(entry, "index.npy"), mmap_mode="r")
+        index = pd.DatetimeIndex(stamps.view("datetime64[ns]"), name=manifest["index_name"])
+        if manifest["tz"] is not None:
+            index = index.tz_localize("UTC").tz_convert(manifest["tz"])
+        columns = {
+            column: np.load(os.path.join(entry, "col_{}.npy".format(i)), mmap_mode="r")
+            for i, column in enumerate(manifest["columns"])
+        }
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    # CLEAR - removes every cached entry (of one source file's cache if given)
+    def clear(self, source_file=None):
+        if self.cache_dir is not None:
+            cache_dir = self.cache_dir
+        elif source_file is not None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(source_file)), ".bar_cache")
+        else:
+            return
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+default_cache = BarCache()
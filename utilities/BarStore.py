@@ -0,0 +1,111 @@
+import os
+import numpy as np
+import pandas as pd
+
+# FIXED-CAPACITY BAR HISTORY
+        # Array-backed store of the most recent `capacity` bars of a live session.
+        # Rows live in a buffer twice the capacity; once it fills up, the last
+        # `capacity` rows are moved to the front (amortized O(1) per bar). Bars that
+        # fall out of the window are optionally appended to a binary spill file.
+        # view() and since() return views on the buffer, not copies: they stay
+        # valid until the next append and must not be written to.
+        # Parameters
+        # ----------
+        # columns: list
+        #     names of the float columns of a bar (e.g. [instrument, 'High', 'Low'])
+        # capacity: int
+        #     number of bars kept in memory
+        # spill_path: str (default = None)
+        #     file that evicted bars are appended to; None drops them
+class BarStore:
+    def __init__(self, columns, capacity, spill_path=None):
+        self.columns = list(columns)
+        self.capacity = max(int(capacity), 1)
+        self.spill_path = spill_path
+        self.times = np.empty(2 * self.capacity, dtype=np.int64)
+        self.values = np.empty((len(self.columns), 2 * self.capacity), dtype=np.float64)
+        self.record = np.dtype([('time', np.int64)] + [(str(column), np.float64) for column in self.columns])
+        self.reset()
+
+    def __repr__(self):
+        return "BarStore(columns={}, capacity={}, bars={})".format(self.columns, self.capacity, len(self))
+
+    def __len__(self):
+        return self._stop - self._start
+
+    # RESET - empties the in-memory window (the spill file is left as is)
+    def reset(self):
+        self._start = 0
+        self._stop = 0
+        self.total = 0
+
+    # APPEND - adds one bar; values are ordered like self.columns
+    def append(self, time_ns, values):
+        self.extend(np.array([time_ns], dtype=np.int64), np.asarray(values, dtype=np.float64).reshape(-1, 1))
+
+    # EXTEND - adds bars; times is (n,) epoch nanoseconds, values is (len(columns), n)
+    def extend(self, times, values):
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        n = len(times)
+        if n == 0:
+            return
+        if n > self.capacity:
+            self._evict(len(self))
+            self._spill(times[:-self.capacity], values[:, :-self.capacity])
+            times, values = times[-self.capacity:], values[:, -self.capacity:]
+            self.total += n - self.capacity
+            n = self.capacity
+        overflow = len(self) + n - self.capacity
+        if overflow > 0:
+            self._evict(overflow)
+        if self._stop + n > len(self.times):
+            # move the window to the front of the buffer
+            size = len(self)
+            self.times[:size] = self.times[self._start:self._stop]
+            self.values[:, :size] = self.values[:, self._start:self._stop]
+            self._start, self._stop = 0, size
+        self.times[self._stop:self._stop + n] = times
+        self.values[:, self._stop:self._stop + n] = values
+        self._stop += n
+        self.total += n
+
+    def _evict(self, n):
+        self._spill(self.times[self._start:self._start + n], self.values[:, self._start:self._start + n])
+        self._start += n
+
+    def _spill(self, times, values):
+        if self.spill_path is None or len(times) == 0:
+            return
+        rows = np.empty(len(times), dtype=self.record)
+        rows['time'] = times
+        for i, column in enumerate(self.columns):
+            rows[str(column)] = values[i]
+        with open(self.spill_path, 'ab') as f:
+            rows.tofile(f)
+
+    # LAST_TIME - epoch nanoseconds of the newest bar (None if empty)
+    def last_time(self):
+        return None if len(self) == 0 else int(self.times[self._stop - 1])
+
+    # SINCE - (times, values of column) of the bars newer than time_ns (all bars if None)
+    def since(self, time_ns, column):
+        times = self.times[self._start:self._stop]
+        start = 0 if time_ns is None else np.searchsorted(times, time_ns, side='right')
+        values = self.values[self.columns.index(column), self._start:self._stop]
+        return times[start:], values[start:]
+
+    # VIEW - zero-copy, read-only DataFrame of the bars in memory
+    def view(self):
+        values = self.values[:, self._start:self._stop]
+        values.flags.writeable = False
+        index = pd.DatetimeIndex(self.times[self._start:self._stop].view('datetime64[ns]'))
+        return pd.DataFrame(values.T, index=index, columns=self.columns, copy=False)
+
+    # READ_SPILLED - DataFrame of the bars evicted to the spill file
+    def read_spilled(self):
+        if self.spill_path is None or not os.path.exists(self.spill_path):
+            return pd.DataFrame(columns=self.columns)
+        rows = np.fromfile(self.spill_path, dtype=self.record)
+        index = pd.DatetimeIndex(rows['time'].view('datetime64[ns]'))
+        return pd.DataFrame({column: rows[str(column)] for column in self.columns}, index=index)
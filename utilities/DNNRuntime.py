@@ -0,0 +1,141 @@
+import math
+import pickle
+import numpy as np
+import pandas as pd
+import Features
+
+ACTIVATIONS = ("relu", "sigmoid", "linear")
+
+
+# EXPORT - converts a saved Keras Dense model and its standardization parameters into one .npz file
+    # Only Dense layers carry weights at inference time; Dropout and activity
+    # regularizers are training-only and are skipped. Keras is imported here only.
+    # Parameters
+    # ----------
+    # model_path: str
+    #     SavedModel directory (e.g. deep_neural_network/DNN_Save)
+    # pkl_path: str
+    #     pickle holding the 'mu' and 'sigma' Series used to standardize the inputs
+    # npz_path: str
+    #     file written
+    # columns: list (default = None)
+    #     names of the model inputs, in order; None uses the lag columns of Features.FEATURES
+def export(model_path, pkl_path, npz_path, columns=None, lags=8):
+    import keras
+    model = keras.models.load_model(model_path)
+    if columns is None:
+        columns = ["{}_lag_{}".format(feature, lag) for feature in Features.FEATURES for lag in range(1, lags + 1)]
+    arrays = {}
+    activations = []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == "Dropout":
+            continue
+        if kind != "Dense":
+            raise ValueError("cannot export layer {} of type {}".format(layer.name, kind))
+        activation = layer.get_config()["activation"]
+        if activation not in ACTIVATIONS:
+            raise ValueError("cannot export activation {} of layer {}".format(activation, layer.name))
+        kernel, bias = layer.get_weights()
+        arrays["kernel_{}".format(len(activations))] = kernel.astype(np.float32)
+        arrays["bias_{}".format(len(activations))] = bias.astype(np.float32)
+        activations.append(activation)
+    if arrays["kernel_0"].shape[0] != len(columns):
+        raise ValueError("model takes {} inputs, got {} columns".format(arrays["kernel_0"].shape[0], len(columns)))
+    with open(pkl_path, "rb") as f:
+        parameters = pickle.load(f)
+    arrays["mu"] = pd.Series(parameters["mu"])[columns].to_numpy(dtype=np.float32)
+    arrays["sigma"] = pd.Series(parameters["sigma"])[columns].to_numpy(dtype=np.float32)
+    np.savez_compressed(npz_path, columns=np.array(columns), activations=np.array(activations), **arrays)
+
+
+# NUMPY DNN RUNTIME
+        # Forward pass of an exported Dense/ReLU/sigmoid MLP without TensorFlow.
+        # predict() is a drop-in for model.predict() on standardized inputs;
+        # predict_raw() takes unstandardized inputs, with the standardization folded
+        # into the first layer's weights; predict_one() scores one raw row with
+        # preallocated buffers for live strategies.
+        # Parameters
+        # ----------
+        # npz_path: str
+        #     file written by export()
+class NumpyDNN:
+    def __init__(self, npz_path):
+        with np.load(npz_path) as artifact:
+            self.columns = [str(column) for column in artifact["columns"]]
+            self.activations = [str(activation) for activation in artifact["activations"]]
+            self.kernels = [artifact["kernel_{}".format(i)] for i in range(len(self.activations))]
+            self.biases = [artifact["bias_{}".format(i)] for i in range(len(self.activations))]
+            self.mu = artifact["mu"]
+            self.sigma = artifact["sigma"]
+        # (x - mu) / sigma @ W + b == x @ (W / sigma) + (b - (mu / sigma) @ W)
+        scale = (1 / self.sigma)[:, None]
+        self._raw_kernel = (self.kernels[0] * scale).astype(np.float32)
+        self._raw_bias = (self.biases[0] - (self.mu / self.sigma) @ self.kernels[0]).astype(np.float32)
+        self._layers = [
+            (kernel, bias, activation, np.empty(kernel.shape[1], dtype=np.float32))
+            for kernel, bias, activation in zip([self._raw_kernel] + self.kernels[1:],
+                                                [self._raw_bias] + self.biases[1:], self.activations)
+        ]
+
+    def __repr__(self):
+        return "NumpyDNN(layers={}, inputs={})".format([k.shape[1] for k in self.kernels], len(self.columns))
+
+    # MEAN / STD - standardization parameters as Series (as DeepNeuralNetworkTest keeps them)
+    @property
+    def mean(self):
+        return pd.Series(self.mu, index=self.columns)
+
+    @property
+    def std(self):
+        return pd.Series(self.sigma, index=self.columns)
+
+    # PREDICT - (n, 1) probabilities of standardized inputs, like model.predict()
+    def predict(self, X, verbose=None):
+        return self._forward(np.asarray(X, dtype=np.float32), self.kernels[0], self.biases[0])
+
+    # PREDICT_RAW - (n, 1) probabilities of unstandardized inputs
+    def predict_raw(self, X):
+        return self._forward(np.asarray(X, dtype=np.float32), self._raw_kernel, self._raw_bias)
+
+    # PREDICT_ONE - probability of one unstandardized input row (float)
+    def predict_one(self, x):
+        out = np.asarray(x, dtype=np.float32).ravel()
+        for kernel, bias, activation, buffer in self._layers:
+            np.dot(out, kernel, out=buffer)
+            buffer += bias
+            out = buffer
+            if len(out) == 1:
+                # scalar output layer: plain floats beat array calls
+                value = float(out[0])
+                if activation == "relu":
+                    value = max(value, 0.0)
+                elif activation == "sigmoid":
+                    value = 1 / (1 + math.exp(-value)) if value >= 0 else math.exp(value) / (1 + math.exp(value))
+                out[0] = value
+            else:
+                _activate(out, activation)
+        return float(out[0])
+
+    def _forward(self, X, kernel, bias):
+        out = X @ kernel
+        out += bias
+        _activate(out, self.activations[0])
+        for kernel, bias, activation in zip(self.kernels[1:], self.biases[1:], self.activations[1:]):
+            out = out @ kernel
+            out += bias
+            _activate(out, activation)
+        return out
+
+
+# _ACTIVATE - applies an activation in place
+def _activate(z, activation):
+    if activation == "relu":
+        np.maximum(z, 0, out=z)
+    elif activation == "sigmoid":
+        # exp of -|z| never overflows: sigmoid(z) = 1 / (1 + e^-z) = e^z / (1 + e^z)
+        negative = z < 0
+        np.abs(z, out=z)
+        np.negative(z, out=z)
+        np.exp(z, out=z)
+        np.divide(np.where(negative, z, 1), 1 + z, out=z)
@@ -0,0 +1,88 @@
+import threading
+import pandas as pd
+from collections import OrderedDict
+
+# PROCESS-WIDE DATASET REGISTRY
+        # LRU map of loaded price frames shared by every Instrument (and thus every
+        # backtester) in the process. Frames are stored read-only; callers get a
+        # shallow copy, so adding columns never touches the shared data.
+        # Parameters
+        # ----------
+        # budget: int (default = 512 MiB)
+        #     memory budget in bytes; least recently used frames are evicted once
+        #     the registry grows past it (the most recent frame is always kept)
+class DataRegistry:
+    def __init__(self, budget=512 * 2 ** 20):
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "DataRegistry(frames={}, nbytes={}, budget={})".format(len(self._frames), self.nbytes, self.budget)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, key):
+        return key in self._frames
+
+    @property
+    def nbytes(self):
+        return sum(self._sizes.values())
+
+    # GET - returns the shared read-only frame for key, loading it with loader() on a miss
+    def get(self, key, loader):
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return self._frames[key]
+        frame = self.freeze(loader())
+        with self._lock:
+            if key in self._frames:  # loaded concurrently by another thread
+                self.hits += 1
+                return self._frames[key]
+            self.misses += 1
+            self._frames[key] = frame
+            self._sizes[key] = int(frame.memory_usage(index=True).sum())
+            self._evict()
+        return frame
+
+    # FREEZE - rebuilds a frame on read-only column arrays without copying them
+    @staticmethod
+    def freeze(frame):
+        columns = {}
+        for column in frame.columns:
+            values = frame[column].to_numpy()
+            if values.flags.writeable:
+                values = values.view()
+                values.flags.writeable = False
+            columns[column] = values
+        return pd.DataFrame(columns, index=frame.index, copy=False)
+
+    # INVALIDATE - drops one key, or every key if none is given
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._frames.clear()
+                self._sizes.clear()
+            elif key in self._frames:
+                del self._frames[key]
+                del self._sizes[key]
+
+    # SET_BUDGET - changes the memory budget, evicting immediately if needed
+    def set_budget(self, budget):
+        with self._lock:
+            self.budget = budget
+            self._evict()
+
+    def _evict(self):
+        while len(self._frames) > 1 and self.nbytes > self.budget:
+            key, _ = self._frames.popitem(last=False)
+            del self._sizes[key]
+
+
+default_registry = DataRegistry()
@@ -0,0 +1,404 @@
+import os
+import json
+import math
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# indicator columns lagged into model inputs, in model input order
+FEATURES = ["Returns", "Direction", "MACD", "SMA Crossover", "Mean Reversion", "Rolling Min", "Rolling Max",
+            "Momentum", "RSI", "Volatility"]
+# indicator parameters (names as in DeepNeuralNetworkTest)
+DEFAULTS = {"window": 50, "Fast_SMA": 75, "Slow_SMA": 150, "Fast_EMA": 12, "Slow_EMA": 26, "signal": 9,
+            "rsi_window": 14}
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", ".feature_cache")
+# bump when the feature formulas change so old cache entries are not reused
+VERSION = 1
+
+
+# INDICATORS - frame of Price, Returns, Direction and the requested indicator columns, built in one go
+def indicators(price, features=FEATURES, window=50, Fast_SMA=75, Slow_SMA=150, Fast_EMA=12, Slow_EMA=26,
+               signal=9, rsi_window=14):
+    price = pd.Series(price, dtype=np.float64)
+    returns = np.log(price / price.shift(1))
+    columns = {"Price": price, "Returns": returns}
+    # Direction for class weight balancing to eliminate buy bias
+    columns["Direction"] = pd.Series(np.where(returns > 0, 1, 0), index=price.index)
+    if "MACD" in features:
+        macd = price.ewm(span=Fast_EMA, adjust=False).mean() - price.ewm(span=Slow_EMA, adjust=False).mean()
+        columns["MACD"] = macd - macd.ewm(span=signal, adjust=False).mean()
+    if "SMA Crossover" in features:
+        columns["SMA Crossover"] = price.rolling(Fast_SMA).mean() - price.rolling(Slow_SMA).mean()
+    if "Mean Reversion" in features:
+        columns["Mean Reversion"] = (price - price.rolling(window).mean()) / price.rolling(window).std()
+    if "Rolling Min" in features:
+        columns["Rolling Min"] = (price.rolling(window).min() / price) - 1
+    if "Rolling Max" in features:
+        columns["Rolling Max"] = (price.rolling(window).max() / price) - 1
+    if "Momentum" in features:
+        columns["Momentum"] = returns.rolling(window).mean()
+    if "RSI" in features:
+        change = price.diff()
+        gain = change.mask(change < 0, 0.0).rolling(rsi_window).mean()
+        loss = -change.mask(change > 0, -0.0).rolling(rsi_window).mean()
+        columns["RSI"] = 100 - (100 / (1 + gain / loss))
+    if "Volatility" in features:
+        columns["Volatility"] = returns.rolling(window).std()
+    return pd.DataFrame(columns)
+
+
+# LAG FEATURE SET
+        # Model inputs of the DNN strategy: every feature lagged 1..lags bars, held as
+        # one float32 (bars, features, lags) array, plus the unlagged indicator
+        # columns of the same bars. Rows are those the per-column shift()/dropna()
+        # construction kept, and flat() orders columns like it did
+        # ('Returns_lag_1', ..., 'Returns_lag_8', 'Direction_lag_1', ...).
+        # Parameters
+        # ----------
+        # index: pd.DatetimeIndex
+        #     bar times
+        # base: pd.DataFrame
+        #     Price, Returns, Direction and the unlagged features on index
+        # X: np.ndarray
+        #     float32 (len(index), len(features), lags) lagged features
+class FeatureSet:
+    def __init__(self, index, base, X, features, lags):
+        self.index = index
+        self.base = base
+        self.X = X
+        self.features = list(features)
+        self.lags = lags
+
+    def __repr__(self):
+        return "FeatureSet(bars={}, features={}, lags={})".format(len(self.index), len(self.features), self.lags)
+
+    def __len__(self):
+        return len(self.index)
+
+    # COLUMNS - names of the flat() columns, as used in the saved mu/sigma
+    @property
+    def columns(self):
+        return lag_columns(self.features, self.lags)
+
+    # FLAT - (bars, features * lags) view of X
+    def flat(self):
+        return self.X.reshape(len(self.X), -1)
+
+    # STANDARDIZE - float32 model inputs standardized with mu/sigma (Series indexed by column name)
+    #   only the lag columns are touched; mu/sigma may hold other columns too
+    def standardize(self, mu, sigma):
+        shape = (len(self.features), self.lags)
+        mu = pd.Series(mu)[self.columns].to_numpy(dtype=np.float32).reshape(shape)
+        sigma = pd.Series(sigma)[self.columns].to_numpy(dtype=np.float32).reshape(shape)
+        return ((self.X - mu) / sigma).reshape(len(self.X), -1)
+
+    # MOMENTS - mean and sample std of every lag column over rows (for saving as mu/sigma)
+    def moments(self, rows=slice(None)):
+        flat = self.flat()[rows].astype(np.float64)
+        return (pd.Series(flat.mean(axis=0), index=self.columns),
+                pd.Series(flat.std(axis=0, ddof=1), index=self.columns))
+
+
+# LAG_COLUMNS - names of the flattened model inputs ('Returns_lag_1', ..., 'Volatility_lag_8')
+def lag_columns(features, lags):
+    return ["{}_lag_{}".format(feature, lag) for feature in features for lag in range(1, lags + 1)]
+
+
+# BUILD - FeatureSet of a price series, read from the disk cache when the same data and parameters were built before
+    # Parameters
+    # ----------
+    # price: pd.Series
+    #     prices indexed by time
+    # lags: int (default = 8)
+    #     number of lags of every feature
+    # features: list (default = FEATURES)
+    #     indicator columns to lag
+    # cache: boolean (default = True)
+    #     whether to use the on-disk cache
+    # params:
+    #     indicator parameters overriding DEFAULTS (window, Fast_SMA, ...)
+def build(price, lags=8, features=FEATURES, cache=True, cache_dir=None, **params):
+    params = {**DEFAULTS, **params}
+    features = list(features)
+    if not cache:
+        return _build(price, lags, features, params)
+    entry = os.path.join(cache_dir or CACHE_DIR, key(price, lags, features, params))
+    if not os.path.exists(os.path.join(entry, "manifest.json")):
+        _write(entry, _build(price, lags, features, params))
+    return _read(entry)
+
+
+# KEY - cache key: hash of the price data (times and values) and of the feature parameters
+def key(price, lags, features, params):
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(price.index.values.astype("datetime64[ns]").view(np.int64)).tobytes())
+    digest.update(np.ascontiguousarray(price.to_numpy(dtype=np.float64)).tobytes())
+    digest.update(json.dumps([VERSION, lags, features, sorted(params.items())]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _build(price, lags, features, params):
+    base = indicators(price, features, **params)[["Price", "Returns", "Direction"] +
+                                                 [f for f in features if f not in ("Returns", "Direction")]]
+    base = base.dropna()
+    values = base[features].to_numpy(dtype=np.float64)
+    # windows[i] holds rows i..i+lags of every feature; row i + lags takes lag l from position lags - l
+    windows = sliding_window_view(values, lags + 1, axis=0)
+    X = np.ascontiguousarray(windows[:, :, lags - 1::-1], dtype=np.float32)
+    base = base.iloc[lags:]
+    return FeatureSet(base.index, base, X, features, lags)
+
+
+def _write(entry, features):
+    parent = os.path.dirname(entry)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        index = pd.DatetimeIndex(features.index)
+        manifest = {
+            "index_name": index.name,
+            "tz": None if index.tz is None else str(index.tz),
+            "base": list(features.base.columns),
+            "features": features.features,
+            "lags": features.lags,
+        }
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        np.save(os.path.join(staging, "index.npy"), index.values.astype("datetime64[ns]").view(np.int64))
+        np.save(os.path.join(staging, "base.npy"), np.ascontiguousarray(features.base.to_numpy(dtype=np.float64).T))
+        np.save(os.path.join(staging, "X.npy"), features.X)
+        with open(os.path.join(staging, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+        try:
+            os.replace(staging, entry)
+        except OSError:
+            # another process published the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def _read(entry):
+    with open(os.path.join(entry, "manifest.json")) as f:
+        manifest = json.load(f)
+    stamps = np.load(os.path.join(entry, "index.npy"), mmap_mode="r")
+    index = pd.DatetimeIndex(stamps.view("datetime64[ns]"), name=manifest["index_name"])
+    if manifest["tz"] is not None:
+        index = index.tz_localize("UTC").tz_convert(manifest["tz"])
+    base = np.load(os.path.join(entry, "base.npy"), mmap_mode="r")
+    base = pd.DataFrame({column: base[i] for i, column in enumerate(manifest["base"])}, index=index, copy=False)
+    X = np.load(os.path.join(entry, "X.npy"), mmap_mode="r")
+    return FeatureSet(index, base, X, manifest["features"], manifest["lags"])
+
+
+# ON-DISK LAG FEATURE STORE FOR OUT-OF-CORE TRAINING
+        # Appends the lagged features and Direction labels of one or more price
+        # series to flat binary files (X.f32, y.i8, time.i64) that are read back
+        # through np.memmap, so neither building nor training needs the whole
+        # history in memory. Prices are processed chunk by chunk; every chunk is
+        # built together with the last `warmup` prices of the previous one, so
+        # rolling windows and EWMs see the same history as a single build
+        # (the EWM start-up effect decays to float32 noise well within the default).
+        # Each series is a named segment; rows are never lagged across segments.
+        # Parameters
+        # ----------
+        # directory: str
+        #     folder of the store; an existing store is reopened
+        # lags: int (default = 8)
+        #     number of lags of every feature
+        # features: list (default = FEATURES)
+        #     indicator columns to lag
+        # warmup: int (default = 1000)
+        #     prices carried over from one chunk to the next
+        # params:
+        #     indicator parameters overriding DEFAULTS (window, Fast_SMA, ...)
+class FeatureStore:
+    def __init__(self, directory, lags=8, features=FEATURES, warmup=1000, **params):
+        self.directory = directory
+        self.warmup = warmup
+        settings = {"version": VERSION, "lags": lags, "features": list(features), "params": {**DEFAULTS, **params}}
+        longest = max(settings["params"]["window"], settings["params"]["Slow_SMA"]) + lags + 1
+        if warmup < longest:
+            raise ValueError("warmup must cover the longest window plus the lags ({} prices)".format(longest))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "manifest.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+            if {key: self.manifest[key] for key in settings} != settings:
+                raise ValueError("{} holds features built with other settings".format(directory))
+            self._truncate()
+        else:
+            self.manifest = {**settings, "rows": 0, "segments": []}
+            self._save_manifest()
+        self.lags = lags
+        self.features = list(features)
+        self.params = settings["params"]
+
+    def __repr__(self):
+        return "FeatureStore(rows={}, segments={})".format(len(self), [s["name"] for s in self.manifest["segments"]])
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    @property
+    def columns(self):
+        return lag_columns(self.features, self.lags)
+
+    # SEGMENTS - {name: row slice} of the stored series
+    @property
+    def segments(self):
+        return {segment["name"]: slice(segment["start"], segment["stop"]) for segment in self.manifest["segments"]}
+
+    # ADD - appends the features of a price series (pd.Series or iterable of consecutive pd.Series chunks)
+    def add(self, name, prices, chunksize=2 ** 18):
+        if name in self.segments:
+            raise ValueError("segment {} is already in the store".format(name))
+        if isinstance(prices, pd.Series):
+            prices = _chunks(prices, chunksize)
+        start = len(self)
+        rows = 0
+        tail = None
+        last_time = None
+        # append mode writes at the end of the files, so it must be where the manifest ends
+        self._truncate()
+        handles = {file: open(os.path.join(self.directory, file), "ab") for file in self._files()}
+        finished = False
+        try:
+            for chunk in prices:
+                series = chunk if tail is None else pd.concat([tail, chunk])
+                built = _build(series, self.lags, self.features, self.params)
+                times = built.index.values.astype("datetime64[ns]").view(np.int64)
+                first = 0 if last_time is None else int(np.searchsorted(times, last_time, side="right"))
+                if first < len(times):
+                    built.X[first:].tofile(handles["X.f32"])
+                    built.base.Direction.to_numpy(dtype=np.int8)[first:].tofile(handles["y.i8"])
+                    times[first:].tofile(handles["time.i64"])
+                    rows += len(times) - first
+                    last_time = times[-1]
+                tail = series.iloc[-self.warmup:]
+            finished = True
+        finally:
+            for handle in handles.values():
+                handle.close()
+            if not finished:
+                # a failed chunk leaves rows the manifest does not count
+                self._truncate()
+        self.manifest["segments"].append({"name": name, "start": start, "stop": start + rows})
+        self.manifest["rows"] = start + rows
+        self._save_manifest()
+        return slice(start, start + rows)
+
+    # ADD_CSV - appends the features of the price column of a csv, read chunksize rows at a time
+    def add_csv(self, name, source_file, column="price", chunksize=2 ** 18):
+        reader = pd.read_csv(source_file, parse_dates=["time"], index_col="time", usecols=["time", column],
+                             chunksize=chunksize)
+        with reader:
+            return self.add(name, (chunk[column] for chunk in reader))
+
+    # ARRAYS - read-only memory maps of X (rows, features, lags), y (rows,) and time (rows,) in epoch ns
+    def arrays(self):
+        n = len(self)
+        shape = (n, len(self.features), self.lags)
+        if n == 0:
+            return np.empty(shape, np.float32), np.empty(0, np.int8), np.empty(0, np.int64)
+        return (np.memmap(os.path.join(self.directory, "X.f32"), np.float32, "r", shape=shape),
+                np.memmap(os.path.join(self.directory, "y.i8"), np.int8, "r", shape=(n,)),
+                np.memmap(os.path.join(self.directory, "time.i64"), np.int64, "r", shape=(n,)))
+
+    # MOMENTS - mean and sample std of every lag column over rows, streamed in chunks (like FeatureSet.moments)
+    def moments(self, rows=slice(None), chunk=2 ** 16):
+        X = self.arrays()[0]
+        start, stop, _ = rows.indices(len(self))
+        shift = np.asarray(X[start], dtype=np.float64).ravel() if stop > start else 0.0
+        total = np.zeros(X.shape[1] * X.shape[2])
+        squares = np.zeros_like(total)
+        for i in range(start, stop, chunk):
+            # sums of deviations from the first row keep the one-pass variance accurate
+            block = np.asarray(X[i:min(i + chunk, stop)], dtype=np.float64).reshape(-1, len(total)) - shift
+            total += block.sum(axis=0)
+            squares += np.einsum("ij,ij->j", block, block)
+        n = stop - start
+        mean = total / n
+        variance = (squares - n * mean ** 2) / (n - 1)
+        return (pd.Series(mean + shift, index=self.columns),
+                pd.Series(np.sqrt(np.maximum(variance, 0)), index=self.columns))
+
+    # LABELS - Direction labels of rows in chunks (for streaming cw())
+    def labels(self, rows=slice(None), chunk=2 ** 20):
+        y = self.arrays()[1]
+        start, stop, _ = rows.indices(len(self))
+        for i in range(start, stop, chunk):
+            yield np.asarray(y[i:min(i + chunk, stop)])
+
+    # STEPS - number of batches batches() yields per epoch
+    def steps(self, rows=slice(None), batch_size=32):
+        start, stop, _ = rows.indices(len(self))
+        return math.ceil(max(stop - start, 0) / batch_size)
+
+    # BATCHES - (standardized float32 X, float32 y) mini-batches of rows, shuffled and streamed from disk
+    #   Shuffling reads blocks of `block` consecutive rows in random order and shuffles
+    #   the rows of each block, so disk reads stay sequential. epochs=None repeats forever
+    #   (for model.fit with steps_per_epoch=steps()).
+    def batches(self, mu, sigma, rows=slice(None), batch_size=32, shuffle=True, block=2 ** 16, epochs=None,
+                seed=100):
+        X, y, _ = self.arrays()
+        width = len(self.columns)
+        mu = pd.Series(mu)[self.columns].to_numpy(dtype=np.float32)
+        sigma = pd.Series(sigma)[self.columns].to_numpy(dtype=np.float32)
+        start, stop, _ = rows.indices(len(self))
+        block = max(block - block % batch_size, batch_size)
+        rng = np.random.default_rng(seed)
+        epoch = 0
+        while epochs is None or epoch < epochs:
+            starts = np.arange(start, stop, block)
+            if shuffle:
+                # the shorter last block stays last so every other batch is full
+                full = starts[:-1] if (stop - start) % block else starts
+                rng.shuffle(full)
+            for first in starts:
+                last = min(first + block, stop)
+                block_X = np.array(X[first:last], dtype=np.float32).reshape(-1, width)
+                block_X -= mu
+                block_X /= sigma
+                block_y = np.asarray(y[first:last], dtype=np.float32)
+                if shuffle:
+                    order = rng.permutation(len(block_y))
+                    block_X, block_y = block_X[order], block_y[order]
+                for i in range(0, len(block_y), batch_size):
+                    yield block_X[i:i + batch_size], block_y[i:i + batch_size]
+            epoch += 1
+
+    # DATASET - batches() as a prefetching tf.data.Dataset (TensorFlow is imported here only)
+    def dataset(self, mu, sigma, rows=slice(None), batch_size=32, shuffle=True, block=2 ** 16, epochs=None,
+                seed=100):
+        import tensorflow as tf
+        signature = (tf.TensorSpec((None, len(self.columns)), tf.float32), tf.TensorSpec((None,), tf.float32))
+        dataset = tf.data.Dataset.from_generator(
+            lambda: self.batches(mu, sigma, rows, batch_size, shuffle, block, epochs, seed), output_signature=signature
+        )
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    # _TRUNCATE - cuts the data files to the rows in the manifest, dropping those of an add() that did not finish
+    def _truncate(self):
+        for name, width in self._files().items():
+            with open(os.path.join(self.directory, name), "ab") as f:
+                f.truncate(self.manifest["rows"] * width)
+
+    def _files(self):
+        return {"X.f32": 4 * len(self.manifest["features"]) * self.manifest["lags"], "y.i8": 1, "time.i64": 8}
+
+    def _save_manifest(self):
+        path = os.path.join(self.directory, "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(path + ".tmp", path)
+
+
+def _chunks(series, chunksize):
+    for i in range(0, len(series), chunksize):
+        yield series.iloc[i:i + chunksize]
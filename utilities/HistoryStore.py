@@ -0,0 +1,141 @@
+import os
+import numpy as np
+import pandas as pd
+import TickBuffer
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", ".history_cache")
+# candle length of the OANDA granularities, as pandas frequencies
+GRANULARITIES = {"S5": "5s", "S10": "10s", "S30": "30s", "M1": "1min", "M5": "5min", "M15": "15min",
+                 "M30": "30min", "H1": "1h", "H4": "4h", "D": "1D"}
+# one stored candle: open time (epoch ns) and close
+RECORD = np.dtype([("time", np.int64), ("c", np.float64)])
+
+
+# INCREMENTAL ON-DISK CANDLE HISTORY
+        # One append-only binary file of (time, close) records per instrument,
+        # granularity and price type. load() asks the history endpoint only for the
+        # candles after the last stored one (and for any older ones a longer warm-up
+        # needs), so a restart downloads minutes of candles instead of days.
+        # Only complete candles are stored, and a file never has a hole: a range that
+        # starts after the stored candles end replaces them.
+        # Parameters
+        # ----------
+        # directory: str (default = None)
+        #     folder of the history files; None uses data/.history_cache
+        # prune: boolean (default = True)
+        #     whether load() drops the stored candles older than the range it was asked
+        #     for, so a file holds at most one warm-up window instead of growing forever
+class HistoryStore:
+    def __init__(self, directory=None, prune=True):
+        self.directory = directory or CACHE_DIR
+        self.prune = prune
+
+    def __repr__(self):
+        return "HistoryStore(directory={})".format(self.directory)
+
+    # PATH - file holding the candles of an instrument, granularity and price type
+    def path(self, instrument, granularity="S5", price="M"):
+        return os.path.join(self.directory, "{}_{}_{}.bin".format(instrument, granularity, price))
+
+    # LOAD - candles between start and end (frame with a 'c' column), fetching only what is not stored
+    #   api is anything with a tpqoa-compatible get_history (a Trader, tpqoa or MockBroker)
+    def load(self, api, instrument, start, end, granularity="S5", price="M"):
+        start, end = pd.Timestamp(TickBuffer.to_ns(start)), pd.Timestamp(TickBuffer.to_ns(end))
+        step = pd.to_timedelta(GRANULARITIES[granularity])
+        stored = self.read(instrument, granularity, price=price)
+        if len(stored) and start < stored.index[0]:
+            older = _closes(self._fetch(api, instrument, start, stored.index[0] - step, granularity, price))
+            older = older[older.index < stored.index[0]]
+            self._write(instrument, granularity, price, pd.concat([older, stored.c]), mode="wb")
+            stored = self.read(instrument, granularity, price=price)
+        last = stored.index[-1] if len(stored) else None
+        if last is None or start >= last + 2 * step:
+            # nothing stored, or a hole between the stored candles and start: start over
+            fetched = _closes(self._fetch(api, instrument, start, end, granularity, price))
+            self._write(instrument, granularity, price, fetched, mode="wb")
+            return self.read(instrument, granularity, start, end, price)
+        if end - last >= 2 * step:
+            self.append(instrument, self._fetch(api, instrument, last + step, end, granularity, price), granularity,
+                        price)
+        if self.prune and stored.index[0] < start:
+            kept = self.read(instrument, granularity, start, price=price)
+            self._write(instrument, granularity, price, kept.c, mode="wb")
+        return self.read(instrument, granularity, start, end, price)
+
+    # READ - stored candles between start and end (all if None)
+    def read(self, instrument, granularity="S5", start=None, end=None, price="M"):
+        records = self._records(instrument, granularity, price)
+        times = records["time"]
+        first = 0 if start is None else np.searchsorted(times, TickBuffer.to_ns(start), side="left")
+        last = len(times) if end is None else np.searchsorted(times, TickBuffer.to_ns(end), side="right")
+        index = pd.DatetimeIndex(times[first:last].view("datetime64[ns]"), name="time")
+        return pd.DataFrame({"c": records["c"][first:last]}, index=index)
+
+    # APPEND - stores the complete candles of a get_history frame that are newer than the stored ones
+    def append(self, instrument, candles, granularity="S5", price="M"):
+        closes = _closes(candles)
+        records = self._records(instrument, granularity, price)
+        if len(records):
+            closes = closes[_times(closes.index) > records["time"][-1]]
+        self._write(instrument, granularity, price, closes, mode="ab")
+
+    # CLEAR - deletes the stored candles of an instrument, granularity and price type
+    def clear(self, instrument, granularity="S5", price="M"):
+        if os.path.exists(self.path(instrument, granularity, price)):
+            os.remove(self.path(instrument, granularity, price))
+
+    def _fetch(self, api, instrument, start, end, granularity, price):
+        return api.get_history(instrument=instrument, start=start, end=end, granularity=granularity, price=price,
+                               localize=True)
+
+    def _records(self, instrument, granularity, price):
+        path = self.path(instrument, granularity, price)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=RECORD)
+        with open(path, "rb") as f:
+            # a torn final record (interrupted append) is ignored
+            records = np.frombuffer(f.read(), dtype=RECORD, count=os.fstat(f.fileno()).st_size // RECORD.itemsize)
+        times = records["time"]
+        if len(times) > 1 and not (times[1:] > times[:-1]).all():
+            # appends raced: keep the first copy of every candle
+            ahead = np.concatenate([[True], times[1:] > np.maximum.accumulate(times)[:-1]])
+            records = records[ahead]
+        return records
+
+    def _write(self, instrument, granularity, price, closes, mode):
+        if not len(closes) and mode == "ab":
+            return
+        rows = np.empty(len(closes), dtype=RECORD)
+        rows["time"] = _times(closes.index)
+        rows["c"] = closes.to_numpy(dtype=np.float64)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(instrument, granularity, price)
+        if mode == "ab":
+            with open(path, "ab") as f:
+                # cut a torn final record (interrupted append) so the new records stay aligned
+                size = os.fstat(f.fileno()).st_size
+                if size % RECORD.itemsize:
+                    f.truncate(size - size % RECORD.itemsize)
+                rows.tofile(f)
+        else:
+            with open(path + ".tmp", "wb") as f:
+                rows.tofile(f)
+            os.replace(path + ".tmp", path)
+
+
+# epoch nanoseconds (UTC) of a DatetimeIndex
+def _times(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.values.astype("datetime64[ns]").view(np.int64)
+
+
+# closes of the complete candles of a get_history frame
+def _closes(candles):
+    if "complete" in candles.columns:
+        candles = candles[candles.complete.astype(bool)]
+    return candles.c.dropna()
+
+
+default_store = HistoryStore()
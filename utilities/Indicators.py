@@ -0,0 +1,217 @@
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+
+# INCREMENTAL INDICATORS
+        # Technical indicators that update in constant time per new bar, for live
+        # strategies that must not recompute over the whole history on every bar.
+        # Every indicator exposes update(x) -> current value and .value, which is
+        # NaN until enough bars have been seen (.ready). Values match the pandas
+        # formulas used by the vectorized backtesters (rolling(...).mean(),
+        # rolling(...).std(), ewm(span, adjust=False), ...); benchmarks/bench_indicators.py
+        # checks them against those values.
+        # Subclasses must implement update(x): take the next value in O(1), count it, set
+        # and return .value (NaN while not ready).
+class Indicator(ABC):
+    def __init__(self):
+        self.value = math.nan
+        self.count = 0
+
+    def __repr__(self):
+        return "{}(value={})".format(type(self).__name__, self.value)
+
+    @property
+    def ready(self):
+        return not math.isnan(self.value)
+
+    # UPDATE - Overriden method - adds the next value x and returns the new .value
+    @abstractmethod
+    def update(self, x):
+        ...
+
+
+# SMA - simple moving average over the last `window` values
+class SMA(Indicator):
+    def __init__(self, window):
+        super().__init__()
+        self.window = window
+        self._values = deque(maxlen=window)
+        self._sum = 0.0
+
+    def update(self, x):
+        if len(self._values) == self.window:
+            self._sum -= self._values[0]
+        self._values.append(x)
+        self._sum += x
+        self.count += 1
+        # re-sum once per window to stop floating point drift (amortized O(1))
+        if self.count % self.window == 0:
+            self._sum = math.fsum(self._values)
+        if len(self._values) == self.window:
+            self.value = self._sum / self.window
+        return self.value
+
+
+# ROLLING_STD - rolling sample standard deviation (ddof=1, as pandas rolling().std())
+class RollingStd(Indicator):
+    def __init__(self, window, ddof=1):
+        super().__init__()
+        self.window = window
+        self.ddof = ddof
+        self._values = deque(maxlen=window)
+        self._shift = None
+        self._sum = 0.0
+        self._squares = 0.0
+
+    def update(self, x):
+        if self._shift is None:
+            # sums are taken around the first value to limit cancellation
+            self._shift = x
+        y = x - self._shift
+        if len(self._values) == self.window:
+            old = self._values[0]
+            self._sum -= old
+            self._squares -= old * old
+        self._values.append(y)
+        self._sum += y
+        self._squares += y * y
+        self.count += 1
+        if self.count % self.window == 0:
+            self._sum = math.fsum(self._values)
+            self._squares = math.fsum(v * v for v in self._values)
+        if len(self._values) == self.window:
+            n = self.window
+            variance = (self._squares - self._sum * self._sum / n) / (n - self.ddof)
+            self.value = math.sqrt(max(variance, 0.0))
+        return self.value
+
+
+# BOLLINGER_BANDS - SMA +/- standard_deviations * rolling std; value is (lower, middle, upper)
+class BollingerBands(Indicator):
+    def __init__(self, window, standard_deviations=2):
+        super().__init__()
+        self.standard_deviations = standard_deviations
+        self.sma = SMA(window)
+        self.std = RollingStd(window)
+        self.value = (math.nan, math.nan, math.nan)
+
+    @property
+    def ready(self):
+        return self.sma.ready and self.std.ready
+
+    def update(self, x):
+        middle = self.sma.update(x)
+        width = self.std.update(x) * self.standard_deviations
+        self.count += 1
+        self.value = (middle - width, middle, middle + width)
+        return self.value
+
+
+# EMA - exponential moving average, ewm(span=span, adjust=False)
+class EMA(Indicator):
+    def __init__(self, span):
+        super().__init__()
+        self.span = span
+        self.alpha = 2 / (span + 1)
+
+    def update(self, x):
+        if self.count == 0:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        self.count += 1
+        return self.value
+
+
+# MACD - (fast EMA - slow EMA) minus its signal EMA; .macd and .signal hold the components
+class MACD(Indicator):
+    def __init__(self, fast=12, slow=26, signal=9):
+        super().__init__()
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal_ema = EMA(signal)
+        self.macd = math.nan
+        self.signal = math.nan
+
+    def update(self, x):
+        self.macd = self.fast.update(x) - self.slow.update(x)
+        self.signal = self.signal_ema.update(self.macd)
+        self.value = self.macd - self.signal
+        self.count += 1
+        return self.value
+
+
+# RSI - relative strength index of price changes
+    # Parameters
+    # ----------
+    # window: int
+    #     number of price changes averaged
+    # wilder: boolean (default = False)
+    #     False uses simple rolling means of gains/losses (as RSITest); True uses
+    #     Wilder's smoothing, seeded with the simple mean of the first window
+class RSI(Indicator):
+    def __init__(self, window=14, wilder=False):
+        super().__init__()
+        self.window = window
+        self.wilder = wilder
+        self._last = None
+        self._gain = SMA(window)
+        self._loss = SMA(window)
+        self._average_gain = math.nan
+        self._average_loss = math.nan
+
+    def update(self, x):
+        self.count += 1
+        if self._last is None:
+            self._last = x
+            return self.value
+        change = x - self._last
+        self._last = x
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self.wilder and self._gain.ready:
+            self._average_gain = (self._average_gain * (self.window - 1) + gain) / self.window
+            self._average_loss = (self._average_loss * (self.window - 1) + loss) / self.window
+        else:
+            self._average_gain = self._gain.update(gain)
+            self._average_loss = self._loss.update(loss)
+        if not math.isnan(self._average_gain):
+            if self._average_loss == 0:
+                self.value = math.nan if self._average_gain == 0 else 100.0
+            else:
+                self.value = 100 - 100 / (1 + self._average_gain / self._average_loss)
+        return self.value
+
+
+# ROLLING_EXTREMUM - rolling min/max over `window` values with a monotonic deque
+class RollingExtremum(Indicator):
+    def __init__(self, window, maximum):
+        super().__init__()
+        self.window = window
+        self.maximum = maximum
+        self._candidates = deque()
+
+    def update(self, x):
+        candidates = self._candidates
+        if self.maximum:
+            while candidates and candidates[-1][1] <= x:
+                candidates.pop()
+        else:
+            while candidates and candidates[-1][1] >= x:
+                candidates.pop()
+        candidates.append((self.count, x))
+        if candidates[0][0] <= self.count - self.window:
+            candidates.popleft()
+        self.count += 1
+        if self.count >= self.window:
+            self.value = candidates[0][1]
+        return self.value
+
+
+class RollingMin(RollingExtremum):
+    def __init__(self, window):
+        super().__init__(window, maximum=False)
+
+
+class RollingMax(RollingExtremum):
+    def __init__(self, window):
+        super().__init__(window, maximum=True)
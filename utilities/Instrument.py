@@ -1,21 +1,23 @@
+import os
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import yfinance as yf
+import BarCache
+import Plotting
+import Resampler
+import DataRegistry
 
 
 class Instrument:
-    def __init__(self, ticker, start, end, source_file=None, start_time=None, end_time=None, granularity="1d"):
+    def __init__(self, ticker, start, end, source_file=None, start_time=None, end_time=None, granularity="1d", use_cache=True):
         self._ticker = ticker
         self._start = start
         self._end = end
-        self._data = None
+        self._frame = None
         self.source_file = source_file
         self.start_time=start_time
         self.end_time=end_time
         self.granularity=granularity
-        self.get_data()
-        self.log_returns()
+        self.use_cache = use_cache
 
     def __repr__(self):
         return "Instrument(ticker={}, start={}, end={})".format(self._ticker, self._start, self._end)
@@ -25,43 +27,84 @@ class Instrument:
     
     def set_start(self, start):
         self._start = start
-        self.get_data()
+        self._frame = None
 
     def get_end(self):
         return self._end
     
     def set_end(self, end):
         self._end = end
-        self.get_data()
+        self._frame = None
 
     def get_ticker(self):
         return self._ticker
     
     def set_ticker(self, ticker):
         self._ticker = ticker
-        self.get_data()
+        self._frame = None
 
+    # _DATA - price frame with log returns, loaded on first access
+    @property
+    def _data(self):
+        if self._frame is None:
+            self._frame = self.get_data()
+            self.log_returns()
+        return self._frame
+
+    # REGISTRY_KEY - identifies this instrument's series in the dataset registry
+    def registry_key(self):
+        source = None
+        if self.source_file is not None:
+            source = (os.path.abspath(self.source_file), os.stat(self.source_file).st_mtime_ns)
+        return (self._ticker, self._start, self._end, self.granularity, source, self.start_time, self.end_time)
+
+    # GET_DATA - returns the shared price frame; columns added by the caller stay private
     def get_data(self):
+        data = DataRegistry.default_registry.get(self.registry_key(), self.load_data)
+        return data.copy(deep=False)
+
+    # LOAD_DATA - downloads or reads the price frame, bypassing the registry
+    def load_data(self):
         if self.source_file is None:
+            # yfinance is only needed (and imported) for downloads
+            import yfinance as yf
             data = yf.download(self._ticker, self._start, self._end, interval=self.granularity, progress=False).Close.to_frame()
             data.rename(columns={"Close": "price"}, inplace=True)
+        elif self.use_cache:
+            data = BarCache.default_cache.load(
+                self.source_file, self.read_source, self.granularity, self.start_time, self.end_time
+            )
         else:
-            data = pd.read_csv(self.source_file, parse_dates=["time"], index_col="time")
-            if self.start_time is not None and self.end_time is not None:
-                data = data.loc[(data.index.hour > self.start_time) & (data.index.hour < self.end_time)]
-            if self.granularity is not None:
+            data = self.read_source()
+        return data
+
+    # READ_SOURCE - parses the source file and applies the hour filter and resampling
+    def read_source(self):
+        data = pd.read_csv(self.source_file, parse_dates=["time"], index_col="time")
+        if self.start_time is not None and self.end_time is not None:
+            data = data.loc[(data.index.hour > self.start_time) & (data.index.hour < self.end_time)]
+        if self.granularity is not None:
+            if list(data.columns) == ["price"] and Resampler.is_fixed(self.granularity):
+                bars = Resampler.resample(data.price, [self.granularity])[self.granularity]
+                data = bars[["close"]].rename(columns={"close": "price"}).iloc[:-1]
+            else:
                 data = data.resample(self.granularity, label="right").last().dropna().iloc[:-1]
-        self._data = data
-        return self._data.copy()
+        return data
+
+    # OHLC - {bar length: open/high/low/close/count frame} of the price column, all bar lengths in one pass
+    def ohlc(self, bar_lengths, label="right"):
+        return Resampler.resample(self._data.price, bar_lengths, label)
 
     def log_returns(self):
         self._data["log_returns"] = np.log(self._data.price / self._data.price.shift(1))
 
     def plot_prices(self):
+        plt = Plotting.pyplot()
         self._data.price.plot(figsize=(12, 8))
         plt.title("Price Chart: {}".format(self._ticker), fontsize=13)
 
     def plot_returns(self, kind="ts"):
+        plt = Plotting.pyplot()
         if kind == "ts":
             self._data.log_returns.plot(figsize=(12, 8))
             plt.title("Returns: {}".format(self._ticker), fontsize=15)
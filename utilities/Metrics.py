@@ -0,0 +1,215 @@
+import math
+import numpy as np
+import pandas as pd
+
+YEAR = pd.Timedelta(days=365.25)
+# forex trades around the clock five days a week, so a year holds 5/7 of its hours in bars
+TRADING_YEAR = YEAR * 5 / 7
+
+
+# STREAMING PERFORMANCE METRICS
+        # Accumulates a strategy's performance one bar (and one closed trade) at a time, in
+        # constant time and memory per update, so live dashboards and backtests read the
+        # same numbers without recomputing over the whole history:
+        #     mean / variance of the per-bar log returns (Welford), CAGR, Sharpe and Sortino
+        #     ratios, equity peak and maximum drawdown of the log equity curve, hit ratio
+        #     (share of bars in the market that earned a positive return), exposure
+        #     (share of bars in the market), and the number, win ratio and P&L of the
+        #     closed trades (round trips from opening a position to closing or reversing it)
+        # Trader feeds it from its bars and closing fills, IterativeBacktester from its net
+        # asset value and trade log, and Vectorized.metrics() from the kernel's 'strategy'
+        # column through update_many(), which folds a whole array in with the same formulas.
+        # Annualization follows MonteCarlo: CAGR = exp(sum * bars_per_year / bars) - 1 and
+        # Sharpe = (mean * bars_per_year - risk_free) / (std * sqrt(bars_per_year)); all of
+        # them take bars_per_year from bars_per_year() below.
+        # Parameters
+        # ----------
+        # bars_per_year: float (default = 252)
+        #     bars in one year, used to annualize
+        # risk_free: float (default = 0.0)
+        #     annual (log) risk-free rate subtracted in the Sharpe and Sortino ratios
+class Metrics:
+    def __init__(self, bars_per_year=252, risk_free=0.0):
+        self.bars_per_year = bars_per_year
+        self.risk_free = risk_free
+        self.reset()
+
+    def __repr__(self):
+        return "Metrics(bars={}, trades={}, sharpe={:.3f}, max_drawdown={:.4f})".format(
+            self.bars, self.trades, self.sharpe, self.max_drawdown)
+
+    # RESET - forgets every bar and trade
+    def reset(self):
+        self.bars = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._downside = 0.0
+        self.total = 0.0
+        self.peak = 0.0
+        self.worst = 0.0
+        self.exposed = 0
+        self.hits = 0
+        self.trades = 0
+        self.wins = 0
+        self.pnl = 0.0
+
+    # UPDATE - one bar's log return, earned holding position (1, 0, -1 or units; NaN counts as
+    #   out of the market); a NaN return is skipped
+    def update(self, log_return, position=0):
+        if log_return != log_return:
+            return
+        self.bars += 1
+        delta = log_return - self.mean
+        self.mean += delta / self.bars
+        self._m2 += delta * (log_return - self.mean)
+        if log_return < 0:
+            self._downside += log_return * log_return
+        self.total += log_return
+        if self.total > self.peak:
+            self.peak = self.total
+        elif self.total - self.peak < self.worst:
+            self.worst = self.total - self.peak
+        if position > 0 or position < 0:
+            self.exposed += 1
+            if log_return > 0:
+                self.hits += 1
+
+    # UPDATE_MANY - update() for every bar of an array of log returns (and positions), in array
+    #   passes; batches are merged with the parallel form of Welford's algorithm
+    def update_many(self, log_returns, positions=None):
+        returns = np.asarray(log_returns, dtype=np.float64)
+        keep = ~np.isnan(returns)
+        if positions is not None:
+            positions = np.nan_to_num(np.asarray(positions, dtype=np.float64))[keep]
+        returns = returns[keep]
+        n = len(returns)
+        if n == 0:
+            return
+        mean = returns.mean()
+        deviations = returns - mean
+        m2 = np.dot(deviations, deviations)
+        delta = mean - self.mean
+        bars = self.bars + n
+        self._m2 += m2 + delta * delta * self.bars * n / bars
+        self.mean += delta * n / bars
+        self.bars = bars
+        downside = np.minimum(returns, 0.0)
+        self._downside += np.dot(downside, downside)
+        curve = np.cumsum(returns)
+        curve += self.total
+        peak = np.maximum.accumulate(curve)
+        np.maximum(peak, self.peak, out=peak)
+        self.worst = min(self.worst, (curve - peak).min())
+        self.total = curve[-1]
+        self.peak = peak[-1]
+        if positions is not None:
+            exposed = positions != 0
+            self.exposed += int(np.count_nonzero(exposed))
+            self.hits += int(np.count_nonzero(exposed & (returns > 0)))
+
+    # ADD_TRADE - one closed trade's profit and loss
+    def add_trade(self, pl):
+        self.trades += 1
+        self.pnl += pl
+        if pl > 0:
+            self.wins += 1
+
+    @property
+    def variance(self):
+        return self._m2 / (self.bars - 1) if self.bars > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    # ANNUAL_RETURN / ANNUAL_RISK - mean and standard deviation of the log returns, annualized
+    @property
+    def annual_return(self):
+        return self.mean * self.bars_per_year if self.bars else math.nan
+
+    @property
+    def annual_risk(self):
+        return self.std * math.sqrt(self.bars_per_year)
+
+    @property
+    def cagr(self):
+        return math.expm1(self.total * self.bars_per_year / self.bars) if self.bars else math.nan
+
+    @property
+    def sharpe(self):
+        return _ratio(self.annual_return - self.risk_free, self.annual_risk)
+
+    # SORTINO - Sharpe ratio with the downside deviation (root mean square of the losing bars)
+    @property
+    def sortino(self):
+        if not self.bars:
+            return math.nan
+        downside = math.sqrt(self._downside / self.bars) * math.sqrt(self.bars_per_year)
+        return _ratio(self.annual_return - self.risk_free, downside)
+
+    # EQUITY - equity curve value (1 at the start) now and at its peak
+    @property
+    def equity(self):
+        return math.exp(self.total)
+
+    @property
+    def equity_peak(self):
+        return math.exp(self.peak)
+
+    # DRAWDOWN - current and largest fall from the equity peak, as fractions of the peak
+    @property
+    def drawdown(self):
+        return -math.expm1(self.total - self.peak)
+
+    @property
+    def max_drawdown(self):
+        return -math.expm1(self.worst)
+
+    @property
+    def hit_ratio(self):
+        return self.hits / self.exposed if self.exposed else math.nan
+
+    @property
+    def exposure(self):
+        return self.exposed / self.bars if self.bars else math.nan
+
+    @property
+    def win_ratio(self):
+        return self.wins / self.trades if self.trades else math.nan
+
+    # SNAPSHOT - every metric as a plain dict (e.g. for a dashboard or a JSON log line)
+    def snapshot(self):
+        return {
+            "bars": self.bars,
+            "annual_return": self.annual_return,
+            "annual_risk": self.annual_risk,
+            "cagr": self.cagr,
+            "sharpe": self.sharpe,
+            "sortino": self.sortino,
+            "equity": self.equity,
+            "equity_peak": self.equity_peak,
+            "drawdown": self.drawdown,
+            "max_drawdown": self.max_drawdown,
+            "hit_ratio": self.hit_ratio,
+            "exposure": self.exposure,
+            "trades": self.trades,
+            "win_ratio": self.win_ratio,
+            "pnl": self.pnl,
+        }
+
+
+# BARS_PER_YEAR - bars of bar_length (a Timedelta or a string such as '1h') in one trading year
+def bars_per_year(bar_length):
+    return TRADING_YEAR / pd.to_timedelta(bar_length)
+
+
+# BAR_LENGTH - bar length of a datetime index: the median spacing of its bars, which weekend
+#   and holiday gaps do not move
+def bar_length(index):
+    return pd.Series(index).diff().median()
+
+
+def _ratio(numerator, denominator):
+    if denominator > 0:
+        return numerator / denominator
+    return math.nan
@@ -0,0 +1,240 @@
+import time
+import asyncio
+import numpy as np
+import pandas as pd
+import tpqoa
+import HistoryStore
+
+GRANULARITIES = HistoryStore.GRANULARITIES
+# most candles OANDA returns per history request
+PAGE_SIZE = 5000
+
+
+# SYNTHETIC_TICKS - random-walk (instrument, time_ns, bid, ask) ticks, round-robin over instruments
+def synthetic_ticks(instruments, n, start=None, interval='250ms', prices=None, volatility=2e-5,
+                    half_spread=5e-5, seed=100):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp.now('UTC').tz_localize(None) if start is None else pd.Timestamp(start)
+    step = pd.to_timedelta(interval).value
+    prices = dict(prices or {})
+    for instrument in instruments:
+        prices.setdefault(instrument, 1.1)
+    chunk = 65536
+    for offset in range(0, n, chunk):
+        size = min(chunk, n - offset)
+        shocks = rng.normal(0, volatility, size)
+        stamps = start.value + (np.arange(offset, offset + size) + 1) * step
+        for i in range(size):
+            instrument = instruments[(offset + i) % len(instruments)]
+            mid = prices[instrument] * (1 + shocks[i])
+            prices[instrument] = mid
+            yield instrument, int(stamps[i]), mid - half_spread, mid + half_spread
+
+
+# EXPAND_BARS - (instrument, time_ns, bid, ask) ticks that rebuild a close-price series
+    # Each row at time t becomes ticks_per_bar ticks spread over [t, t + bar_length),
+    # moving from the previous close to this row's close (plus noise) and ending
+    # exactly on it, so resampling the ticks like Trader does gives the same bars
+    # as resampling the closes.
+    # Parameters
+    # ----------
+    # prices: pd.Series
+    #     close prices indexed by time
+    # instrument: str
+    #     instrument name put on every tick
+    # bar_length: str or pd.Timedelta
+    #     span of time one row's ticks are spread over
+    # ticks_per_bar: int (default = 60)
+    #     ticks generated per row
+def expand_bars(prices, instrument, bar_length, ticks_per_bar=60, volatility=2e-5, half_spread=5e-5,
+                seed=100, chunk=4096):
+    rng = np.random.default_rng(seed)
+    times = prices.index.values.astype('datetime64[ns]').view(np.int64)
+    close = prices.to_numpy(dtype=np.float64)
+    previous = np.concatenate([close[:1], close[:-1]])
+    offsets = np.arange(ticks_per_bar) * (pd.to_timedelta(bar_length).value // ticks_per_bar)
+    fraction = (np.arange(ticks_per_bar) + 1) / ticks_per_bar
+    # noise vanishes on the last tick of every row
+    scale = np.sqrt(fraction * (1 - fraction)) * volatility * np.sqrt(ticks_per_bar)
+    for start in range(0, len(close), chunk):
+        rows = slice(start, start + chunk)
+        mids = previous[rows, None] + (close[rows] - previous[rows])[:, None] * fraction
+        mids *= 1 + rng.normal(0, 1, mids.shape) * scale
+        stamps = (times[rows, None] + offsets).ravel().tolist()
+        mids = mids.ravel().tolist()
+        for stamp, mid in zip(stamps, mids):
+            yield instrument, stamp, mid - half_spread, mid + half_spread
+
+
+# LOCAL STAND-IN FOR THE OANDA PRICING STREAM, HISTORY AND ORDER ENDPOINTS
+        # Subclasses tpqoa.tpqoa so it can sit under a Trader subclass in the MRO
+        # (class Offline(SMACrossover, MockBroker)): Trader.__init__ then reaches
+        # MockBroker.__init__ instead of opening an OANDA connection, and
+        # get_history / stream_data / create_order are served locally.
+        # Orders fill at the last ask (buys) or bid (sells) of the instrument.
+        # Parameters
+        # ----------
+        # conf_file: dict (default = None)
+        #     mock settings; lets Trader subclasses pass them through their conf_file
+        #     argument. Keyword arguments override it
+        # ticks: iterable (default = None)
+        #     (instrument, time, bid, ask) ticks to stream; None streams synthetic ticks
+        # n_ticks: int (default = 100000)
+        #     number of synthetic ticks
+        # tick_interval: str (default = '250ms')
+        #     spacing of synthetic ticks (simulated time, not wall time)
+        # tick_delay: float (default = 0.0)
+        #     wall-clock seconds the async stream waits between ticks
+        # order_latency: float (default = 0.0)
+        #     seconds an order round-trip takes
+        # latency_jitter: float (default = 0.0)
+        #     standard deviation (seconds) added to order_latency
+        # history: DataFrame (default = None)
+        #     candles with a 'c' column served by get_history; None generates a random walk
+        # start: str or Timestamp (default = None)
+        #     simulated session start returned by now() before the first tick; None is
+        #     the wall clock
+        # history_latency: float (default = 0.0)
+        #     seconds get_history takes per page of PAGE_SIZE candles
+        # history_store: HistoryStore (default = None)
+        #     on-disk candle store Trader.get_most_recent warms up from; None keeps
+        #     offline runs from reading or writing the live store
+class MockBroker(tpqoa.tpqoa):
+    def __init__(self, conf_file=None, **settings):
+        settings = {**(conf_file if isinstance(conf_file, dict) else {}), **settings}
+        self.tick_source = settings.get('ticks')
+        self.n_ticks = settings.get('n_ticks', 100000)
+        self.tick_interval = settings.get('tick_interval', '250ms')
+        self.tick_delay = settings.get('tick_delay', 0.0)
+        self.order_latency = settings.get('order_latency', 0.0)
+        self.latency_jitter = settings.get('latency_jitter', 0.0)
+        self.half_spread = settings.get('half_spread', 5e-5)
+        self.volatility = settings.get('volatility', 2e-5)
+        self.history = settings.get('history')
+        self.history_latency = settings.get('history_latency', 0.0)
+        self.history_store = settings.get('history_store')
+        self.history_requests = 0
+        self.history_candles = 0
+        self.ticks = 0
+        self.stop_stream = False
+        self.fills = []
+        self._rng = np.random.default_rng(settings.get('seed', 100))
+        self._prices = {}
+        self._quotes = {}
+        self._books = {}
+        self._clock = None if settings.get('start') is None else pd.Timestamp(settings['start'])
+        self._now = None
+
+    def __repr__(self):
+        return "MockBroker(order_latency={}, fills={})".format(self.order_latency, len(self.fills))
+
+    # TICK_STREAM - iterator over (instrument, time, bid, ask) for the given instruments
+    def tick_stream(self, instruments):
+        if self.tick_source is not None:
+            return (tick for tick in self.tick_source if tick[0] in instruments)
+        return synthetic_ticks(instruments, self.n_ticks, start=self._clock, interval=self.tick_interval,
+                               prices=self._prices, volatility=self.volatility, half_spread=self.half_spread,
+                               seed=int(self._rng.integers(2 ** 31)))
+
+    def _quote(self, instrument, time, bid, ask):
+        self._quotes[instrument] = (time, bid, ask)
+        self._prices[instrument] = (bid + ask) / 2
+        self._now = time
+
+    # NOW - simulated clock: time of the last tick, else the session start, else the wall clock
+    def now(self):
+        if self._now is not None:
+            return pd.Timestamp(self._now)
+        if self._clock is not None:
+            return self._clock
+        return pd.Timestamp.now('UTC').tz_localize(None)
+
+    # STREAM_DATA - tpqoa-compatible blocking stream calling self.on_success(time, bid, ask)
+    def stream_data(self, instrument, stop=None, ret=False, callback=None):
+        self.stop_stream = False
+        for name, tick_time, bid, ask in self.tick_stream(instrument.split(',')):
+            self._quote(name, tick_time, bid, ask)
+            self.ticks += 1
+            self.time = tick_time
+            if callback is not None:
+                callback(name, tick_time, bid, ask)
+            else:
+                self.on_success(tick_time, bid, ask)
+            if self.stop_stream or (stop is not None and self.ticks >= stop):
+                break
+
+    # STREAM_TICKS - async stream of (instrument, time, bid, ask)
+    async def stream_ticks(self, instruments):
+        self.stop_stream = False
+        for instrument, tick_time, bid, ask in self.tick_stream(list(instruments)):
+            if self.stop_stream:
+                break
+            self._quote(instrument, tick_time, bid, ask)
+            self.ticks += 1
+            yield instrument, tick_time, bid, ask
+            await asyncio.sleep(self.tick_delay)
+
+    # GET_HISTORY - candles with a 'c' column between start and end (synthetic unless history is set)
+    def get_history(self, instrument, start, end, granularity, price, localize=True):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if self.history is not None:
+            candles = self.history.loc[start:end]
+        else:
+            index = pd.date_range(start, end, freq=GRANULARITIES.get(granularity, granularity), name='time')
+            close = self._prices.get(instrument, 1.1) * np.exp(np.cumsum(self._rng.normal(0, self.volatility, len(index))))
+            if len(close):
+                self._prices[instrument] = close[-1]
+            self._clock = end
+            candles = pd.DataFrame({'o': close, 'h': close, 'l': close, 'c': close, 'volume': 1, 'complete': True},
+                                   index=index)
+        self.history_requests += 1
+        self.history_candles += len(candles)
+        if self.history_latency:
+            time.sleep(self.history_latency * max(1, -(-len(candles) // PAGE_SIZE)))
+        return candles
+
+    def _latency(self):
+        if self.latency_jitter:
+            return max(0.0, self.order_latency + self._rng.normal(0, self.latency_jitter))
+        return self.order_latency
+
+    def _fill(self, instrument, units):
+        tick_time, bid, ask = self._quotes.get(instrument, (self._clock, self._prices.get(instrument, 1.1),
+                                                            self._prices.get(instrument, 1.1)))
+        price = ask if units > 0 else bid
+        held, average = self._books.get(instrument, (0, 0.0))
+        pl = 0.0
+        if held and np.sign(held) != np.sign(units):
+            closed = min(abs(units), abs(held)) * np.sign(held)
+            pl = closed * (price - average)
+        new = held + units
+        if new == 0:
+            average = 0.0
+        elif held == 0 or np.sign(new) != np.sign(held):
+            average = price
+        elif np.sign(units) == np.sign(held):
+            average = (held * average + units * price) / new
+        self._books[instrument] = (new, average)
+        fill = {'time': str(pd.Timestamp(tick_time)), 'instrument': instrument, 'units': str(units),
+                'price': str(round(price, 5)), 'pl': str(round(pl, 4))}
+        self.fills.append(fill)
+        return fill
+
+    # CREATE_ORDER - tpqoa-compatible blocking market order
+    def create_order(self, instrument, units, price=None, sl_distance=None, tsl_distance=None,
+                     tp_price=None, comment=None, touch=False, suppress=False, ret=False):
+        latency = self._latency()
+        if latency:
+            time.sleep(latency)
+        fill = self._fill(instrument, units)
+        if not suppress:
+            print('\n\n', fill, '\n')
+        if ret:
+            return fill
+
+    # SUBMIT_ORDER - async market order; other coroutines keep running during the round-trip
+    async def submit_order(self, instrument, units):
+        latency = self._latency()
+        if latency:
+            await asyncio.sleep(latency)
+        return self._fill(instrument, units)
@@ -0,0 +1,13 @@
+# PYPLOT - matplotlib.pyplot with the project plot style, imported on first use
+#   matplotlib adds a noticeable share of import time, so modules that only plot on
+#   request call this inside their plot methods instead of importing it at the top
+def pyplot():
+    import matplotlib.pyplot as plt
+    global _styled
+    if not _styled:
+        plt.style.use("seaborn-v0_8")
+        _styled = True
+    return plt
+
+
+_styled = False
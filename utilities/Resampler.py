@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+DAY_NS = 24 * 3600 * 10 ** 9
+
+
+# OHLC - open/high/low/close/count bars of several bar lengths from one sorted pass over (times, prices)
+    # Bins match df.resample(bar_length, label=label) (closed on the left, anchored at
+    # midnight of the first day), with empty bins left out, i.e. the result of
+    # resample().first()/max()/min()/last()/count() followed by dropna().
+    # Only the finest bar length reads the prices; every coarser one that is a
+    # multiple of a finer one is aggregated from those bars.
+    # Parameters
+    # ----------
+    # times: pd.DatetimeIndex or np.ndarray
+    #     tick or bar times (naive UTC, or int64 epoch nanoseconds)
+    # prices: np.ndarray
+    #     prices at times; NaN prices are skipped like pandas does
+    # bar_lengths: list
+    #     fixed bar lengths, e.g. ['30s', '5min', '1h'] (see is_fixed)
+    # label: str (default = 'right')
+    #     'right' labels bars by their end, 'left' by their start
+def ohlc(times, prices, bar_lengths, label="right"):
+    times = _ns(times)
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(times) > 1 and (times[1:] < times[:-1]).any():
+        order = np.argsort(times, kind="stable")
+        times, prices = times[order], prices[order]
+    valid = ~np.isnan(prices)
+    if not valid.all():
+        times, prices = times[valid], prices[valid]
+    origin = times[0] - times[0] % DAY_NS if len(times) else 0
+    for bar_length in bar_lengths:
+        if not is_fixed(bar_length):
+            raise ValueError("bar length {} is not a fixed span of time".format(bar_length))
+    lengths = {bar_length: pd.to_timedelta(bar_length).value for bar_length in bar_lengths}
+    built = {}
+    for bar_length, length in sorted(lengths.items(), key=lambda item: item[1]):
+        finer = [ns for ns in built if length % ns == 0]
+        if finer:
+            source = built[max(finer)]
+            bins = (source[0] - origin) // length
+            starts = _run_starts(bins)
+            bars = (bins[starts],) + _reduce(starts, *source[1:4], closes=source[4], counts=source[5])
+        else:
+            bins, starts = _bin_starts(times, origin, length)
+            bars = (bins,) + _reduce(starts, prices, prices, prices, closes=prices, counts=None)
+        built[length] = (bars[0] * length + origin,) + bars[1:]
+    bars = {}
+    for bar_length, length in lengths.items():
+        starts, opens, highs, lows, closes, counts = built[length]
+        stamps = starts + length if label == "right" else starts
+        index = pd.DatetimeIndex(stamps.view("datetime64[ns]"), name="time")
+        bars[bar_length] = pd.DataFrame(
+            {"open": opens, "high": highs, "low": lows, "close": closes, "count": counts}, index=index
+        )
+    return bars
+
+
+# RESAMPLE - ohlc() of a price series; times of tz-aware series are binned in UTC
+def resample(series, bar_lengths, label="right"):
+    bars = ohlc(series.index, series.to_numpy(dtype=np.float64), bar_lengths, label)
+    if getattr(series.index, "tz", None) is not None:
+        for frame in bars.values():
+            frame.index = frame.index.tz_localize("UTC").tz_convert(series.index.tz)
+    return bars
+
+
+# IS_FIXED - whether a bar length is a fixed span of time ('30s', '1h', '1D'; not '1W', '1M' or '1B')
+def is_fixed(bar_length):
+    try:
+        offset = to_offset(bar_length)
+    except ValueError:
+        return False
+    # Day is a Tick in pandas 2 but not in pandas 3
+    return isinstance(offset, (pd.offsets.Tick, pd.offsets.Day))
+
+
+# bin numbers of the non-empty bins of sorted times and the position of their first time
+def _bin_starts(times, origin, length):
+    if len(times) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    first, last = (times[0] - origin) // length, (times[-1] - origin) // length
+    if last - first >= len(times):
+        # sparser than one time per bin: number every time instead of every bin
+        bins = (times - origin) // length
+        starts = _run_starts(bins)
+        return bins[starts], starts
+    # sorted times: bin edges are found by binary search instead of dividing every time
+    bins = np.arange(first, last + 1)
+    edges = np.searchsorted(times, origin + bins * length)
+    filled = np.diff(np.append(edges, len(times))) > 0
+    return bins[filled], edges[filled]
+
+
+def _run_starts(bins):
+    if len(bins) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.concatenate([[True], bins[1:] != bins[:-1]]))
+
+
+# open, high, low, close and count of the runs beginning at starts; counts=None counts rows
+def _reduce(starts, opens, highs, lows, closes, counts):
+    n = len(opens)
+    if len(starts) == 0:
+        empty = np.empty(0)
+        return empty, empty, empty, empty, np.empty(0, dtype=np.int64)
+    ends = np.append(starts[1:], n)
+    counts = np.diff(np.append(starts, n)) if counts is None else np.add.reduceat(counts, starts)
+    return (opens[starts], np.maximum.reduceat(highs, starts), np.minimum.reduceat(lows, starts), closes[ends - 1],
+            counts)
+
+
+def _ns(times):
+    if isinstance(times, np.ndarray) and times.dtype == np.int64:
+        return times
+    index = pd.DatetimeIndex(times)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.values.astype("datetime64[ns]", copy=False).view(np.int64)
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import bisect
+import threading
+from datetime import datetime, timezone
+
+# histogram bucket upper bounds (seconds): 1-2-5 steps from 1 us to 10 s
+BUCKETS = (1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3, 2e-3, 5e-3,
+           0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+# counters every Telemetry starts with, so exports always carry them
+COUNTERS = ("ticks", "bars", "decisions", "orders")
+
+
+# LATENCY HISTOGRAM
+        # Fixed buckets, so observe() is one binary search and a few additions and
+        # the counts map directly onto a Prometheus histogram. Quantiles are the
+        # upper bound of the bucket they fall in.
+        # Parameters
+        # ----------
+        # buckets: tuple (default = BUCKETS)
+        #     increasing bucket upper bounds in seconds; larger values land in +Inf
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def __repr__(self):
+        return "Histogram(count={}, mean={})".format(self.count, self.sum / self.count if self.count else None)
+
+    # OBSERVE - records one duration in seconds
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    # QUANTILE - upper bound of the bucket holding the q-th quantile (max for the +Inf bucket)
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    # SNAPSHOT - count, mean, max and p50/p95/p99 (seconds)
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+# LIVE-LOOP TELEMETRY
+        # Counters and latency histograms filled by Trader from a monotonic clock
+        # (time.perf_counter), and their export as Prometheus text, JSON snapshots
+        # appended to a size-rotated file, or a /metrics HTTP endpoint.
+        # Histograms are created on first use; Trader (and AsyncEngine, for the traders
+        # it drives) records the stages join, strategy and execute plus tick_to_decision
+        # and decision_to_fill.
+        # Exports run on daemon threads and read the numbers without locking, so a
+        # snapshot taken mid-update can be off by the one observation in flight.
+        # Parameters
+        # ----------
+        # prefix: str (default = 'trader')
+        #     prefix of the exported metric names
+        # labels: dict (default = None)
+        #     labels put on every exported metric, e.g. {'instrument': 'EUR_USD'}
+        # buckets: tuple (default = BUCKETS)
+        #     histogram bucket upper bounds in seconds
+class Telemetry:
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, prefix="trader", labels=None, buckets=BUCKETS):
+        self.prefix = prefix
+        self.labels = dict(labels or {})
+        self.buckets = tuple(buckets)
+        self.reset()
+
+    def __repr__(self):
+        return "Telemetry(prefix={}, counters={})".format(self.prefix, self.counters)
+
+    # RESET - zeroes the counters and drops the histograms
+    def reset(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.histograms = {}
+        self.started = self.clock()
+
+    # COUNT - adds n to a counter
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    # OBSERVE - records a duration (seconds) in the histogram of that name
+    def observe(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    # SINCE - records the time elapsed since start under name; returns the clock reading, so
+    #   consecutive stages can be timed with one clock call each
+    def since(self, name, start):
+        now = self.clock()
+        self.observe(name, now - start)
+        return now
+
+    # SNAPSHOT - JSON-ready counters and latency summaries (seconds)
+    def snapshot(self):
+        return {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "uptime": self.clock() - self.started,
+            "labels": self.labels,
+            "counters": dict(self.counters),
+            "latency": {name: histogram.snapshot() for name, histogram in list(self.histograms.items())},
+        }
+
+    # PROMETHEUS - counters and histograms in the Prometheus text exposition format
+    def prometheus(self):
+        labels = ",".join('{}="{}"'.format(key, _escape(value)) for key, value in self.labels.items())
+        lines = []
+        for name, value in list(self.counters.items()):
+            metric = "{}_{}_total".format(self.prefix, name)
+            lines += ["# TYPE {} counter".format(metric), "{}{} {}".format(metric, _braces(labels), value)]
+        for name, histogram in list(self.histograms.items()):
+            metric = "{}_{}_seconds".format(self.prefix, name)
+            counts = list(histogram.counts)
+            lines.append("# TYPE {} histogram".format(metric))
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = 'le="{}"'.format(bound if bound == "+Inf" else repr(bound))
+                lines.append("{}_bucket{} {}".format(metric, _braces(labels + "," + le if labels else le), cumulative))
+            lines.append("{}_sum{} {!r}".format(metric, _braces(labels), histogram.sum))
+            lines.append("{}_count{} {}".format(metric, _braces(labels), cumulative))
+        return "\n".join(lines) + "\n"
+
+    # WRITE - appends one JSON snapshot line to path, first rotating path -> path.1 -> ...
+    #   -> path.<backups> once it has grown past max_bytes
+    def write(self, path, max_bytes=10 * 2 ** 20, backups=5):
+        if max_bytes and os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+            for i in range(backups - 1, 0, -1):
+                if os.path.exists("{}.{}".format(path, i)):
+                    os.replace("{}.{}".format(path, i), "{}.{}".format(path, i + 1))
+            if backups:
+                os.replace(path, path + ".1")
+            else:
+                os.remove(path)
+        with open(path, "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    # EXPORT - calls write() every interval seconds from a daemon thread (and once more when
+    #   stopped); returns the threading.Event that stops it
+    def export(self, path, interval=60, max_bytes=10 * 2 ** 20, backups=5):
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.write(path, max_bytes, backups)
+            self.write(path, max_bytes, backups)
+
+        threading.Thread(target=run, name="telemetry-export", daemon=True).start()
+        return stop
+
+    # SERVE - Prometheus endpoint at http://host:port/metrics on a daemon thread; returns the
+    #   server (server.shutdown() stops it)
+    def serve(self, port=9108, host="127.0.0.1"):
+        # http.server pulls in the email package; only the endpoint needs it
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="telemetry-http", daemon=True).start()
+        return server
+
+
+def _braces(labels):
+    return "{" + labels + "}" if labels else ""
+
+
+# label value with backslashes, double quotes and newlines escaped, as the text format requires
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,88 @@
+import math
+import numpy as np
+import pandas as pd
+
+
+# TO_NS - converts a tick timestamp (ISO string, datetime, Timestamp or epoch ns) to UTC epoch nanoseconds
+def to_ns(time):
+    if isinstance(time, (int, np.integer)):
+        return int(time)
+    if isinstance(time, str):
+        # OANDA stamps look like 2023-08-01T12:00:00.123456789Z
+        return int(np.datetime64(time.rstrip('Z'), 'ns').astype(np.int64))
+    stamp = pd.Timestamp(time)
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_convert('UTC').tz_localize(None)
+    return stamp.value
+
+
+# RING-BUFFER TICK AGGREGATOR
+        # Keeps the most recent ticks in preallocated arrays and the running
+        # open/high/low/close of the current bar, so a finished bar is emitted in
+        # one step instead of re-resampling a growing tick frame.
+        # Bars are labelled by their right edge, like resample(bar_length, label='right').
+        # Parameters
+        # ----------
+        # bar_length: str or pd.Timedelta
+        #     length of one bar
+        # capacity: int (default = 65536)
+        #     number of most recent ticks kept in the ring buffer
+class TickBuffer:
+    def __init__(self, bar_length, capacity=2 ** 16):
+        self.bar_length = pd.to_timedelta(bar_length)
+        self.bar_ns = self.bar_length.value
+        self.capacity = capacity
+        self.times = np.empty(capacity, dtype=np.int64)
+        self.prices = np.empty(capacity, dtype=np.float64)
+        self.reset()
+
+    def __repr__(self):
+        return "TickBuffer(bar_length={}, ticks={})".format(self.bar_length, self.ticks)
+
+    def __len__(self):
+        return min(self.ticks, self.capacity)
+
+    # RESET - forgets all ticks and the bar in progress
+    def reset(self):
+        self.ticks = 0
+        self.bar_end = None
+        self.open = self.high = self.low = self.close = math.nan
+        self.count = 0
+        self.last_close = math.nan
+
+    # ADD - records one tick; returns the list of bars it completed (usually empty)
+    #   each bar is (end_ns, open, high, low, close, tick_count); bars skipped without
+    #   ticks carry the previous close forward with NaN open/high/low
+    def add(self, time_ns, price):
+        slot = self.ticks % self.capacity
+        self.times[slot] = time_ns
+        self.prices[slot] = price
+        self.ticks += 1
+        end = (time_ns // self.bar_ns + 1) * self.bar_ns
+        if self.bar_end is not None and end <= self.bar_end:
+            if price > self.high:
+                self.high = price
+            elif price < self.low:
+                self.low = price
+            self.close = price
+            self.count += 1
+            return []
+        finished = [] if self.bar_end is None else self._finish(end)
+        self.bar_end = end
+        self.open = self.high = self.low = self.close = price
+        self.count = 1
+        return finished
+
+    def _finish(self, next_end):
+        bars = [(self.bar_end, self.open, self.high, self.low, self.close, self.count)]
+        self.last_close = self.close
+        for gap in range(self.bar_end + self.bar_ns, next_end, self.bar_ns):
+            bars.append((gap, math.nan, math.nan, math.nan, self.last_close, 0))
+        return bars
+
+    # RECENT - (times, prices) of the ticks still held, oldest first
+    def recent(self):
+        n = len(self)
+        start = self.ticks - n
+        order = (np.arange(start, self.ticks)) % self.capacity
+        return self.times[order], self.prices[order]
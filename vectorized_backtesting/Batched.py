@@ -0,0 +1,53 @@
+import numpy as np
+
+# BATCHED PARAMETER-GRID HELPERS
+        # Evaluate many parameter combinations of a strategy at once: indicators for
+        # every window come out of one cumulative-sum pass, and positions, trades and
+        # returns of all combinations are handled as rows of one 2D array.
+
+
+# LOG_RETURNS - log returns of a price array (first element set to 0)
+def log_returns(price):
+    returns = np.zeros(len(price))
+    returns[1:] = np.log(price[1:] / price[:-1])
+    return returns
+
+
+# ROLLING_MEANS - (len(windows), n) array of rolling means from a single cumulative sum
+def rolling_means(values, windows):
+    values = np.asarray(values, dtype=float)
+    csum = np.empty(len(values) + 1)
+    csum[0] = 0.0
+    np.cumsum(values, out=csum[1:])
+    means = np.full((len(windows), len(values)), np.nan)
+    for row, window in enumerate(windows):
+        means[row, window - 1:] = (csum[window:] - csum[:-window]) / window
+    return means
+
+
+# EVALUATE_GRID - performance of every row of a (k, n) position array
+    # Parameters
+    # ----------
+    # positions: np.ndarray
+    #     (k, n) float positions, one row per parameter combination (overwritten)
+    # returns: np.ndarray
+    #     (n,) log returns aligned with the positions
+    # tc: float
+    #     proportional transaction/trading costs per trade
+    # first: np.ndarray
+    #     (k,) index of the first bar of each row that is dropped as warm-up;
+    #     only bars after it are scored, matching test_strategy()'s dropna()
+def evaluate_grid(positions, returns, tc, first):
+    rows = np.arange(len(positions))
+    first = np.asarray(first)
+    # back-fill the warm-up with the first scored position so it adds no trades
+    for row, bar in zip(rows, first):
+        positions[row, :bar] = positions[row, bar]
+    creturns = np.cumsum(returns)
+    held = positions[rows, first]
+    # strategy log return = sum of position(t-1) * return(t) over the scored bars
+    strategy = positions[:, :-1] @ returns[1:] - held * creturns[first]
+    trades = np.abs(np.diff(positions, axis=1)).sum(axis=1)
+    performance = np.exp(strategy - trades * tc)
+    buy_and_hold = np.exp(creturns[-1] - creturns[first])
+    return performance, buy_and_hold, trades
@@ -8,7 +8,7 @@ class BollingerBandsTest(Vectorized.Vectorized):
         self.standard_deviations = standard_deviations
         super().__init__(symbol, start, end, tc, granularity=granularity)
 
-    def test_strategy(self):
+    def test_strategy(self, lean=False):
         df = self._data.copy().dropna()
         df['Returns'] = np.log(df.price.div(df.price.shift(1)))
         df.dropna(inplace=True)
@@ -29,19 +29,21 @@ class BollingerBandsTest(Vectorized.Vectorized):
         # Otherwise, we hold the previous position, and we can achieve this with a forward fill (ffil), 
         #   except for the first position (NaN), where we will fill with 0
         df['position'] = df['position'].ffill().fillna(0)
-        # Shift strategy by 1 to get rid of first value
-        df['strategy'] = df['position'].shift(1) * df['Returns']
-        # determine the number of trades in each bar
-        df['trades'] = df['position'].diff().fillna(0).abs()
-        df['hits'] = np.sign(df['Returns']) * np.sign(df['position'])
-        # subtract transaction/trading costs (# of trades * half spread) from pre-cost return
-        df['strategy'] = df['strategy'] - (df['trades'] * self.tc)
-        df.dropna(inplace=True)
-        # Cumulative performance columns
-        df['Standard Cumulative Returns'] = df['Returns'].cumsum().apply(np.exp)
-        df['Strategy Cumulative Returns'] = df['strategy'].cumsum().apply(np.exp)
-        self.results = df
-        # Absolute performance of strategy and out/under-performance of strategy
-        performance = df['Strategy Cumulative Returns'].iloc[-1]
-        outperformance = df['Standard Cumulative Returns'].iloc[-1]
-        return round(performance, 6), round(outperformance, 6)
\ No newline at end of file
+        return self.evaluate(df, lean)
+
+    # POSITIONS - test_strategy() positions of every column of a price frame (see Vectorized.positions)
+    def positions(self, price, returns):
+        # the bands start after the first return, as in test_strategy()
+        price = price.where(returns.notna())
+        sma = price.rolling(self.SMA).mean()
+        std = price.rolling(self.SMA).std()
+        lower = sma - std * self.standard_deviations
+        upper = sma + std * self.standard_deviations
+        kept = (lower.notna() & upper.notna()).to_numpy()
+        distance = price - sma
+        position = np.where(price < lower, 1.0, np.nan)
+        position = np.where(price > upper, -1.0, position)
+        position = np.where(distance * distance.shift(1) < 0, 0.0, position)
+        position = pd.DataFrame(position).ffill().fillna(0).to_numpy(copy=True)
+        position[~kept] = np.nan
+        return position, kept
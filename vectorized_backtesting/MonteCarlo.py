@@ -0,0 +1,246 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utilities'))
+import Metrics
+
+# statistics computed for every resampled path
+METRICS = ['cagr', 'sharpe', 'max_drawdown']
+# resampling methods run() knows
+METHODS = ['block', 'shuffle', 'synthetic']
+
+
+# MONTE CARLO / BOOTSTRAP ROBUSTNESS ENGINE
+        # Resamples a strategy's per-bar log returns (the 'strategy' column of a
+        # Vectorized results frame) into thousands of paths and reports the
+        # distribution of CAGR, Sharpe ratio and maximum drawdown on them:
+        #     block     - circular block bootstrap (keeps autocorrelation within blocks)
+        #     shuffle   - the trades (runs of one held position) in random order; the
+        #                 return multiset is unchanged, so only the drawdown varies
+        #     synthetic - i.i.d. normal returns with the series' mean and volatility
+        # Paths are generated and scored as (paths x bars) matrices, a chunk of paths at a
+        # time, and the chunks are spread over a process pool. Every chunk draws from its
+        # own seed, so results do not depend on n_jobs.
+        # Parameters
+        # ----------
+        # returns: pd.Series
+        #     per-bar log returns after costs
+        # position: pd.Series (default = None)
+        #     position taken on every bar (held, and earning, from the next bar on), needed
+        #     by 'shuffle' to find the trades
+        # bars_per_year: float (default = None)
+        #     bars in one year; None uses Metrics.bars_per_year() of the bar length of the index
+        # risk_free: float (default = 0.0)
+        #     annual (log) risk-free rate subtracted in the Sharpe ratio
+        # block: int (default = None)
+        #     block length of 'block'; None uses the cube root of the number of bars
+        # costs: pd.Series (default = None)
+        #     trading costs (log) already subtracted from returns on every bar; 'shuffle'
+        #     moves each one into the trade it opens
+class MonteCarlo:
+    def __init__(self, returns, position=None, bars_per_year=None, risk_free=0.0, block=None, costs=None):
+        returns = returns.dropna()
+        self.returns = returns
+        self.position = None if position is None else position.reindex(returns.index)
+        self.costs = None if costs is None else costs.reindex(returns.index).fillna(0.0)
+        if bars_per_year is None:
+            bars_per_year = Metrics.bars_per_year(Metrics.bar_length(returns.index))
+        self.bars_per_year = bars_per_year
+        self.risk_free = risk_free
+        self.block = block or max(1, int(round(len(returns) ** (1 / 3))))
+        self.distributions = None
+
+    # FROM_TESTER - engine over the results of a Vectorized test_strategy() run
+    @classmethod
+    def from_tester(cls, tester, **kwargs):
+        if tester.results is None:
+            raise ValueError("run test_strategy() first")
+        results = tester.results
+        return cls(results['strategy'], results['position'], costs=results['trades'] * tester.tc, **kwargs)
+
+    def __repr__(self):
+        return "MonteCarlo(bars={}, bars_per_year={:.1f}, block={})".format(
+            len(self.returns), self.bars_per_year, self.block)
+
+    # OBSERVED - METRICS of the actual return series
+    def observed(self):
+        returns = self.returns.to_numpy(dtype=np.float64)[None, :]
+        return pd.Series(_metrics(returns, self.bars_per_year, self.risk_free)[:, 0], index=METRICS)
+
+    # TRADES - (start, length) of the runs of one held position, the units 'shuffle' reorders
+    #   Bar t earns the position taken on bar t-1, so the runs are found on the position
+    #   shifted by one bar (the first bar joins the run after it)
+    def trades(self):
+        if self.position is None:
+            raise ValueError("'shuffle' needs the position series")
+        held = self.position.shift(1).bfill().to_numpy(dtype=np.float64)
+        starts = np.flatnonzero(np.concatenate([[True], held[1:] != held[:-1]]))
+        return starts, np.diff(np.append(starts, len(held)))
+
+    # TRADE_RETURNS - the returns 'shuffle' reorders: the cost paid on the bar a position is
+    #   taken is moved to the next bar, the first one held at that position, so every trade
+    #   carries its own entry cost (a cost on the last bar stays there)
+    def trade_returns(self):
+        returns = self.returns.to_numpy(dtype=np.float64, copy=True)
+        if self.costs is not None:
+            costs = self.costs.to_numpy(dtype=np.float64)
+            returns[:-1] += costs[:-1]
+            returns[1:] -= costs[:-1]
+        return returns
+
+    # RUN - paths resamples per method; returns {method: DataFrame of METRICS, one row per path}
+    #   chunk is the number of paths scored per task (None fits one task's matrix in ~64 MB)
+    def run(self, paths=10000, methods=METHODS, n_jobs=None, seed=100, chunk=None):
+        returns = self.returns.to_numpy(dtype=np.float64)
+        shuffled = self.trade_returns() if 'shuffle' in methods else returns
+        chunk = chunk or max(1, min(paths, 2 ** 23 // len(returns)))
+        sizes = [min(chunk, paths - start) for start in range(0, paths, chunk)]
+        tasks = []
+        for method, sequence in zip(methods, np.random.SeedSequence(seed).spawn(len(methods))):
+            if method not in METHODS:
+                raise ValueError("unknown method {} (expected one of {})".format(method, METHODS))
+            data = self.trades() if method == 'shuffle' else self.block
+            for size, child in zip(sizes, sequence.spawn(len(sizes))):
+                tasks.append((method, size, child, data))
+        n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+        if n_jobs <= 1:
+            _init_worker(returns, shuffled, self.bars_per_year, self.risk_free)
+            scores = [_simulate(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(n_jobs, initializer=_init_worker,
+                                     initargs=(returns, shuffled, self.bars_per_year, self.risk_free)) as pool:
+                scores = list(pool.map(_simulate, tasks))
+        self.distributions = {}
+        for method in methods:
+            blocks = [score for task, score in zip(tasks, scores) if task[0] == method]
+            self.distributions[method] = pd.DataFrame(np.concatenate(blocks, axis=1).T, columns=METRICS)
+        return self.distributions
+
+    # SUMMARY - observed value, mean and percentiles of every metric per method, and the share
+    #   of paths losing money (CAGR < 0)
+    def summary(self, percentiles=(5, 25, 50, 75, 95)):
+        if self.distributions is None:
+            raise ValueError("run run() first")
+        observed = self.observed()
+        rows = {}
+        for method, frame in self.distributions.items():
+            for metric in METRICS:
+                values = frame[metric].to_numpy()
+                row = {'observed': observed[metric], 'mean': values.mean()}
+                row.update(zip(['p{}'.format(p) for p in percentiles], np.percentile(values, percentiles)))
+                row['prob_loss'] = (frame['cagr'].to_numpy() < 0).mean() if metric == 'cagr' else np.nan
+                rows[(method, metric)] = row
+        return pd.DataFrame(rows).T
+
+
+# Worker-side state of MonteCarlo.run(): the return series (and the one 'shuffle' reorders) and
+#   annualization, set once per process
+_worker = {}
+
+
+def _init_worker(returns, shuffled, bars_per_year, risk_free):
+    _worker['returns'] = returns
+    _worker['shuffled'] = shuffled
+    _worker['bars_per_year'] = bars_per_year
+    _worker['risk_free'] = risk_free
+
+
+# _SIMULATE - (len(METRICS), size) metrics of one chunk of resampled paths
+def _simulate(task):
+    method, size, sequence, data = task
+    returns = _worker['returns']
+    n = len(returns)
+    rng = np.random.default_rng(sequence)
+    if method == 'block':
+        # circular blocks: every block is one row of the windows over the series wrapped around
+        windows = sliding_window_view(np.concatenate([returns, returns[:data - 1]]), data)
+        paths = windows[rng.integers(0, n, (size, -(-n // data)))].reshape(size, -1)[:, :n]
+    elif method == 'shuffle':
+        starts, lengths = data
+        order = np.argsort(rng.random((size, len(starts))), axis=1)
+        lengths = lengths[order]
+        # bar j of a path falls in a shuffled trade that began at output bar first; it reads
+        # the original bar start + (j - first)
+        first = np.cumsum(lengths, axis=1) - lengths
+        shift = np.repeat((starts[order] - first).ravel(), lengths.ravel()).reshape(size, n)
+        paths = _worker['shuffled'][shift + np.arange(n)]
+    else:
+        paths = rng.standard_normal((size, n))
+        paths *= returns.std()
+        paths += returns.mean()
+    return _metrics(paths, _worker['bars_per_year'], _worker['risk_free'])
+
+
+# _METRICS - (len(METRICS), paths) CAGR, Sharpe ratio and max drawdown of (paths, n) log returns
+def _metrics(paths, bars_per_year, risk_free):
+    n = paths.shape[1]
+    kernel = jit_kernel()
+    if kernel is not None:
+        stats = np.empty((3, len(paths)))
+        kernel(np.ascontiguousarray(paths), stats)
+        total, squares, worst = stats
+    else:
+        total, squares, worst = _path_stats(paths)
+    mean = total / n
+    max_drawdown = -np.expm1(worst)
+    cagr = np.expm1(total * bars_per_year / n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.sqrt(np.maximum(squares - total * mean, 0.0) / (n - 1))
+        sharpe = (mean * bars_per_year - risk_free) / (std * np.sqrt(bars_per_year))
+    return np.stack([cagr, sharpe, max_drawdown])
+
+
+# _PATH_STATS - sum, sum of squares and worst drawdown (log) of every row, with array passes
+def _path_stats(paths):
+    squares = np.einsum('ij,ij->i', paths, paths)
+    equity = np.cumsum(paths, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.subtract(equity, peak, out=peak)
+    # the curve starts at 0, so a path that never rises draws down from there
+    worst = np.minimum(peak.min(axis=1), equity.min(axis=1))
+    return equity[:, -1], squares, np.minimum(worst, 0.0)
+
+
+# PATH_STATS - _path_stats() as one loop over every path, for numba
+    # Parameters
+    # ----------
+    # paths: np.ndarray
+    #     (paths, n) log returns
+    # out: np.ndarray
+    #     (3, paths) output rows: sum, sum of squares, worst drawdown of the log equity curve
+def path_stats(paths, out):
+    for i in range(paths.shape[0]):
+        total = 0.0
+        squares = 0.0
+        peak = 0.0
+        worst = 0.0
+        for j in range(paths.shape[1]):
+            value = paths[i, j]
+            total += value
+            squares += value * value
+            if total > peak:
+                peak = total
+            elif total - peak < worst:
+                worst = total - peak
+        out[0, i] = total
+        out[1, i] = squares
+        out[2, i] = worst
+
+
+# JIT_KERNEL - path_stats compiled with numba, or None when numba is not installed
+#   (the array passes of _path_stats are used instead); numba is imported on first use
+def jit_kernel():
+    global _jit
+    if _jit is None:
+        try:
+            from numba import njit
+            _jit = njit(cache=True)(path_stats)
+        except ImportError:
+            _jit = False
+    return _jit or None
+
+
+_jit = None
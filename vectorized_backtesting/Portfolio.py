@@ -0,0 +1,157 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utilities'))
+import Plotting
+import Vectorized
+
+# per-instrument statistics, as in Vectorized.results_overview
+STATS = ['performance', 'buy_and_hold', 'outperformance', 'trades', 'hit_ratio', 'bars']
+
+
+# PORTFOLIO VECTORIZED BACKTEST
+        # Runs one strategy over many instruments at once: prices are aligned into a
+        # (time x instrument) frame, the strategy's positions() computes the positions
+        # of every column in one pass, and strategy returns, trades and hits are (n, k)
+        # array operations. Each column is scored exactly as test_strategy() scores that
+        # instrument's aligned prices, so the cost grows with the total number of bars,
+        # not with the number of instruments.
+        # The portfolio earns the weighted simple returns of the instruments, rebalanced
+        # to the weights every bar (rebalance=True) or left to drift from them.
+        # Parameters
+        # ----------
+        # tester: Vectorized
+        #     strategy instance (e.g. SMACrossoverTest) holding the parameters and tc; its
+        #     own data is not used. Its class must override positions() (a TypeError is
+        #     raised otherwise, e.g. for DeepNeuralNetworkTest)
+        # prices: DataFrame
+        #     close prices, one column per instrument
+        # weights: dict or list (default = None)
+        #     fraction of capital per instrument (by column name or in column order);
+        #     None weights every instrument equally
+        # rebalance: boolean (default = True)
+        #     whether the weights are restored every bar
+class Portfolio:
+    def __init__(self, tester, prices, weights=None, rebalance=True):
+        if type(tester).positions is Vectorized.Vectorized.positions:
+            raise TypeError("{} does not implement the column-wise positions() Portfolio needs".format(
+                type(tester).__name__))
+        self.tester = tester
+        self.tc = tester.tc
+        self.prices = prices.astype(np.float64)
+        self.weights = self.normalize_weights(weights)
+        self.rebalance = rebalance
+        self.results = None
+        self.benchmark = None
+        self.results_overview = None
+
+    # FROM_INSTRUMENTS - aligns the price columns of several instruments
+    #   instruments: list of Instrument (named by ticker) or dict {name: Instrument}
+    #   join: 'inner' keeps the bars every instrument has; 'outer' keeps all bars, carrying
+    #   each price forward over the bars its instrument lacks (those earn nothing)
+    @classmethod
+    def from_instruments(cls, tester, instruments, join='inner', weights=None, rebalance=True):
+        if not isinstance(instruments, dict):
+            instruments = {instrument.get_ticker(): instrument for instrument in instruments}
+        prices = pd.concat({name: instrument.get_data().price for name, instrument in instruments.items()},
+                           axis=1, join=join).sort_index()
+        if join == 'outer':
+            prices = prices.ffill()
+        return cls(tester, prices, weights, rebalance)
+
+    def __repr__(self):
+        return "Portfolio(tester={}, instruments={}, bars={})".format(
+            type(self.tester).__name__, len(self.prices.columns), len(self.prices))
+
+    # NORMALIZE_WEIGHTS - weights as an array in column order
+    def normalize_weights(self, weights):
+        columns = list(self.prices.columns)
+        if weights is None:
+            return np.full(len(columns), 1 / len(columns))
+        if isinstance(weights, dict):
+            weights = [weights.get(column, 0.0) for column in columns]
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(weights) != len(columns):
+            raise ValueError("got {} weights for {} instruments".format(len(weights), len(columns)))
+        return weights
+
+    # TEST_STRATEGY - backtests every instrument and the portfolio
+    #   fills results / benchmark (equity curves per instrument plus a 'Portfolio' column) and
+    #   results_overview (STATS per instrument plus the portfolio); returns the portfolio's
+    #   (performance, buy_and_hold)
+    def test_strategy(self):
+        price = self.prices
+        returns = np.log(price / price.shift(1))
+        position, scored = self.tester.positions(price, returns)
+        # one row per instrument, so every pass below runs along contiguous memory
+        returns = np.ascontiguousarray(returns.to_numpy().T)
+        position = np.ascontiguousarray(np.asarray(position, dtype=np.float64).T)
+        scored = np.asarray(scored).T
+
+        # Bar t earns position(t-1) * returns(t) and pays tc * |position(t) - position(t-1)|
+        strategy = np.empty(returns.shape)
+        strategy[:, 0] = np.nan
+        np.multiply(position[:, :-1], returns[:, 1:], out=strategy[:, 1:])
+        trades = np.zeros(returns.shape)
+        np.subtract(position[:, 1:], position[:, :-1], out=trades[:, 1:])
+        np.abs(trades, out=trades)
+        np.nan_to_num(trades, copy=False, nan=0.0)
+        strategy -= trades * self.tc
+        hits = np.sign(returns) * np.sign(position)
+        mask = scored & ~np.isnan(strategy) & ~np.isnan(hits)
+
+        # bars an instrument does not score earn nothing
+        strategy[~mask] = 0.0
+        held = np.where(mask, returns, 0.0)
+        trades[~mask] = 0.0
+        bars = mask.sum(axis=1)
+        performance = np.exp(strategy.sum(axis=1))
+        buy_and_hold = np.exp(held.sum(axis=1))
+        overview = pd.DataFrame({
+            'performance': performance,
+            'buy_and_hold': buy_and_hold,
+            'outperformance': performance - buy_and_hold,
+            'trades': trades.sum(axis=1),
+            'hit_ratio': np.where(bars > 0, ((hits == 1) & mask).sum(axis=1) / np.maximum(bars, 1), np.nan),
+            'bars': bars,
+        }, index=price.columns)
+
+        self.results = self.equity(strategy)
+        self.benchmark = self.equity(held)
+        overview.loc['Portfolio'] = {
+            'performance': self.results['Portfolio'].iloc[-1],
+            'buy_and_hold': self.benchmark['Portfolio'].iloc[-1],
+            'outperformance': self.results['Portfolio'].iloc[-1] - self.benchmark['Portfolio'].iloc[-1],
+            'trades': overview.trades.sum(),
+            'hit_ratio': np.nan,
+            'bars': int(mask.any(axis=0).sum()),
+        }
+        self.results_overview = overview
+        portfolio = overview.loc['Portfolio']
+        return round(portfolio.performance, 6), round(portfolio.buy_and_hold, 6)
+
+    # EQUITY - equity curves of (k, n) log returns (one row per instrument) and of the weighted portfolio
+    def equity(self, log_returns):
+        curves = np.cumsum(log_returns, axis=1)
+        np.exp(curves, out=curves)
+        if self.rebalance:
+            portfolio = np.cumprod(1 + self.weights @ np.expm1(log_returns))
+        else:
+            portfolio = self.weights @ curves + (1 - self.weights.sum())
+        frame = pd.DataFrame(curves.T, index=self.prices.index, columns=self.prices.columns)
+        frame['Portfolio'] = portfolio
+        return frame
+
+    # PLOT_RESULTS - portfolio equity against the same weights held in every instrument
+    def plot_results(self, instruments=False):
+        if self.results is None:
+            print("Run test_strategy() first.")
+            return
+        Plotting.pyplot()
+        title = "{} portfolio of {} instruments with TC = {}".format(
+            type(self.tester).__name__, len(self.prices.columns), self.tc)
+        frame = pd.DataFrame({'Strategy': self.results['Portfolio'], 'Buy and Hold': self.benchmark['Portfolio']})
+        if instruments:
+            frame = frame.join(self.results.drop(columns='Portfolio'))
+        frame.plot(title=title, figsize=(12, 8))
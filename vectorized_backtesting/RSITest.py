@@ -9,7 +9,7 @@ class RSITest(Vectorized.Vectorized):
         self.window = window
         super().__init__(symbol, start, end, tc, granularity=granularity)
 
-    def test_strategy(self):
+    def test_strategy(self, lean=False):
         df = self._data.copy().dropna()
         df['Returns'] = np.log(df.price.div(df.price.shift(1)))
         df.dropna(inplace=True)
@@ -27,19 +27,17 @@ class RSITest(Vectorized.Vectorized):
         df['position'] = np.where(df['RSI'] < self.sell_threshold, -1, df['position'])
         # Assume a neutral hold otherwise
         df['position'] = df['position'].ffill().fillna(0)
-        # Shift strategy by 1 to get rid of first value
-        df['strategy'] = df['position'].shift(1) * df['Returns']
-        # determine the number of trades in each bar
-        df['trades'] = df['position'].diff().fillna(0).abs()
-        df['hits'] = np.sign(df['Returns']) * np.sign(df['position'])
-        # subtract transaction/trading costs (# of trades * half spread) from pre-cost return
-        df['strategy'] = df['strategy'] - (df['trades'] * self.tc)
-        df.dropna(inplace=True)
-        # Cumulative performance columns
-        df['Standard Cumulative Returns'] = df['Returns'].cumsum().apply(np.exp)
-        df['Strategy Cumulative Returns'] = df['strategy'].cumsum().apply(np.exp)
-        self.results = df
-        # Absolute performance of strategy and out/under-performance of strategy
-        performance = df['Strategy Cumulative Returns'].iloc[-1]
-        outperformance = df['Standard Cumulative Returns'].iloc[-1]
-        return round(performance, 6), round(outperformance, 6)
\ No newline at end of file
+        return self.evaluate(df, lean)
+
+    # POSITIONS - test_strategy() positions of every column of a price frame (see Vectorized.positions)
+    def positions(self, price, returns):
+        change = price.where(returns.notna()).diff()
+        gain = change.mask(change < 0, 0.0)
+        loss = -change.mask(change > 0, -0.0)
+        rsi = 100 - 100 / (1 + gain.rolling(self.window).mean() / loss.rolling(self.window).mean())
+        kept = returns.notna().to_numpy()
+        position = np.where(rsi > self.buy_threshold, 1.0, np.nan)
+        position = np.where(rsi < self.sell_threshold, -1.0, position)
+        position = pd.DataFrame(position).ffill().fillna(0).to_numpy(copy=True)
+        position[~kept] = np.nan
+        return position, kept & rsi.notna().to_numpy()
@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 import Vectorized
+import Batched
 
 class SMACrossoverTest(Vectorized.Vectorized):
     def __init__(self, symbol, start, end, tc, Fast_SMA, Slow_SMA, granularity):
@@ -8,7 +9,7 @@ class SMACrossoverTest(Vectorized.Vectorized):
         self.Slow_SMA = Slow_SMA
         super().__init__(symbol, start, end, tc, granularity=granularity)
 
-    def test_strategy(self):
+    def test_strategy(self, lean=False):
         df = self._data.copy().dropna()
         df['Returns'] = np.log(df.price.div(df.price.shift(1)))
         df['Fast SMA'] = df.price.rolling(self.Fast_SMA).mean()
@@ -16,18 +17,46 @@ class SMACrossoverTest(Vectorized.Vectorized):
         df.dropna(inplace=True)
         # When Fast SMA 'crosses over' the Slow SMA, go long; otherwise, go short
         df['position'] = np.where(df['Fast SMA'] > df['Slow SMA'], 1, -1)
-        df['strategy'] = df['position'].shift(1) * df['Returns']
-        # determine the number of trades in each bar
-        df['trades'] = df['position'].diff().fillna(0).abs()
-        df['hits'] = np.sign(df['Returns']) * np.sign(df['position'])
-        # subtract transaction/trading costs from pre-cost return
-        df['strategy'] = df['strategy'] - (df['trades'] * self.tc)
-        df.dropna(inplace=True)
-        # Cumulative performance columns
-        df['Standard Cumulative Returns'] = df['Returns'].cumsum().apply(np.exp)
-        df['Strategy Cumulative Returns'] = df['strategy'].cumsum().apply(np.exp)
-        self.results = df
-        # Absolute performance of strategy and out/under-performance of strategy
-        performance = df['Strategy Cumulative Returns'].iloc[-1]
-        outperformance = df['Standard Cumulative Returns'].iloc[-1]
-        return round(performance, 6), round(outperformance, 6)
\ No newline at end of file
+        return self.evaluate(df, lean)
+
+    # POSITIONS - test_strategy() positions of every column of a price frame (see Vectorized.positions)
+    def positions(self, price, returns):
+        fast = price.rolling(self.Fast_SMA).mean().to_numpy()
+        slow = price.rolling(self.Slow_SMA).mean().to_numpy()
+        kept = returns.notna().to_numpy() & ~np.isnan(fast) & ~np.isnan(slow)
+        # When Fast SMA 'crosses over' the Slow SMA, go long; otherwise, go short
+        position = np.where(fast > slow, 1.0, -1.0)
+        position[~kept] = np.nan
+        return position, kept
+
+    # TEST_GRID - evaluates every (Fast SMA, Slow SMA) combination in one batched pass
+    #   returns a performance matrix (rows: fast windows, columns: slow windows); the
+    #   per-combination performance and buy_and_hold (as test_strategy() returns them),
+    #   outperformance (performance - buy_and_hold) and trades are kept in grid_results
+    def test_grid(self, fast_windows, slow_windows, chunk_size=64):
+        price = self._data.price.dropna().to_numpy(dtype=float)
+        returns = Batched.log_returns(price)
+        windows = np.union1d(fast_windows, slow_windows).astype(int)
+        means = Batched.rolling_means(price, windows)
+        row = {window: i for i, window in enumerate(windows)}
+        fast, slow = (grid.ravel() for grid in np.meshgrid(fast_windows, slow_windows, indexing='ij'))
+        performance = np.empty(len(fast))
+        buy_and_hold = np.empty(len(fast))
+        trades = np.empty(len(fast))
+        long = np.empty((chunk_size, len(price)), dtype=bool)
+        for start in range(0, len(fast), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            size = len(fast[chunk])
+            for i in range(size):
+                np.greater(means[row[fast[start + i]]], means[row[slow[start + i]]], out=long[i])
+            # When Fast SMA 'crosses over' the Slow SMA, go long; otherwise, go short
+            positions = long[:size] * 2.0 - 1.0
+            first = np.maximum(np.maximum(fast[chunk], slow[chunk]) - 1, 1)
+            performance[chunk], buy_and_hold[chunk], trades[chunk] = Batched.evaluate_grid(
+                positions, returns, self.tc, first
+            )
+        self.grid_results = pd.DataFrame({
+            'Fast_SMA': fast, 'Slow_SMA': slow, 'performance': performance, 'buy_and_hold': buy_and_hold,
+            'outperformance': performance - buy_and_hold, 'trades': trades
+        })
+        return self.grid_results.pivot(index='Fast_SMA', columns='Slow_SMA', values='performance').round(6)
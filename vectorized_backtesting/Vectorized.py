@@ -1,11 +1,85 @@
+import os
+import itertools
 import numpy as np
-import matplotlib.pyplot as plt
+import pandas as pd
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 sys.path.insert(1, '../utilities')
 import Instrument
+import Plotting
+import Metrics
 Instrument = Instrument.Instrument
 
-plt.style.use("seaborn-v0_8")
+# attributes worker_state() leaves out: the data, helpers rebuilt in every worker, and the
+#   results of earlier test_strategy(), optimize() and test_grid() runs
+WORKER_EXCLUDED = ('_frame', '_instrument', '_kernel', 'results', 'results_overview',
+                   'optimization_results', 'grid_results')
+
+# STRATEGY EVALUATION KERNEL
+        # Maps (position array, returns array, tc) to performance, outperformance,
+        # trade count, hit ratio and equity curve. Work arrays are allocated once per
+        # series length and reused by every later evaluation.
+        # Bar t earns position(t-1) * returns(t) and pays tc * |position(t) - position(t-1)|.
+class StrategyKernel:
+    def __init__(self):
+        self._size = None
+
+    def _allocate(self, n):
+        if self._size != n:
+            self.strategy = np.empty(n)
+            self.trades = np.empty(n)
+            self.hits = np.empty(n)
+            self.mask = np.empty(n, dtype=bool)
+            self._scratch = np.empty(n)
+            self._flags = np.empty(n, dtype=bool)
+            self._size = n
+
+    # EVALUATE - returns a dict of scalars (plus equity/benchmark curves if curves=True)
+    #   valid marks the bars to keep besides those with a NaN strategy return or hit
+    def evaluate(self, position, returns, tc, valid=None, curves=True):
+        n = len(position)
+        self._allocate(n)
+        strategy, trades, hits, mask = self.strategy, self.trades, self.hits, self.mask
+        scratch, flags = self._scratch, self._flags
+        strategy[:1] = np.nan
+        np.multiply(position[:-1], returns[1:], out=strategy[1:])
+        trades[:1] = 0.0
+        np.subtract(position[1:], position[:-1], out=trades[1:])
+        np.abs(trades, out=trades)
+        np.isnan(trades, out=flags)
+        np.copyto(trades, 0.0, where=flags)
+        np.sign(returns, out=hits)
+        np.sign(position, out=scratch)
+        np.multiply(hits, scratch, out=hits)
+        # subtract transaction/trading costs from pre-cost return
+        np.multiply(trades, tc, out=scratch)
+        np.subtract(strategy, scratch, out=strategy)
+        # bars kept: no NaN in the strategy return, the hit or any caller-supplied column
+        np.isnan(strategy, out=mask)
+        np.isnan(hits, out=flags)
+        np.logical_or(mask, flags, out=mask)
+        np.logical_not(mask, out=mask)
+        if valid is not None:
+            np.logical_and(mask, valid, out=mask)
+        bars = np.count_nonzero(mask)
+        np.equal(hits, 1.0, out=flags)
+        np.logical_and(flags, mask, out=flags)
+        performance = np.exp(np.sum(strategy, where=mask))
+        buy_and_hold = np.exp(np.sum(returns, where=mask))
+        overview = {
+            'performance': performance,
+            'buy_and_hold': buy_and_hold,
+            'outperformance': performance - buy_and_hold,
+            'trades': np.sum(trades, where=mask),
+            'hit_ratio': np.count_nonzero(flags) / bars if bars else np.nan,
+            'bars': bars,
+        }
+        if curves:
+            overview['equity_curve'] = np.exp(np.cumsum(strategy[mask]))
+            overview['benchmark_curve'] = np.exp(np.cumsum(returns[mask]))
+        return overview
+
 
 # VECTORIZED BACKTESTING CLASS
         # Parameters
@@ -24,17 +98,30 @@ class Vectorized:
         self.tc = tc
         self.results = None
         self._instrument = Instrument(symbol, start, end, granularity=granularity)
-        self._data = self._instrument.get_data()
+        self._frame = None
+        self._kernel = StrategyKernel()
 
+    # Extra keyword arguments are forwarded to the subclass constructor (strategy parameters)
     @classmethod
-    def from_instrument(cls, instrument, tc):
-        instance =  cls(
-            instrument.get_ticker(), instrument.get_start(), instrument.get_end(), tc
+    def from_instrument(cls, instrument, tc, **kwargs):
+        instance = cls(
+            instrument.get_ticker(), instrument.get_start(), instrument.get_end(), tc,
+            granularity=instrument.granularity, **kwargs
         )
         instance._instrument = instrument
-        instance._data = instance._instrument.get_data()
         return instance
 
+    # _DATA - shared price frame of the instrument, loaded on first access
+    @property
+    def _data(self):
+        if self._frame is None:
+            self._frame = self._instrument.get_data()
+        return self._frame
+
+    @_data.setter
+    def _data(self, data):
+        self._frame = data
+
     def __repr__(self):
         return "VectorizedBacktester(symbol={}, start={}, end={})".format(
             self._instrument.get_ticker(),
@@ -42,56 +129,185 @@ class Vectorized:
             self._instrument.get_end(),
         )
 
-    # Overriden method
-    def test_strategy(self):
+    # Overriden method - builds a frame with 'Returns' and 'position' columns and
+    #   returns self.evaluate(df, lean)
+    def test_strategy(self, lean=False):
         # data = self._data.copy().dropna()
-        # data["log_returns"] = np.log(data.price / data.price.shift(1))
-        # data["position"] = np.sign(data["log_returns"].rolling(1).mean()).mul(-1)
-        # data["strategy"] = data["position"].shift(1) * data["log_returns"]
-        # data.dropna(inplace=True)
-
-        # # determine the number of trades in each bar
-        # data["trades"] = data.position.diff().fillna(0).abs()
+        # data["Returns"] = np.log(data.price / data.price.shift(1))
+        # data["position"] = -np.sign(data["Returns"].rolling(1).mean())
+        # return self.evaluate(data, lean)
+        return
 
-        # # subtract transaction/trading costs from pre-cost return
-        # data.strategy = data.strategy - data.trades * self.tc
+    # EVALUATE - scores the 'position' column of df against its 'Returns' with the shared kernel
+    #   Rows holding a NaN in any column are dropped, as the per-strategy dropna() calls did.
+    #   Scalars are kept in results_overview; lean=True skips building the results frame.
+    #   Returns (strategy performance, buy-and-hold performance), as test_strategy() always has.
+    def evaluate(self, df, lean=False):
+        valid = df.notna().all(axis=1).to_numpy()
+        position = df['position'].to_numpy(dtype=np.float64)
+        returns = df['Returns'].to_numpy(dtype=np.float64)
+        overview = self._kernel.evaluate(position, returns, self.tc, valid, curves=not lean)
+        if lean:
+            self.results = None
+        else:
+            kernel = self._kernel
+            df['strategy'] = kernel.strategy
+            df['trades'] = kernel.trades
+            df['hits'] = kernel.hits
+            # take() copies the kept rows, so the kernel buffers can be reused by the next run
+            df = df.take(np.flatnonzero(kernel.mask))
+            df['Standard Cumulative Returns'] = overview.pop('benchmark_curve')
+            df['Strategy Cumulative Returns'] = overview.pop('equity_curve')
+            self.results = df
+        self.results_overview = overview
+        return round(overview['performance'], 6), round(overview['buy_and_hold'], 6)
 
-        # data["creturns"] = data["log_returns"].cumsum().apply(np.exp)
-        # data["cstrategy"] = data["strategy"].cumsum().apply(np.exp)
-        # self.results = data
+    # Overriden method - test_strategy()'s signal logic applied to every column of a
+    #   (time x instrument) price frame in one pass, for Portfolio. returns is the frame of log
+    #   returns (NaN on each column's first bar). Returns (position, scored): (n, k) arrays
+    #   holding the positions test_strategy() would take (NaN on the rows its dropna() drops)
+    #   and the rows it would score
+    def positions(self, price, returns):
+        raise NotImplementedError("{} has no column-wise positions()".format(type(self).__name__))
 
-        # perf = data["cstrategy"].iloc[-1]  # absolute performance of the strategy
-        # outperf = perf - data["creturns"].iloc[-1]  # out-/underperformance of strategy
+    # OPTIMIZE - runs test_strategy() for every parameter set of param_grid across a process pool
+    #   param_grid maps strategy attribute names (e.g. Fast_SMA) to lists of values; the price
+    #   series is placed once in shared memory and every worker reads it from there
+    def optimize(self, param_grid, n_jobs=None):
+        names = list(param_grid)
+        combos = list(itertools.product(*(param_grid[name] for name in names)))
+        n_jobs = min(n_jobs or os.cpu_count() or 1, len(combos))
+        state = self.worker_state()
+        if n_jobs <= 1:
+            _init_worker(type(self), state, None, self._data)
+            rows = [_run_worker(names, combo) for combo in combos]
+        else:
+            shm, spec = _share_frame(self._data)
+            try:
+                with ProcessPoolExecutor(n_jobs, initializer=_init_worker, initargs=(type(self), state, spec)) as pool:
+                    chunksize = max(1, len(combos) // (n_jobs * 4))
+                    rows = list(pool.map(_run_worker, itertools.repeat(names), combos, chunksize=chunksize))
+            finally:
+                shm.close()
+                shm.unlink()
+        self.optimization_results = pd.DataFrame(
+            rows, columns=names + ['performance', 'outperformance', 'trades']
+        ).sort_values('performance', ascending=False, ignore_index=True)
+        return self.optimization_results
 
-        # return round(perf, 6), round(outperf, 6)
-        return
+    # WORKER_STATE - attributes a worker process needs to rebuild this strategy (no data or results)
+    def worker_state(self):
+        return {key: value for key, value in self.__dict__.items() if key not in WORKER_EXCLUDED}
 
     # PLOT_RESULTS - Plots results of strategy, compares to buy/hold
     def plot_results(self):
         if self.results is None:
             print("Run test_strategy() first.")
         else:
+            Plotting.pyplot()
             title = "{} Returns with TC = {}".format(self._instrument.get_ticker(), self.tc)
             self.results[["Strategy Cumulative Returns", "Standard Cumulative Returns"]].plot(title=title, figsize=(12, 8))
     
     # HIT_RATIO - returns proportion of profitable trades
     def hit_ratio(self):
-        if self.results is not None and self.results.hits is not None:
-            value_count = self.results.hits.value_counts()
-            return value_count[1] / (value_count[0] + value_count[-1] + value_count[1])
+        if self.results_overview is not None:
+            return self.results_overview['hit_ratio']
         return "No hit ratio avaliable. Test strategy before calling this method."
     
-    # DETAILED_METRICS - returns detailed performance metrics (MR, CAGR, Sharpe)
-    def detailed_metrics(self):
-        if self.results is not None:
-            mean_return = round(self.results.strategy.mean() * 252, 3)
-            risk = round(self.results.strategy.std() * np.sqrt(252), 3)
-            print("Annualized Return: {} | Annualized Risk: {}".format(mean_return, risk))
+    # METRICS - Metrics.Metrics of the last test_strategy() run, fed the kernel's per-bar strategy
+    #   returns, the position each bar was earned with and closed_trades(); bars_per_year
+    #   defaults to Metrics.bars_per_year() of the bar length of the results index
+    def metrics(self, risk_free=0.0, bars_per_year=None):
+        if self.results is None:
+            raise ValueError("Test strategy (lean=False) before calling metrics()")
+        if bars_per_year is None:
+            bars_per_year = Metrics.bars_per_year(Metrics.bar_length(self.results.index))
+        metrics = Metrics.Metrics(bars_per_year, risk_free)
+        metrics.update_many(self.results['strategy'].to_numpy(), self.results['position'].shift(1).to_numpy())
+        for pl in self.closed_trades():
+            metrics.add_trade(pl)
+        return metrics
 
-            cagr = (self.results.cstrategy.iloc[-1] / self.results.cstrategy.iloc[0]) ** (365 / (self.results.index[-1] - self.results.index[0]).days) - 1
-            print("CAGR: {}".format(cagr))
+    # CLOSED_TRADES - log return of every round trip of the last test_strategy() run (positions
+    #   of -1, 0 and 1): a run of bars held at one non-zero position earns position * Returns
+    #   on each of them and pays tc for opening it and tc for closing it (half of a reversal
+    #   each); a position still held on the last bar is closed there without an exit cost
+    def closed_trades(self):
+        results = self.results
+        held = np.nan_to_num(results['position'].shift(1).to_numpy(dtype=np.float64))
+        if not len(held):
+            return held
+        position = results['position'].to_numpy(dtype=np.float64)
+        changes = np.flatnonzero(held[1:] != held[:-1]) + 1
+        starts = np.concatenate([[0], changes])
+        ends = np.append(changes, len(held)) - 1
+        earned = np.add.reduceat(held * results['Returns'].to_numpy(dtype=np.float64), starts)
+        size = np.abs(held[starts])
+        exits = np.where(position[ends] != held[ends], size, 0.0)
+        return (earned - self.tc * (size + exits))[size != 0]
 
-            sharpe = (cagr - 0.039) / risk
-            print("SHARPE: {}".format(sharpe))
+    # DETAILED_METRICS - prints and returns detailed performance metrics (MR, CAGR, Sharpe, ...)
+    def detailed_metrics(self, risk_free=0.039):
+        if self.results is not None:
+            metrics = self.metrics(risk_free)
+            print("Annualized Return: {} | Annualized Risk: {}".format(
+                round(metrics.annual_return, 3), round(metrics.annual_risk, 3)))
+            print("CAGR: {}".format(metrics.cagr))
+            print("SHARPE: {} | SORTINO: {}".format(metrics.sharpe, metrics.sortino))
+            print("Max Drawdown: {} | Exposure: {}".format(metrics.max_drawdown, metrics.exposure))
+            return metrics.snapshot()
         else:
-            return "No data avaliable. Test strategy before calling detailed_metrics()"
\ No newline at end of file
+            return "No data avaliable. Test strategy before calling detailed_metrics()"
+
+
+# Worker-side state of Vectorized.optimize(): one strategy instance per process,
+# reading its price data from shared memory
+_worker = {}
+
+
+# _SHARE_FRAME - copies the numeric columns and index of a frame into one shared memory block
+def _share_frame(data):
+    data = data.select_dtypes('number')
+    index = pd.DatetimeIndex(data.index)
+    n = len(data)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, (len(data.columns) + 1) * n * 8))
+    block = np.ndarray((len(data.columns) + 1, n), dtype=np.float64, buffer=shm.buf)
+    block[0].view(np.int64)[:] = index.values.astype('datetime64[ns]').view(np.int64)
+    for i, column in enumerate(data.columns):
+        block[i + 1] = data[column].to_numpy(dtype=np.float64)
+    spec = (shm.name, n, list(data.columns), index.name, None if index.tz is None else str(index.tz))
+    return shm, spec
+
+
+# _ATTACH_FRAME - rebuilds a read-only frame on top of a shared memory block
+def _attach_frame(spec):
+    name, n, columns, index_name, tz = spec
+    shm = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((len(columns) + 1, n), dtype=np.float64, buffer=shm.buf)
+    block.flags.writeable = False
+    index = pd.DatetimeIndex(block[0].view(np.int64).view('datetime64[ns]'), name=index_name)
+    if tz is not None:
+        index = index.tz_localize('UTC').tz_convert(tz)
+    frame = pd.DataFrame({column: block[i + 1] for i, column in enumerate(columns)}, index=index, copy=False)
+    return shm, frame
+
+
+def _init_worker(cls, state, spec, data=None):
+    if spec is not None:
+        _worker['shm'], data = _attach_frame(spec)
+    instance = cls.__new__(cls)
+    instance.__dict__.update(state)
+    instance._instrument = None
+    instance._frame = data
+    instance._kernel = StrategyKernel()
+    instance.results = None
+    _worker['instance'] = instance
+
+
+def _run_worker(names, combo):
+    instance = _worker['instance']
+    for name, value in zip(names, combo):
+        setattr(instance, name, value)
+    performance, _ = instance.test_strategy(lean=True)
+    overview = instance.results_overview
+    return list(combo) + [performance, round(overview['outperformance'], 6), overview['trades']]
@@ -0,0 +1,186 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import Vectorized
+import Plotting
+
+# per-window statistics computed for every fold and parameter set
+STATS = ['performance', 'outperformance', 'trades', 'hit_ratio', 'bars']
+
+
+# WALK-FORWARD OPTIMIZATION
+        # Rolls a train window and the test window that follows it across the series:
+        # on every fold the parameter set with the best in-sample metric is chosen and
+        # scored out-of-sample. Each parameter set's strategy is run once over the full
+        # series (indicators included); every fold then reads its train and test
+        # scores off running sums of that one results frame, so nothing is recomputed
+        # per fold. Parameter sets are spread over a process pool, each scoring all folds.
+        # Parameters
+        # ----------
+        # tester: Vectorized
+        #     strategy instance (e.g. SMACrossoverTest) holding the data and tc
+        # param_grid: dict
+        #     strategy attribute names mapped to lists of values, as for optimize()
+        # train, test: int or str
+        #     window lengths, in bars (int) or as a pd.Timedelta string (e.g. '730D')
+        # step: int or str (default = None)
+        #     distance between fold starts; None uses the test length
+        # anchored: boolean (default = False)
+        #     whether every train window starts at the beginning of the series
+        # metric: str (default = 'performance')
+        #     in-sample statistic maximized to choose the parameters (see STATS)
+class WalkForward:
+    def __init__(self, tester, param_grid, train, test, step=None, anchored=False, metric='performance'):
+        self.tester = tester
+        self.param_grid = param_grid
+        self.train = train
+        self.test = test
+        self.step = test if step is None else step
+        self.anchored = anchored
+        self.metric = metric
+        self.folds = None
+        self.equity_curve = None
+
+    def __repr__(self):
+        return "WalkForward(tester={}, train={}, test={}, anchored={})".format(
+            self.tester, self.train, self.test, self.anchored)
+
+    # FOLD_BOUNDS - (folds, 4) epoch-ns array of train start, train end, test start, test end
+    #   windows are half-open; the last fold ends where the data ends
+    def fold_bounds(self):
+        times = self.tester._data.index.values.astype('datetime64[ns]').view(np.int64)
+        # one bar past the data closes the last window
+        times = np.append(times, 2 * times[-1] - times[-2])
+        if isinstance(self.train, (int, np.integer)):
+            position = lambda start, bars: start + bars
+            first, last = 0, len(times) - 1
+            stamp = lambda i: times[min(i, last)]
+        else:
+            position = lambda start, span: start + pd.Timedelta(span).value
+            first, last = times[0], times[-1]
+            stamp = lambda t: t
+        bounds = []
+        start = first
+        while True:
+            train_start = first if self.anchored else start
+            train_end = position(start, self.train)
+            test_end = min(position(train_end, self.test), last)
+            if train_end >= last:
+                break
+            bounds.append([stamp(train_start), stamp(train_end), stamp(train_end), stamp(test_end)])
+            if test_end >= last:
+                break
+            start = position(start, self.step)
+        return np.array(bounds, dtype=np.int64).reshape(-1, 4)
+
+    # RUN - scores every parameter set on every fold and picks one per fold
+    #   returns a frame with one row per fold: its windows, the chosen parameters,
+    #   their in-sample metric and their out-of-sample statistics
+    def run(self, n_jobs=None):
+        tester = self.tester
+        names = list(self.param_grid)
+        combos = list(itertools.product(*(self.param_grid[name] for name in names)))
+        bounds = self.fold_bounds()
+        if len(bounds) == 0:
+            raise ValueError('series too short for one train and test window')
+        n_jobs = min(n_jobs or os.cpu_count() or 1, len(combos))
+        state = tester.worker_state()
+        if n_jobs <= 1:
+            Vectorized._init_worker(type(tester), state, None, tester._data)
+            scores = [_score_folds(names, combo, bounds) for combo in combos]
+        else:
+            shm, spec = Vectorized._share_frame(tester._data)
+            try:
+                with ProcessPoolExecutor(n_jobs, initializer=Vectorized._init_worker,
+                                         initargs=(type(tester), state, spec)) as pool:
+                    chunksize = max(1, len(combos) // (n_jobs * 4))
+                    scores = list(pool.map(_score_folds, itertools.repeat(names), combos,
+                                           itertools.repeat(bounds), chunksize=chunksize))
+            finally:
+                shm.close()
+                shm.unlink()
+        # scores: (combos, folds, train/test, stats)
+        scores = np.stack(scores)
+        metric = scores[:, :, 0, STATS.index(self.metric)]
+        chosen = np.nanargmax(np.where(np.isnan(metric), -np.inf, metric), axis=0)
+        folds = pd.DataFrame(pd.to_datetime(bounds.ravel()).values.reshape(bounds.shape),
+                             columns=['train_start', 'train_end', 'test_start', 'test_end'])
+        for i, name in enumerate(names):
+            folds[name] = [combos[c][i] for c in chosen]
+        folds['train_' + self.metric] = metric[chosen, np.arange(len(bounds))]
+        for i, stat in enumerate(STATS):
+            folds[stat] = scores[chosen, np.arange(len(bounds)), 1, i]
+        self.folds = folds
+        self.stitch(names, [combos[c] for c in chosen], bounds)
+        return folds
+
+    # STITCH - out-of-sample strategy and buy-and-hold curves of the chosen parameters, fold after fold
+    def stitch(self, names, chosen, bounds):
+        tester = self.tester
+        saved = {name: getattr(tester, name) for name in names}
+        results = {}
+        strategy, returns = [], []
+        try:
+            for combo, (_, _, test_start, test_end) in zip(chosen, bounds):
+                if combo not in results:
+                    for name, value in zip(names, combo):
+                        setattr(tester, name, value)
+                    tester.test_strategy()
+                    results[combo] = tester.results
+                frame = results[combo]
+                times = frame.index.values.astype('datetime64[ns]').view(np.int64)
+                window = slice(*np.searchsorted(times, [test_start, test_end]))
+                strategy.append(frame['strategy'].iloc[window])
+                returns.append(frame['Returns'].iloc[window])
+        finally:
+            for name, value in saved.items():
+                setattr(tester, name, value)
+        strategy, returns = pd.concat(strategy), pd.concat(returns)
+        self.equity_curve = pd.DataFrame({
+            'Strategy Cumulative Returns': np.exp(strategy.cumsum()),
+            'Standard Cumulative Returns': np.exp(returns.cumsum()),
+        })
+        return self.equity_curve
+
+    # PLOT_RESULTS - plots the stitched out-of-sample curve against buy and hold
+    def plot_results(self):
+        if self.equity_curve is None:
+            print("Run run() first.")
+        else:
+            Plotting.pyplot()
+            title = "{} Walk-Forward (out-of-sample) Returns with TC = {}".format(
+                self.tester._instrument.get_ticker(), self.tester.tc)
+            self.equity_curve.plot(title=title, figsize=(12, 8))
+
+
+# _SCORE_FOLDS - (folds, 2, len(STATS)) train/test statistics of one parameter set
+#   runs in a worker set up by Vectorized._init_worker; window sums come from cumulative sums
+def _score_folds(names, combo, bounds):
+    instance = Vectorized._worker['instance']
+    for name, value in zip(names, combo):
+        setattr(instance, name, value)
+    instance.test_strategy()
+    frame = instance.results
+    times = frame.index.values.astype('datetime64[ns]').view(np.int64)
+    sums = np.zeros((4, len(frame) + 1))
+    np.cumsum(frame['strategy'].to_numpy(), out=sums[0, 1:])
+    np.cumsum(frame['Returns'].to_numpy(), out=sums[1, 1:])
+    np.cumsum(frame['trades'].to_numpy(), out=sums[2, 1:])
+    np.cumsum(frame['hits'].to_numpy() == 1, out=sums[3, 1:])
+    edges = np.searchsorted(times, bounds)
+    scores = np.empty((len(bounds), 2, len(STATS)))
+    for window, (start, end) in enumerate([(0, 1), (2, 3)]):
+        total = sums[:, edges[:, end]] - sums[:, edges[:, start]]
+        bars = edges[:, end] - edges[:, start]
+        performance = np.exp(total[0])
+        scores[:, window, 0] = performance
+        scores[:, window, 1] = performance - np.exp(total[1])
+        scores[:, window, 2] = total[2]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores[:, window, 3] = np.where(bars > 0, total[3] / bars, np.nan)
+        scores[:, window, 4] = bars
+    # windows without scored bars cannot be chosen
+    scores[:, :, 0] = np.where(scores[:, :, 4] > 0, scores[:, :, 0], np.nan)
+    return scores